@@ -1,1169 +1,1366 @@
+import argparse  # Used to read the command line options
+import os  # Used to read the environment variables that configure the app
 import sys  # Import the sys module to access system-specific parameters and functions
+import threading  # Indexes are read in the background
+import time  # Used to find windows that have not been used for a while
+from collections import OrderedDict  # Keeps the cached windows in least recently used order
+
+if __name__ == "__main__":
+    # --search, --list, --open and --stdin answer on the command line, without loading PyQt5 at all
+    from cli import main as cli_main, wants_cli
+    if wants_cli(sys.argv[1:]):
+        sys.exit(cli_main(sys.argv[1:]))
+
+    # A second launch hands its request to the running app and exits before PyQt5 is even imported
+    from instance import hand_off
+    if hand_off(sys.argv[1:]):
+        sys.exit(0)
+
+from profiling import startup_profiler  # Times the startup phases when --profile-startup is given
+
+# Started before PyQt5 is imported, so the time spent importing it shows up in the report
+PROFILER = startup_profiler()
+
+with PROFILER.phase("import PyQt5"):
+    # Import necessary modules and classes from PyQt5
+    from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QGridLayout, QSizePolicy, QLabel, QStackedWidget, QListWidget, QListWidgetItem, QShortcut, QToolTip, QMessageBox
+    from PyQt5.QtCore import Qt, QEvent, QObject, QSize, QTimer, pyqtSignal
+    from PyQt5.QtGui import QPixmap, QPainter, QTransform, QFont, QKeySequence, QCursor
+    from PyQt5.QtNetwork import QLocalServer
+
+with PROFILER.phase("import app modules"):
+    from catalog import CatalogError, default_catalog, use_shipped_catalog  # Sections, items, colours and URLs shown by the windows
+    from images import ScaledImage  # Window images, decoded off the GUI thread and sharp at any size
+    from instance import MAX_REQUEST_BYTES, decode_request, is_stale, socket_path, supported  # Single-instance hand-off
+    from launcher import url_launcher  # Opens links in a helper process instead of on the GUI thread
+    from search import ScanSearch, SearchEngine, fuzzy_score, narrows  # Ranked, typo-tolerant matching for the search bars
+    from session import load_session, save_session, window_state  # Reopens the windows of the last session
+    from sharedimages import detach_shared_images  # Window images shared by every session on a terminal server
+    from sorting import SORT_CAPTIONS, SORT_ORDERS, SortEngine, next_sort_order  # Cached A - Z, Z - A and most used orders
+    import theme  # Installs and switches the application stylesheet
+    from theme import tag  # Widgets are styled by role through one application stylesheet
+    from stallwatch import STALL_THRESHOLD_MS, StallWatchdog  # Finds what blocks the event loop
+    from tileview import ITEM_ROLE, SectionModel, TileFilterModel, tile_list_view  # Virtualized view for large sections
+    from usage import usage_log  # How often and how recently each link and section was opened
+
+
+def environ_int(name, default, minimum=0):
+    """
+    Return a whole number from an environment variable, or default if it is not set or not a number.
+
+    A typo in a setting of the lab's login script must not stop the app from starting.
+
+    :param name: Name of the environment variable, e.g. "STUDENT_TOOLKIT_SEARCH_DEBOUNCE_MS".
+    :param default: Value used when the variable is unset, not a whole number or below minimum.
+    :param minimum: Smallest value accepted.
+    """
+    try:
+        value = int(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return value if value >= minimum else default
+
+
+# Number of windows kept alive for reuse; hidden windows beyond it are freed, oldest first
+WINDOW_CACHE_LIMIT = 4
+# Rough memory budget in bytes for all cached windows, 0 turns the memory check off
+WINDOW_MEMORY_LIMIT = 64 * 1024 * 1024
+# Hidden windows that have not been used for this many seconds are freed
+WINDOW_IDLE_TIMEOUT = 10 * 60
+# Keystrokes typed within this many milliseconds are filtered together, one relayout per frame
+SEARCH_DEBOUNCE_MS = environ_int("STUDENT_TOOLKIT_SEARCH_DEBOUNCE_MS", 16)
+# Sections with more items than this are shown in a virtualized list view instead of one button per item
+LARGE_SECTION_THRESHOLD = 48
+# The links are checked in the background this long after startup, so the check never slows the first window
+LINK_CHECK_DELAY_MS = 5000
+# The pages are saved for offline use this long after startup, once the link check is under way
+PREFETCH_DELAY_MS = 15000
+
+# Pages whose saved copy mentions the search text are listed below the title matches, up to this many
+PAGE_RESULT_LIMIT = 10
+
+# Link check results by URL, shared by every window; filled from the cache once the app is idle
+LINK_HEALTH = {}
+
+
+def grid_positions(count, preset, columns=2):
+    """
+    Return a grid cell for each of count tiles.
+
+    The first tiles use the hand-picked preset cells; any further tiles from the
+    catalog continue row by row below them, so no tile is ever dropped.
+
+    :param count: Number of tiles.
+    :param preset: List of (row, column) cells for the first tiles.
+    :param columns: Number of columns for the extra tiles.
+    """
+    positions = list(preset[:count])
+    first_row = max((row for row, _ in preset), default=-1) + 1
+    for i in range(count - len(positions)):
+        positions.append((first_row + i // columns, i % columns))
+    return positions
+
+
+class TileFilter:
+    def __init__(self, callback=None, debounce=SEARCH_DEBOUNCE_MS):
+        """
+        Base for the ways a window shows its tiles: filters them as the user types.
 
-# Import necessary modules and classes from PyQt5
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QGridLayout, QSizePolicy, QLabel
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QDesktopServices, QPixmap, QPainter, QTransform, QFont
-from PyQt5.QtCore import QUrl
-
-# Define the main application class inheriting from QWidget
-class SearchApp(QWidget):
-    def __init__(self):
-        super().__init__()  # Call the constructor of the base class
-
-        self.initUI()  # Initialize the user interface
-        self.open_windows = []  # Keep track of open windows
-
-    def initUI(self):
-        # Initialize the main layout as a vertical box layout
-        self.layout = QVBoxLayout()
-
-        # Create the top bar layout as a horizontal box layout
-        topLayout = QHBoxLayout()
+        :param callback: Optional function called with the search text after every filter pass.
+        :param debounce: Milliseconds keystrokes are collected for before the tiles are filtered.
+        """
+        self.callback = callback
 
-        # Create the "A-Z" toggle button with styles and connect its click event
-        self.azButton = QPushButton("A - Z", self)
-        self.azButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
-        self.azButton.clicked.connect(self.toggle_sort_order)
+        # Fast typing restarts nothing: the first keystroke starts the timer, later ones join it
+        self.pending = None
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(max(0, debounce))
+        self.timer.timeout.connect(self.flush)
 
-        # Create the search bar with styles and connect its text change event
-        self.searchBar = QLineEdit(self)
-        self.searchBar.setPlaceholderText("Search...")
-        self.searchBar.textChanged.connect(self.on_search)
-        self.searchBar.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
+    def filter_later(self, text):
+        """
+        Filter the tiles on the next timer tick, so a burst of keystrokes causes one relayout.
 
-        # Add widgets to the top bar layout
-        topLayout.addWidget(self.azButton, alignment=Qt.AlignLeft)
-        topLayout.addStretch()  # Add stretch to push the search bar to the right
-        topLayout.addWidget(self.searchBar, alignment=Qt.AlignRight)
+        :param text: The text in the window's search bar.
+        """
+        self.pending = text
+        if not self.timer.isActive():
+            self.timer.start()
 
-        # Add the top bar layout to the main layout
-        self.layout.addLayout(topLayout)
+    def flush(self):
+        # Apply a pending search straight away, e.g. before Enter opens the best match
+        self.timer.stop()
+        if self.pending is not None:
+            text, self.pending = self.pending, None
+            self.filter(text)
 
-        # Create the main buttons layout as a grid layout
-        self.buttonLayout = QGridLayout()
-        self.buttonLayout.setSpacing(20)  # Set spacing between buttons
+    def filter(self, text):
+        # Show the tiles matching the text, implemented by the subclasses
+        raise NotImplementedError
 
-        # Define the categories and their positions in the grid layout
-        self.categories = ["Study Guides", "School Resources", "Miscellaneous Info", "Health Check-Up"]
-        self.buttons = []
-        positions = [(0, 0), (0, 1), (1, 0), (1, 1)]  # Define button positions
-
-        # Create buttons for each category with styles and connect their click events
-        for position, category in zip(positions, self.categories):
-            button = QPushButton(category, self)
-            button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)  # Set button size policy
-            button.setMinimumSize(150, 100)  # Set minimum size
+    def sort(self, order="az"):
+        # Sort the tiles by caption or usage (one of SORT_ORDERS), implemented by the subclasses
+        raise NotImplementedError
 
-            # Set different styles for each category
-            if category == "Study Guides":
-                button.setStyleSheet("background-color: #480CA8; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-            elif category == "School Resources":
-                button.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-            elif category == "Miscellaneous Info":
-                button.setStyleSheet("background-color: #3F37C9; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-            elif category == "Health Check-Up":
-                button.setStyleSheet("background-color: #B5179E; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
+    def show_health(self, health):
+        # Mark the tiles whose link has a problem, implemented by the subclasses
+        raise NotImplementedError
 
-            # Connect button click to open a new window corresponding to the category
-            button.clicked.connect(lambda checked, cat=category: self.open_new_window(cat))
-            self.buttonLayout.addWidget(button, *position)  # Add button to the grid layout
-            self.buttons.append(button)  # Add button to the list of buttons
 
-        # Add the buttons layout to the main layout
-        self.layout.addLayout(self.buttonLayout)
-        self.setLayout(self.layout)  # Set the main layout
-
-        self.setWindowTitle("Main Menu")  # Set the window title
-        self.setGeometry(100, 100, 800, 600)  # Set the window size and position
-        self.setStyleSheet("background-color: #121212;")  # Set the background color
-
-        self.ascending = True  # Set the initial sort order to ascending
-
-    def keyPressEvent(self, event):
-        # Override the key press event to set focus on the search bar when any key is pressed
-        if event.text():
-            self.searchBar.setFocus()
+class TileGrid(TileFilter):
+    def __init__(self, layout, buttons, positions, callback=None, debounce=SEARCH_DEBOUNCE_MS, urls=None):
+        """
+        Places a window's tile buttons in its grid cells, best search match first.
+
+        :param layout: The QGridLayout that holds the tiles.
+        :param buttons: The window's list of tile buttons, in their current sort order.
+        :param positions: The grid cell of each tile slot, in reading order.
+        :param callback: Optional function called with the search text after every filter pass.
+        :param urls: Optional link of each button, in the same order, used for the link health badges.
+        :param debounce: Milliseconds keystrokes are collected for before the tiles are filtered.
+        """
+        super().__init__(callback, debounce)
+        self.layout = layout
+        self.buttons = buttons  # The same list the window sorts, so sorting is picked up here
+        self.positions = positions
+
+        self.text = ""  # Search text the tiles are currently filtered by
+        self.matches = list(buttons)  # Tiles that matched it, the only candidates while the text grows
+        self.visible = set(buttons)  # Tiles currently shown
+        self.cells = dict(zip(buttons, positions))  # Grid cell each tile currently sits in
+        self.urls = dict(zip(buttons, urls or []))  # Link each tile opens, if any
+        self.badges = {}  # Badge label of each tile that had a problem so far
+        self.tiles = list(buttons)  # Every tile in creation order, the positions the sort engine returns refer to it
+        self.sorter = SortEngine([button.text() for button in buttons],
+                                 usage_keys=[self.urls.get(button) or button.text() for button in buttons])
+        if LINK_HEALTH and self.urls:
+            self.show_health(LINK_HEALTH)
+
+    def sort(self, order="az"):
+        """
+        Put the buttons in a sort order; the next filter pass moves the ones whose cell changed.
 
-    def on_search(self):
-        # Filter buttons based on the search text
-        search_text = self.searchBar.text().lower()
-        for button in self.buttons:
-            if search_text in button.text().lower():
-                button.show()  # Show button if it matches the search text
-            else:
-                button.hide()  # Hide button if it doesn't match the search text
+        :param order: "az", "za", or "used" for the most used first (ties A - Z).
+        """
+        self.buttons[:] = [self.tiles[position] for position in self.sorter.sort(order)]
 
-    def toggle_sort_order(self):
-        # Toggle the sort order between ascending and descending
-        self.ascending = not self.ascending
-        self.azButton.setText("A - Z" if self.ascending else "Z - A")  # Update button text
-        self.sort_buttons()  # Sort the buttons
+    def filter(self, text):
+        """
+        Rank the tiles against the search text and lay them out best match first.
 
-    def sort_buttons(self):
-        # Sort buttons by their text in the specified order
-        self.buttons.sort(key=lambda btn: btn.text(), reverse=not self.ascending)
-        for i, button in enumerate(self.buttons):
-            self.buttonLayout.addWidget(button, i // 2, i % 2)  # Reposition buttons in the grid layout
-
-    def open_new_window(self, category):
-        # Open a new window corresponding to the selected category
-        if category == "Study Guides":
-            self.new_window = StudyGuidesWindow(self)
-        elif category == "School Resources":
-            self.new_window = SchoolResourcesWindow(self)
-        elif category == "Miscellaneous Info":
-            self.new_window = MiscellaneousInfoWindow(self)
-        elif category == "Health Check-Up":
-            self.new_window = HealthCheckUpWindow(self)
-
-        self.new_window.show()  # Show the new window
-        self.open_windows.append(self.new_window)  # Add the new window to the list of open windows
+        Tiles that do not match are hidden. An empty search shows every tile in the
+        current sort order. Typos are tolerated, so "revison" still finds
+        "Revision Techniques". When the text only grew, only the tiles that matched
+        before are scored again, and only tiles that change cell or visibility are touched.
 
-    def closeEvent(self, event):
-        # Override the close event to close all open windows before closing the main window
-        for window in self.open_windows:
-            window.close()
-        event.accept()  # Accept the close event
+        :param text: The text in the window's search bar.
+        """
+        self.pending = None  # A direct call supersedes a debounced one
+        if self.text and narrows(self.text, text):
+            candidates = self.matches
+        else:
+            candidates = self.buttons
+        order = {button: i for i, button in enumerate(self.buttons)}
+
+        # Best matches take the first cells, ties keep the sort order
+        scored = [(fuzzy_score(text, button.text()), order[button], button) for button in candidates]
+        scored = sorted((entry for entry in scored if entry[0] > 0), key=lambda entry: (-entry[0], entry[1]))
+        matches = [button for _, _, button in scored]
+        visible = set(matches)
+
+        # Collect every change first and let the window repaint once at the end
+        parent = self.layout.parentWidget()
+        if parent is not None:
+            parent.setUpdatesEnabled(False)
+        try:
+            for position, button in zip(self.positions, matches):
+                if self.cells.get(button) != position:
+                    self.layout.removeWidget(button)
+                    self.layout.addWidget(button, *position)
+                    self.cells[button] = position
+            for button in self.visible - visible:
+                button.hide()  # Hidden tiles keep their cell, they take no space in the grid
+            for button in visible - self.visible:
+                button.show()
+        finally:
+            if parent is not None:
+                parent.setUpdatesEnabled(True)
 
+        self.text = text
+        self.matches = matches
+        self.visible = visible
+        if self.callback is not None:
+            self.callback(text)
 
-class StudyGuidesWindow(QWidget):
-    def __init__(self, main_window):
+    def show_health(self, health):
         """
-        Initialize the StudyGuidesWindow.
+        Put a badge on the tiles whose link was found broken or unreachable, and remove fixed ones.
 
-        :param main_window: Reference to the main window that manages this window.
+        :param health: Dictionary of URL -> link check result.
         """
-        super().__init__()  # Call the base class constructor
-        self.main_window = main_window  # Store reference to the main window
-        self.initUI()  # Initialize the user interface
-
-    def initUI(self):
+        for button, url in self.urls.items():
+            result = health.get(url)
+            badge = self.badges.get(button)
+            if result is None or result.state not in theme.BADGES:
+                if badge is not None:
+                    badge.hide()
+                    button.setToolTip("")
+                continue
+            if badge is None:
+                badge = self.badges[button] = QLabel(button)
+                badge.move(8, 8)  # Top-left corner, so it stays put however the tile is resized
+                badge.setAttribute(Qt.WA_TransparentForMouseEvents)  # Clicks still open the link
+            badge.setText(theme.BADGES[result.state][0])
+            badge.setProperty("health", result.state)
+            tag(badge, "badge")
+            badge.style().unpolish(badge)  # Pick up the rule of the new health state
+            badge.style().polish(badge)
+            badge.adjustSize()
+            badge.show()
+            button.setToolTip("%s\n%s" % (url, result.error or result.state))
+
+
+class TileView(TileFilter):
+    def __init__(self, catalog, name, open_item, parent=None, callback=None, debounce=SEARCH_DEBOUNCE_MS):
         """
-        Set up the user interface for the StudyGuidesWindow.
+        Shows a large section as a virtualized list of tiles instead of one button per item.
+
+        Rows come from a SectionModel, are ranked by a TileFilterModel and painted by a
+        list view that only draws the tiles on screen, so opening and scrolling a
+        section with thousands of links takes the same memory as one with ten.
+
+        :param catalog: The Catalog the section is read from.
+        :param name: Name of the section.
+        :param open_item: Function called with the CatalogItem of a clicked tile.
+        :param parent: The window the view belongs to.
+        :param callback: Optional function called with the search text after every filter pass.
+        :param debounce: Milliseconds keystrokes are collected for before the tiles are filtered.
         """
-        # Create the main vertical layout for the window
-        self.layout = QVBoxLayout()
-
-        # Create a horizontal layout for the top bar
-        topLayout = QHBoxLayout()
-
-        # Create the "A-Z" toggle button to sort categories
-        self.azButton = QPushButton("A - Z", self)
-        self.azButton.setStyleSheet(
-            "background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
-        self.azButton.clicked.connect(self.toggle_sort_order)  # Connect button click to toggle_sort_order method
-
-        # Create a search bar for filtering categories
-        self.searchBar = QLineEdit(self)
-        self.searchBar.setPlaceholderText("Search...")  # Placeholder text when the search bar is empty
-        self.searchBar.textChanged.connect(self.on_search)  # Connect text change to on_search method
-        self.searchBar.setStyleSheet(
-            "background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
-
-        # Add the toggle button and search bar to the top bar layout
-        topLayout.addWidget(self.azButton, alignment=Qt.AlignLeft)  # Add button aligned to the left
-        topLayout.addStretch()  # Add a stretchable space to push the search bar to the right
-        topLayout.addWidget(self.searchBar, alignment=Qt.AlignRight)  # Add search bar aligned to the right
-
-        # Add the top bar layout to the main layout
-        self.layout.addLayout(topLayout)
+        super().__init__(callback, debounce)
+        self.model = SectionModel(catalog, name, parent)
+        self.proxy = TileFilterModel(self.model, parent)
+        self.view = tile_list_view(self.proxy, parent)
+        self.view.clicked.connect(lambda index: open_item(index.data(ITEM_ROLE)))
+        self.model.health = LINK_HEALTH
+        self.sorter = None  # Built on the first sort, reading every title is not needed before
+
+    def sort(self, order="az"):
+        """
+        Sort the rows by title or by usage; the next filter pass shows the new order.
 
-        # Create a grid layout for the main buttons
-        self.buttonLayout = QGridLayout()
-        self.buttonLayout.setSpacing(20)  # Set spacing between buttons
+        :param order: "az", "za", or "used" for the most used first (ties A - Z).
+        """
+        if self.sorter is None:
+            titles = self.model.titles()
+            urls = self.model.catalog.urls(self.model.name)
+            self.sorter = SortEngine(titles, usage_keys=[url or title for url, title in zip(urls, titles)])
+        self.proxy.set_order(self.sorter.sort(order))
 
-        # Define categories and button positions
-        self.categories = ["Exam Techniques", "Note Taking Tips", "Revision Techniques", "Music", "Bored?",
-                           "Study Guide Videos"]
-        self.buttons = []  # List to hold button references
-        positions = [(0, 0), (0, 1), (1, 0), (1, 1), (2, 0), (2, 1)]  # Button positions in the grid
+    def filter(self, text):
+        """
+        Show the rows matching the search text, best match first.
 
-        # Create and configure buttons for each category
-        for position, category in zip(positions, self.categories):
-            button = QPushButton(category, self)
-            button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)  # Allow button to expand
-            button.setMinimumSize(150, 100)  # Set minimum size of the button
-            button.setStyleSheet("background-color: #480CA8; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-
-            # Connect button clicks to the appropriate method based on the category
-            if category == "Exam Techniques":
-                button.clicked.connect(self.open_exam_techniques)
-            elif category == "Note Taking Tips":
-                button.clicked.connect(self.open_note_taking_tips)
-            elif category == "Revision Techniques":
-                button.clicked.connect(self.open_revision_techniques)
-            elif category == "Bored?":
-                button.clicked.connect(self.Bored)
-            elif category == "Study Guide Videos":
-                button.clicked.connect(self.Study_Guide_Videos)
-            elif category == "Music":
-                button.clicked.connect(self.Music)
-
-            # Add button to the grid layout at the specified position
-            self.buttonLayout.addWidget(button, *position)
-            self.buttons.append(button)  # Keep track of button references
-
-        # Add the button layout to the main layout
-        self.layout.addLayout(self.buttonLayout)
+        :param text: The text in the window's search bar.
+        """
+        self.pending = None  # A direct call supersedes a debounced one
+        self.proxy.filter(text)
+        if self.callback is not None:
+            self.callback(text)
 
-        # Create a horizontal layout for navigation buttons
-        navLayout = QHBoxLayout()
+    def show_health(self, health):
+        # The delegate paints the badges, only the visible tiles have to be repainted
+        self.model.health = health
+        self.view.viewport().update()
 
-        # Create the "Previous" navigation button
-        self.prevButton = QPushButton("⬅", self)
-        self.prevButton.setStyleSheet(
-            "background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 30pt; padding: 20px;")
-        self.prevButton.clicked.connect(self.navigate_left)  # Connect button click to navigate_left method
 
-        # Create the "Next" navigation button
-        self.nextButton = QPushButton("➡", self)
-        self.nextButton.setStyleSheet(
-            "background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 30pt; padding: 20px;")
-        self.nextButton.clicked.connect(self.navigate_right)  # Connect button click to navigate_right method
+def is_large_section(name):
+    # True if a section has too many items for a button each; False for a section the catalog does not have
+    section = default_catalog().sections_by_name.get(name)
+    return section is not None and section.item_count > LARGE_SECTION_THRESHOLD
 
-        # Add navigation buttons to the navigation layout
-        navLayout.addWidget(self.prevButton, alignment=Qt.AlignLeft)  # Add "Previous" button aligned to the left
-        navLayout.addStretch()  # Add stretchable space between buttons
-        navLayout.addWidget(self.nextButton, alignment=Qt.AlignRight)  # Add "Next" button aligned to the right
 
-        # Add the navigation layout to the main layout
-        self.layout.addLayout(navLayout)
+def section_order():
+    # The sections the arrow buttons loop through, from left to right: the main menu sections in catalog order
+    return [section.name for section in default_catalog().menu_sections()]
 
-        # Set the final layout for the window
-        self.setLayout(self.layout)
-        self.setWindowTitle("Study Guides")  # Set window title
-        self.setGeometry(200, 200, 800, 600)  # Set window size and position
-        self.setStyleSheet("background-color: #121212;")  # Set window background color
 
-        # Initialize sort order for category buttons
-        self.ascending = True
+def section_neighbour(name, step):
+    """
+    Return the section the arrow buttons move to from a section.
 
-    def on_search(self):
-        """
-        Handles search functionality for filtering category buttons based on user input.
+    :param name: The section shown now.
+    :param step: -1 for the left arrow, 1 for the right arrow.
+    :return: The neighbour in section_order(), wrapping around; the first section if name is not on the main menu.
+    """
+    order = section_order()
+    if name not in order:
+        return order[0] if order else name
+    return order[(order.index(name) + step) % len(order)]
 
-        Hides buttons that do not match the search text and shows those that do.
-        The search is case-insensitive.
-        """
-        # Get the search text from the search bar and convert it to lowercase
-        search_text = self.searchBar.text().lower()
-
-        # Iterate through each button in the list of buttons
-        for button in self.buttons:
-            # Check if the search text is in the button's text (case-insensitive)
-            if search_text in button.text().lower():
-                button.show()  # Show the button if it matches the search text
-            else:
-                button.hide()  # Hide the button if it does not match the search text
 
-    def toggle_sort_order(self):
+class FirstPaintProbe(QObject):
+    def __init__(self, widget, profiler):
         """
-        Toggles the sort order of the category buttons between ascending and descending.
+        Tell the startup profiler when a window is painted for the first time, then write its report.
 
-        Updates the text of the sort button and re-sorts the buttons accordingly.
+        :param widget: The first window shown.
+        :param profiler: The StartupProfiler to notify.
         """
-        # Toggle the sort order
-        self.ascending = not self.ascending
-
-        # Update the text of the sort button based on the current sort order
-        self.azButton.setText("A - Z" if self.ascending else "Z - A")
-
-        # Re-sort the buttons based on the new sort order
-        self.sort_buttons()
+        super().__init__(widget)
+        self.profiler = profiler
+        widget.installEventFilter(self)
 
-    def sort_buttons(self):
-        """
-        Sorts the category buttons based on the current sort order and arranges them in the grid layout.
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            self.profiler.mark("first paint")
+            obj.removeEventFilter(self)
+            # The next loop iteration runs once the frame has been painted and flushed
+            QTimer.singleShot(0, self.finish)
+        return False
 
-        Buttons are sorted alphabetically, and the order is determined by the `ascending` attribute.
-        """
-        # Sort the buttons alphabetically based on their text
-        # If `ascending` is True, sort in ascending order; otherwise, sort in descending order
-        self.buttons.sort(key=lambda btn: btn.text(), reverse=not self.ascending)
+    def finish(self):
+        self.profiler.mark("first frame done")
+        self.profiler.finish()
 
-        # Re-add the buttons to the grid layout according to the sorted order
-        for i, button in enumerate(self.buttons):
-            # Calculate the position of the button in the grid layout
-            self.buttonLayout.addWidget(button, i // 2, i % 2)
 
-    def keyPressEvent(self, event):
+class InstanceServer(QObject):
+    def __init__(self, main_window):
         """
-        Handles key press events.
-
-        Sets focus to the search bar if any key is pressed.
+        Listen for later launches of the app and act on what they ask for.
 
-        :param event: The key press event.
-        """
-        # Check if the key press event has text (i.e., it's a character key)
-        if event.text():
-            # Set focus to the search bar
-            self.searchBar.setFocus()
+        A later launch finds the socket before it imports PyQt5, sends its command
+        line and exits (see instance.py); the main window then opens the section or
+        link or shows the search, so a repeat launch costs no second app.
 
-    def navigate_left(self):
+        :param main_window: The SearchApp that handles the requests.
         """
-        Navigates to the "Health Check-Up" window.
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)  # Only the same user can hand over
+        self.server.newConnection.connect(self.on_connection)
 
-        Closes the current window and opens the specified new window in the main window.
+    def listen(self, path=None):
         """
-        self.close()  # Close the current window
-        self.main_window.open_new_window("Health Check-Up")  # Open the "Health Check-Up" window in the main window
+        Start listening on the socket.
 
-    def navigate_right(self):
+        :param path: The socket, defaults to socket_path().
+        :return: False if another app already listens there, e.g. one started with --new-instance.
         """
-        Navigates to the "School Resources" window.
-
-        Closes the current window and opens the specified new window in the main window.
+        path = path or socket_path()
+        if self.server.listen(path):
+            return True
+        if not is_stale(path):
+            return False
+        QLocalServer.removeServer(path)  # Left behind by an app that crashed
+        return self.server.listen(path)
+
+    def close(self):
+        # Stop listening and remove the socket, called when the app quits
+        self.server.close()
+
+    def on_connection(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            connection.readyRead.connect(lambda connection=connection: self.on_request(connection))
+            connection.disconnected.connect(connection.deleteLater)
+
+    def on_request(self, connection):
+        # Read the request line, confirm it and act on it
+        if not connection.canReadLine():
+            if connection.bytesAvailable() > MAX_REQUEST_BYTES:
+                connection.abort()  # Not one of our launches
+            return
+        args = decode_request(bytes(connection.readLine()))
+        connection.write(b"ok\n" if args is not None else b"error\n")
+        connection.flush()
+        connection.disconnectFromServer()
+        if args is not None:
+            try:
+                options, _ = argument_parser().parse_known_args(split_qt_options(args)[0])
+            except SystemExit:
+                return  # Invalid options, argparse already said why on stderr
+            self.main_window.handle_request(options.request)
+
+
+def apply_window_state(window, state):
+    """
+    Put a window back in the state it was saved in: its search text and sort order.
+
+    :param window: A section window or the main menu.
+    :param state: Its window_state() dictionary.
+    """
+    if state["search"]:
+        window.searchBar.setText(state["search"])  # Filtered on the next timer tick
+    if state["sort"] != window.sort_order and state["sort"] in SORT_ORDERS:
+        window.sort_order = state["sort"]
+        window.azButton.setText(SORT_CAPTIONS[window.sort_order])
+        window.sort_buttons()
+
+
+class SessionRestorer(QObject):
+    def __init__(self, main_window, windows, then=None):
         """
-        self.close()  # Close the current window
-        self.main_window.open_new_window("School Resources")  # Open the "School Resources" window in the main window
+        Reopen the windows of the last session once the main menu is on screen.
 
-    def open_exam_techniques(self):
-        """
-        Opens the "Exam Techniques" window.
+        Nothing is rebuilt before the main menu is painted. Then one window is rebuilt
+        per event-loop tick, front-most first, so the window the student was using
+        comes back first and clicks and keystrokes are handled between windows.
 
-        Creates an instance of the ExamTechniquesWindow, shows it, and adds it to the list of open windows in the main window.
-        """
-        # Create an instance of the ExamTechniquesWindow
-        self.exam_techniques_window = ExamTechniquesWindow(self)
-        # Show the new window
-        self.exam_techniques_window.show()
-        # Add the new window to the list of open windows in the main window
-        self.main_window.open_windows.append(self.exam_techniques_window)
-
-    def open_note_taking_tips(self):
+        :param main_window: The SearchApp that opens the windows.
+        :param windows: window_state() of every window to reopen, front-most first.
+        :param then: Optional function called once every window is back.
         """
-        Opens a web page with note-taking tips in the default web browser.
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.queue = list(windows)
+        self.then = then
+        self.restored = []  # Windows reopened so far, front-most first
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.restore_next)
+        main_window.installEventFilter(self)
+        QTimer.singleShot(1000, self.start)  # In case the main menu never paints, e.g. it starts minimised
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            QTimer.singleShot(0, self.start)  # Once the frame has been painted and flushed
+        return False
+
+    def start(self):
+        if self.main_window is not None and not self.timer.isActive():
+            self.main_window.removeEventFilter(self)
+            self.timer.start()
+
+    def restore_next(self):
+        # Reopen one window, or finish once the queue is empty
+        sections = {section.name for section in default_catalog().sections}
+        while self.queue:
+            state = self.queue.pop(0)
+            if state["name"] in sections:  # The catalog may have changed since the session was saved
+                self.main_window.open_new_window(state["name"], record_usage=False)
+                window = self.main_window.new_window
+                apply_window_state(window, state)
+                self.restored.append(window)
+                return
+
+        self.timer.stop()
+        if self.restored:
+            # Each reopened window came to the front, put the one that was in front back on top
+            front = self.restored[0].window()
+            front.raise_()
+            front.activateWindow()
+        if self.then is not None:
+            self.then()
+        self.main_window = None  # Done, a late start() does nothing
+
+
+class WindowManager(QObject):
+    def __init__(self, max_windows=WINDOW_CACHE_LIMIT, max_bytes=WINDOW_MEMORY_LIMIT,
+                 idle_timeout=WINDOW_IDLE_TIMEOUT):
         """
-        # URL of the note-taking tips page
-        url = "https://students.unimelb.edu.au/academic-skills/resources/reading,-writing-and-referencing/reading-and-note-taking/note-taking"
-        # Open the URL in the default web browser
-        QDesktopServices.openUrl(QUrl(url))
+        Keep one live window per category and show it again instead of rebuilding it.
 
-    def open_revision_techniques(self):
-        """
-        Opens the "Revision Techniques" window.
+        Hidden windows are freed when there are more than max_windows of them,
+        when they use more than max_bytes together, or when they have not been
+        used for idle_timeout seconds. Visible windows are never freed.
 
-        Creates an instance of the RevisionTechniquesWindow, shows it, and adds it to the list of open windows in the main window.
+        :param max_windows: Maximum number of windows kept alive.
+        :param max_bytes: Rough memory budget for the cached windows, 0 for no limit.
+        :param idle_timeout: Seconds after which an unused hidden window is freed.
         """
-        # Create an instance of the RevisionTechniquesWindow
-        self.revision_techniques_window = RevisionTechniquesWindow(self)
-        # Show the new window
-        self.revision_techniques_window.show()
-        # Add the new window to the list of open windows in the main window
-        self.main_window.open_windows.append(self.revision_techniques_window)
-
-    def Music(self):
+        super().__init__()
+        self.max_windows = max_windows
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self.windows = OrderedDict()  # Window per category, least recently used first
+        self.last_used = {}  # When each window was last shown
+
+        # Check for idle windows once a minute
+        self.idleTimer = QTimer(self)
+        self.idleTimer.setInterval(60 * 1000)
+        self.idleTimer.timeout.connect(self.trim)
+        self.idleTimer.start()
+
+    def show_window(self, name, factory, record_usage=True):
         """
-        Opens the "Music" window.
+        Show the window for a category, building it with factory only if there is no live one.
 
-        Creates an instance of the Music window, shows it, and adds it to the list of open windows in the main window.
+        :param name: Category name of the window, e.g. "Study Guides".
+        :param factory: Callable that creates the window.
+        :param record_usage: False when the window is not opened by the student, e.g. when a session is restored.
+        :return: The window that is now shown.
         """
-        # Create an instance of the Music window
-        self.Music = Music(self)
-        # Show the new window
-        self.Music.show()
-        # Add the new window to the list of open windows in the main window
-        self.main_window.open_windows.append(self.Music)
-
-    def Bored(self):
+        if record_usage:
+            usage_log().record(name)  # Sections opened often move up in the "most used" order
+        window = self.windows.get(name)
+        if window is None:
+            window = factory()
+            window.installEventFilter(self)  # Notice when the window is closed
+            self.windows[name] = window
+        else:
+            self.windows.move_to_end(name)  # Mark it as the most recently used window
+        self.last_used[name] = time.monotonic()
+
+        # Bring the window back to the front, even if it was minimised
+        if window.isMinimized():
+            window.showNormal()
+        window.show()
+        window.raise_()
+        window.activateWindow()
+
+        self.trim()
+        return window
+
+    def visible_windows(self):
+        # Windows that are currently open on screen
+        return [window for window in self.windows.values() if window.isVisible()]
+
+    def eventFilter(self, watched, event):
+        # A closed window is only hidden; check the budget once the close has finished
+        if event.type() == QEvent.Close:
+            QTimer.singleShot(0, self.trim)
+        return False
+
+    def trim(self):
         """
-        Opens a web page to a site for entertainment in the default web browser.
-        """
-        # URL of the entertainment site
-        url = "http://mentalfloss.com/"
-        # Open the URL in the default web browser
-        QDesktopServices.openUrl(QUrl(url))
-
-    def Study_Guide_Videos(self):
+        Free hidden windows until the cache is back within its count, memory and idle budget.
         """
-        Opens a YouTube playlist with study guide videos in the default web browser.
+        now = time.monotonic()
+        total_bytes = sum(estimate_window_bytes(window) for window in self.windows.values()) if self.max_bytes else 0
+
+        # Walk from the least to the most recently used window
+        for name in list(self.windows):
+            window = self.windows[name]
+            if window.isVisible():
+                continue
+            over_count = len(self.windows) > self.max_windows
+            over_memory = self.max_bytes and total_bytes > self.max_bytes
+            idle = now - self.last_used[name] > self.idle_timeout
+            if over_count or over_memory or idle:
+                total_bytes -= estimate_window_bytes(window) if self.max_bytes else 0
+                self.release(name)
+
+    def release(self, name):
+        # Drop our references and let Qt delete the window and all of its children
+        window = self.windows.pop(name)
+        del self.last_used[name]
+        window.removeEventFilter(self)
+        window.close()
+        window.deleteLater()
+
+    def close_all(self):
+        # Close and free every window, used when the main window closes
+        for name in list(self.windows):
+            self.release(name)
+
+
+def estimate_window_bytes(window):
+    # Rough memory use of a window: a fixed cost per widget plus the pixels of its images
+    total = 4096 * (len(window.findChildren(QWidget)) + 1)
+    for label in window.findChildren(QLabel):
+        pixmap = label.pixmap()
+        if pixmap is not None and not pixmap.isNull():
+            total += pixmap.width() * pixmap.height() * pixmap.depth() // 8
+    for image in window.findChildren(ScaledImage):
+        total += image.image_bytes()
+    return total
+
+class SectionNavigator(QWidget):
+    def __init__(self, main_window):
         """
-        # URL of the YouTube playlist
-        url = "https://www.youtube.com/watch?v=eAj8AC5RmSg&list=PLSjrnIOGvOq36-ESQSyO-gK6B0gCSm6Hg&pp=iAQB"
-        # Open the URL in the default web browser
-        QDesktopServices.openUrl(QUrl(url))
+        Single window that shows the sections as pages instead of separate windows.
 
+        Switching to a page that is already built is instant. After every switch the
+        left and right neighbours are built while the event loop is idle, so the next
+        arrow press does not have to wait for initUI.
 
-class Music(QWidget):
-    def __init__(self, main_window):
+        :param main_window: Reference to the main window that creates the section pages.
+        """
         super().__init__()
-        # Store the reference to the main window
         self.main_window = main_window
-        # Initialize the UI
-        self.initUI()
-
-    def initUI(self):
-        # Create the main vertical layout
-        self.layout = QVBoxLayout()
-
-        # Create the top bar layout
-        topLayout = QHBoxLayout()
-
-        # Create the "A-Z" toggle button with style and connect its signal to the toggle_sort_order method
-        self.azButton = QPushButton("A - Z", self)
-        self.azButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
-        self.azButton.clicked.connect(self.toggle_sort_order)
-
-        # Create the search bar with placeholder text and connect its signal to the on_search method
-        self.searchBar = QLineEdit(self)
-        self.searchBar.setPlaceholderText("Search...")
-        self.searchBar.textChanged.connect(self.on_search)
-        self.searchBar.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
-
-        # Add widgets to the top bar layout
-        topLayout.addWidget(self.azButton, alignment=Qt.AlignLeft)
-        topLayout.addStretch()  # Add stretchable space between widgets
-        topLayout.addWidget(self.searchBar, alignment=Qt.AlignRight)
-
-        # Add the top bar layout to the main layout
-        self.layout.addLayout(topLayout)
-
-        # Create the main buttons layout (grid layout) with spacing
-        self.buttonLayout = QGridLayout()
-        self.buttonLayout.setSpacing(20)
-
-        # Define the categories and initialize the buttons list
-        self.categories = ["Classical Music Playlist Online", "Download Classical Music", "Ambient Music Playlist Online", "Download Ambient Music", "Facts About Music"]
-        self.buttons = []
+        self.pages = {}  # Section page per category, built on demand
+        self.prefetch_queue = []  # Neighbour sections still waiting to be built
+
+        # Build one queued page per timer tick so input events are handled in between
+        self.prefetchTimer = QTimer(self)
+        self.prefetchTimer.setInterval(0)
+        self.prefetchTimer.timeout.connect(self.prefetch_next)
+
+        # The stack holds every page, only the current one is visible
+        self.stack = QStackedWidget(self)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.stack)
+        self.setLayout(layout)
+
+        self.setGeometry(200, 200, 800, 600)  # Same size and position as the section windows
+        tag(self, "window")
+
+    def page(self, category):
+        # Return the page for a category, building it the first time it is needed
+        page = self.pages.get(category)
+        if page is None:
+            page = self.main_window.create_window(category)
+            self.stack.addWidget(page)
+            self.pages[category] = page
+        return page
+
+    def show_section(self, category, record_usage=True):
+        """
+        Switch to the page of a section and queue its neighbours for building.
 
-        # Define positions for the buttons in a grid layout
-        positions = [(0, 0), (0, 1), (1, 0), (1, 1), (1, 2)]  # Adjust button positions in a grid layout
+        :param category: Name of the section, one of section_order().
+        :param record_usage: False when the section is not opened by the student, e.g. when a session is restored.
+        """
+        if record_usage:
+            usage_log().record(category)
+        page = self.page(category)
+        self.stack.setCurrentWidget(page)
+        self.setWindowTitle(page.windowTitle())
+
+        # Queue the left and right neighbours so they are ready before the next arrow press
+        neighbours = [section_neighbour(category, -1), section_neighbour(category, 1)]
+        self.prefetch_queue = [name for name in neighbours if name not in self.pages]
+        if self.prefetch_queue:
+            self.prefetchTimer.start()
+        return page
+
+    def prefetch_next(self):
+        # Build one neighbour page while the event loop has nothing else to do
+        while self.prefetch_queue:
+            category = self.prefetch_queue.pop(0)
+            if category not in self.pages:
+                self.page(category)
+                break
+        if not self.prefetch_queue:
+            self.prefetchTimer.stop()
 
-        # Create buttons for each category and add them to the grid layout
-        for position, category in zip(positions, self.categories):
-            button = QPushButton(category, self)
-            button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-            button.setMinimumSize(150, 100)
-            button.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-            self.buttonLayout.addWidget(button, *position)
-            self.buttons.append(button)
-
-        # Connect the buttons to their respective methods
-        self.buttons[0].clicked.connect(self.open_classical_playlist)
-        self.buttons[1].clicked.connect(self.open_download_classical_music)
-        self.buttons[2].clicked.connect(self.open_ambient_playlist)
-        self.buttons[3].clicked.connect(self.open_download_Ambient_music)
-        self.buttons[4].clicked.connect(self.open_facts_classical_music)
-
-        # Add the button layout to the main layout
-        self.layout.addLayout(self.buttonLayout)
+    def keyPressEvent(self, event):
+        # Pass typing on to the current page so it can focus its search bar
+        page = self.stack.currentWidget()
+        if page is not None:
+            page.keyPressEvent(event)
 
-        # Set the main layout for the widget
-        self.setLayout(self.layout)
 
-        # Set the window title, geometry, and background color
-        self.setWindowTitle("Music")
-        self.setGeometry(200, 200, 800, 600)
-        self.setStyleSheet("background-color: #121212;")
+# Define the main application class inheriting from QWidget
+class SearchApp(QWidget):
+    # Emitted from the link check thread with the new results, delivered on the GUI thread
+    linksChecked = pyqtSignal(object)
+    # Emitted from a background thread with the full-text index of the saved pages
+    pagesIndexed = pyqtSignal(object)
+    # Emitted from a background thread with the search index over every section
+    searchIndexed = pyqtSignal(object)
+
+    def __init__(self, single_window=False):
+        """
+        :param single_window: Show the sections as pages of one window instead of separate windows.
+        """
+        super().__init__()  # Call the constructor of the base class
 
-        # Initialize sorting order flag
-        self.ascending = True
+        self.single_window = single_window  # Use the SectionNavigator for the sections
+        self.windows = WindowManager()  # Keeps one reusable window per category
+        self.engine = None  # Search index over every section, built in the background once the window is painted
+        self.scanner = None  # Searches without an index until the engine is ready
+        self.index_thread = None  # The thread building the engine
+        self.page_index = None  # Full-text index of the saved pages, loaded in the background
+        self.items_by_url = None  # Catalog item of every URL, for the full-text hits
+        self.session_saved = False  # The session is saved once, when the main menu closes or the app quits
+        self.initUI()  # Initialize the user interface
 
-    def on_search(self):
-        # Filter buttons based on the search text
-        search_text = self.searchBar.text().lower()
-        for button in self.buttons:
-            if search_text in button.text().lower():
-                button.show()
-            else:
-                button.hide()
+        # Build the search index in the background once the main menu is on screen, so it never delays the first paint
+        self.installEventFilter(self)
 
-    def toggle_sort_order(self):
-        # Toggle the sorting order and update the button text
-        self.ascending = not self.ascending
-        self.azButton.setText("A - Z" if self.ascending else "Z - A")
-        self.sort_buttons()
+        # Links open in the background; tell the user when one could not be opened
+        url_launcher().finished.connect(self.on_url_opened)
+        self.linksChecked.connect(self.on_links_checked)
+        self.pagesIndexed.connect(self.on_pages_indexed)
+        self.searchIndexed.connect(self.on_search_indexed)
 
-    def sort_buttons(self):
-        # Sort buttons based on their text
-        self.buttons.sort(key=lambda btn: btn.text(), reverse=not self.ascending)
-        # Reposition the sorted buttons in the grid layout
-        for i, button in enumerate(self.buttons):
-            self.buttonLayout.addWidget(button, i // 2, i % 2)
-
-    def keyPressEvent(self, event):
-        # Set focus to the search bar when a key is pressed
-        if event.text():
-            self.searchBar.setFocus()
-
-    def open_classical_playlist(self):
-        # Open the Classical Music Playlist URL
-        url = QUrl("https://open.spotify.com/playlist/37i9dQZF1EIgLoMVUd9oTU?si=277772aacf784ef9")
-        QDesktopServices.openUrl(url)
-
-    def open_download_classical_music(self):
-        # Open the Download Classical Music URL
-        url = QUrl("https://drive.google.com/file/d/15B4AxAbCoicKXOWRczpRS2yQP0e1ngN6/view?usp=sharing")
-        QDesktopServices.openUrl(url)
-
-    def open_ambient_playlist(self):
-        # Open the Ambient Music Playlist URL
-        url = QUrl("https://open.spotify.com/playlist/5iPjgCLzMr8r5VYmUOV6tp?si=92945c48a4a14a53")
-        QDesktopServices.openUrl(url)
-
-    def open_facts_classical_music(self):
-        # Open the Facts About Music URL
-        url = QUrl("https://www.healthline.com/health/does-music-help-you-study")
-        QDesktopServices.openUrl(url)
-
-    def open_download_Ambient_music(self):
-        # Open the Download Ambient Music URL
-        url = QUrl("https://drive.google.com/file/d/19QvmzaxXLTB-ZpznusOm7B-WShBpeJmu/view?usp=sharing")
-        QDesktopServices.openUrl(url)
-
-class RevisionTechniquesWindow(QWidget):
-    def __init__(self, parent_window):
-        super().__init__()
-        # Store the reference to the parent window
-        self.parent_window = parent_window
-        # Initialize the UI
-        self.initUI()
+    @property
+    def open_windows(self):
+        # The windows that are currently open
+        return self.windows.visible_windows()
 
+    @PROFILER.timed
     def initUI(self):
-        # Create the main vertical layout
+        # Initialize the main layout as a vertical box layout
         self.layout = QVBoxLayout()
 
-        # Create the top bar layout
+        # Create the top bar layout as a horizontal box layout
         topLayout = QHBoxLayout()
 
-        # Create the "A-Z" toggle button with style and connect its signal to the toggle_sort_order method
+        # Create the "A-Z" toggle button with styles and connect its click event
         self.azButton = QPushButton("A - Z", self)
-        self.azButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
+        tag(self.azButton, "bar")
         self.azButton.clicked.connect(self.toggle_sort_order)
 
-        # Create the search bar with placeholder text and connect its signal to the on_search method
+        # Create the search bar with styles and connect its text change event
         self.searchBar = QLineEdit(self)
         self.searchBar.setPlaceholderText("Search...")
         self.searchBar.textChanged.connect(self.on_search)
-        self.searchBar.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
+        tag(self.searchBar, "bar")
 
         # Add widgets to the top bar layout
         topLayout.addWidget(self.azButton, alignment=Qt.AlignLeft)
-        topLayout.addStretch()  # Add stretchable space between widgets
+        topLayout.addStretch()  # Add stretch to push the search bar to the right
         topLayout.addWidget(self.searchBar, alignment=Qt.AlignRight)
 
         # Add the top bar layout to the main layout
         self.layout.addLayout(topLayout)
 
-        # Create the main buttons layout (grid layout) with spacing
+        # Create the main buttons layout as a grid layout
         self.buttonLayout = QGridLayout()
-        self.buttonLayout.setSpacing(10)  # Adjust spacing between cells
+        self.buttonLayout.setSpacing(20)  # Set spacing between buttons
 
-        # Define the categories and initialize the buttons list
-        self.categories = ["UK nidirect", "Iglu Guide"]
+        # Define the categories (the catalog sections shown on the main menu) and their positions
+        sections = default_catalog().menu_sections()
+        self.categories = [section.name for section in sections]
         self.buttons = []
+        positions = grid_positions(len(sections), [(0, 0), (0, 1), (1, 0), (1, 1)])  # Define button positions
 
-        # Define positions for the buttons in a grid layout
-        positions = [(0, 1), (2, 0)]  # Define button positions in a grid layout
-
-        # Create buttons for each category and add them to the grid layout
-        for position, category in zip(positions, self.categories):
+        # Create buttons for each category with styles and connect their click events
+        for position, section in zip(positions, sections):
+            category = section.name
             button = QPushButton(category, self)
-            button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-            button.setMaximumSize(400, 400)  # Set maximum size for the buttons
+            button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)  # Set button size policy
+            button.setMinimumSize(150, 100)  # Set minimum size
 
-            # Apply different styles based on the category
-            if category == "UK nidirect":
-                button.setStyleSheet("background-color: #560BAD; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-            elif category == "Iglu Guide":
-                button.setStyleSheet("background-color: #3F37C9; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
+            # Each category has its own colour in the catalog
+            tag(button, "tile", section.colour)
 
-            # Connect the button click to the open_new_window method
+            # Connect button click to open a new window corresponding to the category
             button.clicked.connect(lambda checked, cat=category: self.open_new_window(cat))
-            self.buttonLayout.addWidget(button, *position)
-            self.buttons.append(button)
-
-        # Add image labels
-        self.imageLabel1 = QLabel(self)
-        pixmap1 = QPixmap("stressed_student.png")
-        scaled_pixmap1 = pixmap1.scaled(400, 400, Qt.KeepAspectRatio, transformMode=Qt.SmoothTransformation)
-        self.imageLabel1.setPixmap(scaled_pixmap1)
-        self.imageLabel1.setAlignment(Qt.AlignCenter)
-        self.imageLabel1.setMaximumSize(400, 400)  # Set maximum size for the image label
-        self.buttonLayout.addWidget(self.imageLabel1, 0, 0, 2, 1, Qt.AlignCenter)  # Align center within its cell and span 2 rows
-
-        self.imageLabel2 = QLabel(self)
-        pixmap2 = QPixmap("happy_student.jpg")
-        scaled_pixmap2 = pixmap2.scaled(400, 400, Qt.KeepAspectRatio, transformMode=Qt.SmoothTransformation)
-        self.imageLabel2.setPixmap(scaled_pixmap2)
-        self.imageLabel2.setAlignment(Qt.AlignCenter)
-        self.imageLabel2.setMaximumSize(400, 400)  # Set maximum size for the image label
-        self.buttonLayout.addWidget(self.imageLabel2, 2, 1, 1, 1, Qt.AlignCenter)  # Align center within its cell
-
-        # Adjust cell spacing and margins for closer alignment
-        self.buttonLayout.setContentsMargins(10, 10, 10, 10)
-        self.buttonLayout.setHorizontalSpacing(10)
-        self.buttonLayout.setVerticalSpacing(10)
-
-        # Add the button layout to the main layout
-        self.layout.addLayout(self.buttonLayout)
-
-        # Set the main layout for the widget
-        self.setLayout(self.layout)
-
-        # Set the window title, geometry, and background color
-        self.setWindowTitle("Revision Techniques")
-        self.setGeometry(100, 100, 800, 600)
-        self.setStyleSheet("background-color: #121212;")
-
-        # Initialize sorting order flag
-        self.ascending = True
-
-    def keyPressEvent(self, event):
-        # Set focus to the search bar when a key is pressed
-        if event.text():
-            self.searchBar.setFocus()
-
-    def on_search(self):
-        # Filter buttons based on the search text
-        search_text = self.searchBar.text().lower()
-        for button in self.buttons:
-            if search_text in button.text().lower():
-                button.show()
-            else:
-                button.hide()
-
-    def toggle_sort_order(self):
-        # Toggle the sorting order and update the button text
-        self.ascending = not self.ascending
-        self.azButton.setText("A - Z" if self.ascending else "Z - A")
-        # No sorting action performed
-
-    def open_new_window(self, category):
-        # Open a new window based on the category
-        if category == "UK nidirect":
-            QDesktopServices.openUrl(QUrl("https://www.nidirect.gov.uk/articles/revision-tips-preparing-exams"))
-        elif category == "Iglu Guide":
-            QDesktopServices.openUrl(QUrl("https://iglu.com.au/best-revision-techniques/"))
-
-class ExamTechniquesWindow(QWidget):
-    def __init__(self, parent_window):
-        super().__init__()
-        # Store the reference to the parent window
-        self.parent_window = parent_window
-        # Initialize the UI
-        self.initUI()
-
-    def initUI(self):
-        # Create the main vertical layout
-        self.layout = QVBoxLayout()
-
-        # Create the top bar layout
-        topLayout = QHBoxLayout()
-
-        # Create the "A-Z" toggle button with style and connect its signal to the toggle_sort_order method
-        self.azButton = QPushButton("A - Z", self)
-        self.azButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
-        self.azButton.clicked.connect(self.toggle_sort_order)
-
-        # Create the search bar with placeholder text and connect its signal to the on_search method
-        self.searchBar = QLineEdit(self)
-        self.searchBar.setPlaceholderText("Search...")
-        self.searchBar.textChanged.connect(self.on_search)
-        self.searchBar.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
-
-        # Add widgets to the top bar layout
-        topLayout.addWidget(self.azButton, alignment=Qt.AlignLeft)
-        topLayout.addStretch()  # Add stretchable space between widgets
-        topLayout.addWidget(self.searchBar, alignment=Qt.AlignRight)
-
-        # Add the top bar layout to the main layout
-        self.layout.addLayout(topLayout)
+            self.buttonLayout.addWidget(button, *position)  # Add button to the grid layout
+            self.buttons.append(button)  # Add button to the list of buttons
 
-        # Create the main buttons layout (grid layout) with spacing
-        self.buttonLayout = QGridLayout()
-        self.buttonLayout.setSpacing(10)  # Adjust spacing between cells
+        # Ranks and lays out the tiles, then lists the matching items of every section
+        self.tiles = TileGrid(self.buttonLayout, self.buttons, positions, callback=self.show_results)
 
-        # Define the categories and initialize the buttons list
-        self.categories = ["Western Australia Uni", "Self Help Website", "The StudySpace"]
-        self.buttons = []
+        # Add the buttons layout to the main layout
+        self.layout.addLayout(self.buttonLayout)
 
-        # Define positions for the buttons in a grid layout
-        positions = [(0, 0), (1, 0), (2, 0)]  # Define button positions in a grid layout
+        # Create the list of matching items from every section, shown while searching
+        self.resultsList = QListWidget(self)
+        tag(self.resultsList, "results")
+        self.resultsList.itemClicked.connect(self.open_search_result)
+        self.resultsList.hide()  # Hidden until something is typed
+        self.layout.addWidget(self.resultsList)
+        self.searchBar.returnPressed.connect(self.open_first_result)  # Enter opens the best match
 
-        # Create buttons for each category and add them to the grid layout
-        for position, category in zip(positions, self.categories):
-            button = QPushButton(category, self)
-            button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-            button.setMinimumSize(150, 100)  # Set minimum size for the buttons
-
-            # Apply different styles based on the category
-            if category == "Western Australia Uni":
-                button.setStyleSheet("background-color: #560BAD; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-            elif category == "Self Help Website":
-                button.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-            elif category == "The StudySpace":
-                button.setStyleSheet("background-color: #3F37C9; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-
-            # Connect the button click to the open_new_window method
-            button.clicked.connect(lambda checked, cat=category: self.open_new_window(cat))
-            self.buttonLayout.addWidget(button, *position)
-            self.buttons.append(button)
-
-        # Add image labels
-        self.imageLabel1 = QLabel(self)
-        pixmap1 = QPixmap("perfection.jpg")
-        scaled_pixmap1 = pixmap1.scaled(400, 500, Qt.KeepAspectRatio, transformMode=Qt.SmoothTransformation)
-        self.imageLabel1.setPixmap(scaled_pixmap1)
-        self.imageLabel1.setAlignment(Qt.AlignCenter)
-        self.imageLabel1.setMaximumSize(400, 500)  # Set maximum size for the image label
-        self.buttonLayout.addWidget(self.imageLabel1, 0, 1, 2, 1, Qt.AlignCenter)  # Align center within its cell and span 2 rows
-
-        self.imageLabel2 = QLabel(self)
-        pixmap2 = QPixmap("harvard_student.jpg")
-        scaled_pixmap2 = pixmap2.scaled(400, 400, Qt.KeepAspectRatio, transformMode=Qt.SmoothTransformation)
-        self.imageLabel2.setPixmap(scaled_pixmap2)
-        self.imageLabel2.setAlignment(Qt.AlignCenter)
-        self.imageLabel2.setMaximumSize(400, 400)  # Set minimum size for the image label
-        self.buttonLayout.addWidget(self.imageLabel2, 2, 1, 1, 1, Qt.AlignCenter)  # Align center within its cell
-
-        # Adjust cell spacing and margins for closer alignment
-        self.buttonLayout.setContentsMargins(10, 10, 10, 10)
-        self.buttonLayout.setHorizontalSpacing(10)
-        self.buttonLayout.setVerticalSpacing(10)
-
-        # Add the button layout to the main layout
-        self.layout.addLayout(self.buttonLayout)
+        self.setLayout(self.layout)  # Set the main layout
 
-        # Set the main layout for the widget
-        self.setLayout(self.layout)
+        self.setWindowTitle("Main Menu")  # Set the window title
+        self.setGeometry(100, 100, 800, 600)  # Set the window size and position
+        tag(self, "window")  # Set the background color
 
-        # Set the window title, geometry, and background color
-        self.setWindowTitle("Exam Techniques")
-        self.setGeometry(100, 100, 800, 600)
-        self.setStyleSheet("background-color: #121212;")
+        # Ctrl+T switches every open window between the dark, light and high-contrast themes
+        self.themeShortcut = QShortcut(QKeySequence("Ctrl+T"), self)
+        self.themeShortcut.setContext(Qt.ApplicationShortcut)
+        self.themeShortcut.activated.connect(theme.cycle)
 
-        # Initialize sorting order flag
-        self.ascending = True
+        self.sort_order = "az"  # A - Z until the sort button is pressed
 
     def keyPressEvent(self, event):
-        # Set focus to the search bar when a key is pressed
+        # Override the key press event to set focus on the search bar when any key is pressed
         if event.text():
             self.searchBar.setFocus()
 
     def on_search(self):
-        # Filter buttons based on the search text
-        search_text = self.searchBar.text().lower()
-        for button in self.buttons:
-            if search_text in button.text().lower():
-                button.show()
-            else:
-                button.hide()
+        # Rank the buttons against the search text once typing pauses for a frame
+        self.tiles.filter_later(self.searchBar.text().lower())
+
+    def show_results(self, search_text):
+        # Search the items of every section as well and list the best matches with their section
+        # Equally good matches are listed most used first; the engine's list may be cached, so sort a copy
+        usage = usage_log()
+        hits = sorted(self.search_engine().search(search_text),
+                      key=lambda hit: (-hit.score, -usage.score(hit.item.url or hit.item.window)))
+        self.resultsList.clear()
+        for hit in hits:
+            entry = QListWidgetItem("%s  —  %s" % (hit.item.title, hit.item.section))
+            entry.setData(Qt.UserRole, hit.item)  # Remember the catalog item behind the entry
+            self.resultsList.addItem(entry)
+
+        # Then the items whose page talks about the search text, e.g. "pomodoro" finds the revision guides
+        for item in self.page_results(search_text, {hit.item for hit in hits}):
+            entry = QListWidgetItem("%s  —  %s  (on the page)" % (item.title, item.section))
+            entry.setData(Qt.UserRole, item)
+            self.resultsList.addItem(entry)
+        self.resultsList.setVisible(self.resultsList.count() > 0)
+
+    def page_results(self, search_text, shown):
+        """
+        Return the catalog items whose saved page matches the search text, best BM25 match first.
 
-    def toggle_sort_order(self):
-        # Toggle the sorting order and update the button text
-        self.ascending = not self.ascending
-        self.azButton.setText("A - Z" if self.ascending else "Z - A")
-        # Call sort_buttons method to reorder the buttons
-        self.sort_buttons()
+        :param search_text: Text typed into the search bar.
+        :param shown: Items already listed as title matches, left out here.
+        """
+        if self.page_index is None:
+            return []
+        if self.items_by_url is None:
+            self.items_by_url = {}
+            for item in default_catalog().all_items():
+                if item.url:
+                    self.items_by_url.setdefault(item.url, item)
+        items = []
+        for hit in self.page_index.search(search_text, PAGE_RESULT_LIMIT + len(shown)):
+            item = self.items_by_url.get(hit.url)
+            if item is not None and item not in shown and len(items) < PAGE_RESULT_LIMIT:
+                items.append(item)
+        return items
+
+    def load_page_index(self):
+        # Read the full-text index of the saved pages without blocking the window
+        import fulltext  # Imported here, it is only needed once pages have been saved
+
+        thread = threading.Thread(target=lambda: self.pagesIndexed.emit(fulltext.open_index()), daemon=True)
+        thread.start()
+
+    def on_pages_indexed(self, index):
+        # A new full-text index is ready; search with it from the next keystroke on
+        if index is not None:
+            self.page_index = index
+
+    def on_url_opened(self, url, ok, message):
+        # Show the outcome of a link next to the mouse, in whichever window it was clicked
+        if ok:
+            QToolTip.showText(QCursor.pos(), message or "Opened in your web browser")
+        else:
+            QToolTip.showText(QCursor.pos(), "Could not open %s\n%s" % (url, message))
+
+    def check_links(self):
+        """
+        Show the cached link check results, then check the links that are due, in a background thread.
+        """
+        import linkcheck  # Imported here, asyncio would add to the startup time
 
-    def sort_buttons(self):
-        # Sort the buttons based on their text
-        self.buttons.sort(key=lambda btn: btn.text(), reverse=not self.ascending)
-        # Re-add buttons to the layout in the new order
-        for i, button in enumerate(self.buttons):
-            self.buttonLayout.addWidget(button, i, 0)
-
-    def open_new_window(self, category):
-        # Open a new window based on the category
-        if category == "Western Australia Uni":
-            QDesktopServices.openUrl(QUrl("https://www.uwa.edu.au/seek-wisdom/seekers-space/study/study-tips/2023/09/7-exam-tips-to-help-you-succeed"))
-        elif category == "Self Help Website":
-            QDesktopServices.openUrl(QUrl("https://www.wikihow.com/Main-Page"))
-        elif category == "The StudySpace":
-            QDesktopServices.openUrl(QUrl("https://www.thestudyspace.com/page/exam-techniques/"))
-
-class SchoolResourcesWindow(QWidget):
-    def __init__(self, main_window):
-        super().__init__()
-        # Store the reference to the main window
-        self.main_window = main_window
-        # Initialize the UI
-        self.initUI()
+        # Reading the cache and the catalog links happens in the thread too, only results come back
+        linkcheck.check_in_background(lambda: linkcheck.catalog_urls(default_catalog()), self.emit_links_checked)
 
-    def initUI(self):
-        # Create the main vertical layout
-        self.layout = QVBoxLayout()
+    def emit_links_checked(self, results):
+        # Called from the link check thread; the app may already be closing
+        try:
+            self.linksChecked.emit(results)
+        except RuntimeError:
+            pass
 
-        # Create the top bar layout
-        topLayout = QHBoxLayout()
+    def on_links_checked(self, results):
+        # New results arrived from the background check
+        LINK_HEALTH.update(results)
+        self.show_link_health()
 
-        # Create the "A-Z" toggle button with style and connect its signal to the toggle_sort_order method
-        self.azButton = QPushButton("A - Z", self)
-        self.azButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
-        self.azButton.clicked.connect(self.toggle_sort_order)
+    def prefetch_pages(self):
+        """
+        Save the catalog pages for offline use in a background thread, skipping links known to be broken,
+        and update the full-text index from them.
+        """
+        import fulltext
+        import linkcheck  # Imported here, asyncio would add to the startup time
+        import pagecache
+
+        # Called in the prefetch thread, like reading the saved pages' details: only the index comes back
+        urls = lambda: [url for url in linkcheck.catalog_urls(default_catalog())
+                        if not linkcheck.has_problem(LINK_HEALTH.get(url))]
+        cache = pagecache.PageCache()
+
+        def index_pages(outcomes):
+            # Index the pages that were saved or changed once they are downloaded, or catch up if none were due
+            index = fulltext.build_index(cache)
+            try:
+                self.pagesIndexed.emit(index)
+            except RuntimeError:
+                pass  # The app closed meanwhile
+
+        pagecache.prefetch_in_background(urls, cache, callback=index_pages)
+
+    def show_link_health(self):
+        # Update the badges of every window that is alive, including the pages of the section navigator
+        windows = list(self.windows.windows.values())
+        for window in list(windows):
+            windows.extend(getattr(window, "pages", {}).values())
+        for window in windows:
+            tiles = getattr(window, "tiles", None)
+            if tiles is not None:
+                tiles.show_health(LINK_HEALTH)
+
+    def eventFilter(self, watched, event):
+        # The main menu was painted for the first time: start building the search index
+        if watched is self and event.type() == QEvent.Paint:
+            self.removeEventFilter(self)
+            QTimer.singleShot(0, self.build_search_index)
+        return False
+
+    def build_search_index(self):
+        # Build the search index over every catalog item in a background thread
+        if self.engine is not None or self.index_thread is not None:
+            return
+
+        def build():
+            engine = SearchEngine(default_catalog().all_items())
+            try:
+                self.searchIndexed.emit(engine)
+            except RuntimeError:
+                pass  # The main menu was closed and deleted meanwhile
+
+        self.index_thread = threading.Thread(target=build, daemon=True)
+        self.index_thread.start()
+
+    def on_search_indexed(self, engine):
+        # The index is ready: search with it from now on, and redo a search that was answered without it
+        self.engine = engine
+        self.scanner = None
+        if self.searchBar.text():
+            self.show_results(self.tiles.text)
+
+    def search_engine(self):
+        # The search index once it is built; until then every item is scanned, so searching works straight away
+        if self.engine is not None:
+            return self.engine
+        if self.scanner is None:
+            self.scanner = ScanSearch(default_catalog())
+        return self.scanner
+
+    def open_search_result(self, entry):
+        # Open the catalog item behind a search result
+        self.open_item(entry.data(Qt.UserRole))
+
+    def open_item(self, item):
+        # Open the URL of an item, or its window if it is a sub-section such as "Music"
+        if item.url:
+            url_launcher().open(item.url)
+        else:
+            self.open_new_window(item.window)
+
+    def handle_request(self, words):
+        """
+        Act on the words given on the command line, e.g. "open Health Check-Up" or "search pomodoro".
 
-        # Create the search bar with placeholder text and connect its signal to the on_search method
-        self.searchBar = QLineEdit(self)
-        self.searchBar.setPlaceholderText("Search...")
-        self.searchBar.textChanged.connect(self.on_search)
-        self.searchBar.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
+        "open" shows a section, or opens the best matching item; anything else is
+        searched for in the main menu. Used for the first launch and for the later
+        launches handed over by the InstanceServer.
 
-        # Add widgets to the top bar layout
-        topLayout.addWidget(self.azButton, alignment=Qt.AlignLeft)
-        topLayout.addStretch()  # Add stretchable space between widgets
-        topLayout.addWidget(self.searchBar, alignment=Qt.AlignRight)
+        :param words: The command line words after the options, may be empty.
+        """
+        command = words[0].lower() if words else ""
+        if command in ("open", "search"):
+            text = " ".join(words[1:]).strip()
+        else:
+            command, text = "search", " ".join(words).strip()
+
+        if command == "open" and text:
+            sections = {section.name.lower(): section.name for section in default_catalog().sections}
+            if text.lower() in sections:
+                self.open_new_window(sections[text.lower()])
+                return
+            hits = self.search_engine().search(text)
+            if hits:
+                self.open_item(hits[0].item)
+                return
+
+        # A search, or nothing matched: bring the main menu to the front with the text in its search bar
+        if self.isMinimized():
+            self.showNormal()
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        if text:
+            self.searchBar.setText(text)
+        self.searchBar.setFocus()
+
+    def open_first_result(self):
+        # Pressing Enter in the search bar opens the best match
+        self.tiles.flush()  # Include keystrokes that have not been searched for yet
+        if self.resultsList.count():
+            self.open_search_result(self.resultsList.item(0))
 
-        # Add the top bar layout to the main layout
-        self.layout.addLayout(topLayout)
+    def toggle_sort_order(self):
+        # Cycle the sort order: A - Z, Z - A, most used first
+        self.sort_order = next_sort_order(self.sort_order)
+        self.azButton.setText(SORT_CAPTIONS[self.sort_order])  # Update button text
+        self.sort_buttons()  # Sort the buttons
 
-        # Create the main buttons layout (grid layout) with spacing
-        self.buttonLayout = QGridLayout()
-        self.buttonLayout.setSpacing(20)
-
-        # Define the categories and their URLs
-        self.categories = {
-            "Student Portal": "https://portal.education.nsw.gov.au/",
-            "School Library": "https://oliver-10.library.det.nsw.edu.au/3/home/news",
-            "Adobe Suite": "https://www.adobe.com/apps/all/desktop",
-            "Sentral": "https://carlingfordhs.sentral.com.au/s-vQamQe/portal/#!/student/1305",
-            "Academic Resources": "https://oliver-10.library.det.nsw.edu.au/3/learnpath/guide/ResearchDatabases",
-            "Microsoft Suite": "https://login.microsoftonline.com/login.srf?wa=wsignin1.0&whr=det.nsw.edu.au&wreply=https:%2f%2fportal.office.com"
+    def sort_buttons(self):
+        # Sort buttons by their text in the specified order
+        self.tiles.sort(self.sort_order)
+        self.tiles.filter(self.searchBar.text())  # Reposition buttons in the grid layout, keeping the search
+
+    def create_window(self, category):
+        # Build a new window for the selected category; sections without a window of their own get a SectionWindow
+        window_classes = {
+            "Study Guides": StudyGuidesWindow,
+            "School Resources": SchoolResourcesWindow,
+            "Miscellaneous Info": MiscellaneousInfoWindow,
+            "Health Check-Up": HealthCheckUpWindow,
+            "Music": Music,
+            "Revision Techniques": RevisionTechniquesWindow,
+            "Exam Techniques": ExamTechniquesWindow,
         }
-        self.buttons = []
-        # Define positions for the buttons in a grid layout
-        positions = [(0, 0), (0, 1), (1, 0), (1, 1), (2, 0), (2, 1)]
-
-        # Create buttons for each category and add them to the grid layout
-        for position, (category, url) in zip(positions, self.categories.items()):
-            button = QPushButton(category, self)
-            button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-            button.setMinimumSize(150, 100)  # Set minimum size for the buttons
-            button.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-            # Connect the button click to the open_url method with the respective URL
-            button.clicked.connect(lambda _, url=url: self.open_url(url))
-            self.buttonLayout.addWidget(button, *position)
-            self.buttons.append(button)
-
-        # Add the button layout to the main layout
-        self.layout.addLayout(self.buttonLayout)
-
-        # Create the navigation buttons layout
-        navLayout = QHBoxLayout()
-        # Create the previous navigation button with style and connect its signal to the navigate_left method
-        self.prevButton = QPushButton("⬅", self)
-        self.prevButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 30pt; padding: 20px;")
-        self.prevButton.clicked.connect(self.navigate_left)
-        # Create the next navigation button with style and connect its signal to the navigate_right method
-        self.nextButton = QPushButton("➡", self)
-        self.nextButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 30pt; padding: 20px;")
-        self.nextButton.clicked.connect(self.navigate_right)
-
-        # Add navigation buttons to the navigation layout
-        navLayout.addWidget(self.prevButton, alignment=Qt.AlignLeft)
-        navLayout.addStretch()  # Add stretchable space between buttons
-        navLayout.addWidget(self.nextButton, alignment=Qt.AlignRight)
-
-        # Add the navigation layout to the main layout
-        self.layout.addLayout(navLayout)
-        # Set the main layout for the widget
-        self.setLayout(self.layout)
-
-        # Set the window title, geometry, and background color
-        self.setWindowTitle("School Resources")
-        self.setGeometry(200, 200, 800, 600)
-        self.setStyleSheet("background-color: #121212;")
-
-        # Initialize sorting order flag
-        self.ascending = True
+        return window_classes.get(category, SectionWindow)(self, category)
+
+    def open_new_window(self, category, record_usage=True):
+        # Open the window corresponding to the selected category, reusing it if it is still alive
+        if category not in default_catalog().sections_by_name:
+            # e.g. an item that points to a section the catalog no longer has
+            QToolTip.showText(QCursor.pos(), "There is no %s section in the catalog" % category)
+            return
+        if self.single_window and category in section_order():
+            # All sections share one navigator window and are shown as its pages
+            navigator = self.windows.show_window("Sections", lambda: SectionNavigator(self), record_usage=False)
+            self.new_window = navigator.show_section(category, record_usage)
+        else:
+            self.new_window = self.windows.show_window(category, lambda: self.create_window(category), record_usage)
+
+    def session_state(self):
+        # The main menu and every open window as window_state() dictionaries, front-most first
+        windows = []
+        for name, window in reversed(self.windows.windows.items()):
+            if not window.isVisible():
+                continue
+            if isinstance(window, SectionNavigator):
+                # Only the page on screen counts, the others were just built ahead
+                pages = {page: category for category, page in window.pages.items()}
+                window = window.stack.currentWidget()
+                name = pages.get(window)
+                if name is None:
+                    continue
+            windows.append(window_state(name, window.searchBar.text(), window.sort_order))
+        return window_state("Main Menu", self.searchBar.text(), self.sort_order), windows
+
+    def save_session(self):
+        # Remember the open windows, their searches and sort orders for the next launch
+        if not self.session_saved:
+            self.session_saved = True
+            save_session(*self.session_state())
+
+    def navigate(self, window, category):
+        """
+        Move from a section to its neighbour, used by the arrow buttons.
 
-    def open_url(self, url):
-        # Open the given URL in the default web browser
-        QDesktopServices.openUrl(QUrl(url))
+        :param window: The section window the arrow was pressed in.
+        :param category: The section to show next.
+        """
+        if not self.single_window:
+            window.close()  # Close the current window, the window manager keeps it for reuse
+        self.open_new_window(category)
 
-    def on_search(self):
-        # Filter buttons based on the search text
-        search_text = self.searchBar.text().lower()
-        for button in self.buttons:
-            if search_text in button.text().lower():
-                button.show()
-            else:
-                button.hide()
+    def closeEvent(self, event):
+        # Override the close event to close and free all windows before closing the main window
+        self.save_session()  # While the windows are still there
+        self.windows.close_all()
+        event.accept()  # Accept the close event
 
-    def toggle_sort_order(self):
-        # Toggle the sorting order and update the button text
-        self.ascending = not self.ascending
-        self.azButton.setText("A - Z" if self.ascending else "Z - A")
-        # Call sort_buttons method to reorder the buttons
-        self.sort_buttons()
 
-    def sort_buttons(self):
-        # Sort the buttons based on their text
-        self.buttons.sort(key=lambda btn: btn.text(), reverse=not self.ascending)
-        # Re-add buttons to the layout in the new order
-        for i, button in enumerate(self.buttons):
-            self.buttonLayout.addWidget(button, i // 2, i % 2)
+class SectionWindow(QWidget):
+    # The catalog section a subclass shows; None for a section that is only known by name, e.g. "Careers"
+    section = None
+    # Hand-picked (row, column) cells for the first tiles, the rest follow row by row
+    preset = []
+    # Columns the tiles after the preset fill
+    columns = 2
+    # (file, size, row, column, row span, column span) of the pictures shown beside the tiles
+    images = []
+    # (row, column, row span, column span) of the tile view that replaces the tiles in a large section
+    view_cell = (0, 0, 1, 1)
 
-    def keyPressEvent(self, event):
-        # Set focus to the search bar when a key is pressed
-        if event.text():
-            self.searchBar.setFocus()
-
-    def navigate_left(self):
-        # Close the current window and open the "Study Guides" window
-        self.close()
-        self.main_window.open_new_window("Study Guides")
+    def __init__(self, main_window, name=None):
+        """
+        Window for a catalog section.
 
-    def navigate_right(self):
-        # Close the current window and open the "Miscellaneous Info" window
-        self.close()
-        self.main_window.open_new_window("Miscellaneous Info")
+        Built from the catalog entry alone: the section's items become tiles (or a
+        virtualized tile view for a large section), and main menu sections get the
+        arrow buttons to their neighbours. The sections of the shipped catalog are
+        subclasses that only pin their tile cells and pictures.
 
-class MiscellaneousInfoWindow(QWidget):
-    def __init__(self, main_window):
+        :param main_window: Reference to the main window that manages this window.
+        :param name: Name of the catalog section, the class's own section if not given.
+        """
         super().__init__()
-        # Store the reference to the main window
-        self.main_window = main_window
-        # Initialize the UI
-        self.initUI()
+        self.main_window = main_window  # Reference to the main window
+        self.name = name or self.section  # The catalog section shown
+        self.initUI()  # Initialize the UI
 
+    @PROFILER.timed
     def initUI(self):
-        # Create the main vertical layout
-        self.layout = QVBoxLayout()
+        self.layout = QVBoxLayout()  # Main layout of the window
 
-        # Create the top bar layout
+        # Top bar with the sort button on the left and the search bar on the right
         topLayout = QHBoxLayout()
-
-        # Create the "A-Z" toggle button with style and connect its signal to the toggle_sort_order method
         self.azButton = QPushButton("A - Z", self)
-        self.azButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
+        tag(self.azButton, "bar")
         self.azButton.clicked.connect(self.toggle_sort_order)
-
-        # Create the search bar with placeholder text and connect its signal to the on_search method
         self.searchBar = QLineEdit(self)
         self.searchBar.setPlaceholderText("Search...")
         self.searchBar.textChanged.connect(self.on_search)
-        self.searchBar.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
-
-        # Add widgets to the top bar layout
+        tag(self.searchBar, "bar")
         topLayout.addWidget(self.azButton, alignment=Qt.AlignLeft)
-        topLayout.addStretch()  # Add stretchable space between widgets
+        topLayout.addStretch()  # Push the search bar to the right
         topLayout.addWidget(self.searchBar, alignment=Qt.AlignRight)
-
-        # Add the top bar layout to the main layout
         self.layout.addLayout(topLayout)
 
-        # Create the main buttons layout (grid layout) with spacing
+        # Main buttons layout, tighter when the tiles share it with pictures
         self.buttonLayout = QGridLayout()
-        self.buttonLayout.setSpacing(20)
-
-        # Define the categories and their URLs
-        self.categories = {
-            "Eating Habits": "https://www.betterhealth.vic.gov.au/health/healthyliving/healthy-eating",
-            "School Calendar": "https://carlingfordhs.sentral.com.au/webcal/calendar/19",
-            "E-Books": "https://soraapp.com/",
-            "Physical Habits": "https://nutritionsource.hsph.harvard.edu/2013/11/04/making-exercise-a-daily-habit-10-tips/",
-            "School Intranet": "https://sites.google.com/education.nsw.gov.au/carlingfordhs-student-intranet/home",
-            "Online Safety": "https://kidshelpline.com.au/teens/issues/staying-safe-online"
-        }
-        self.buttons = []
-        # Define positions for the buttons in a grid layout
-        positions = [(0, 0), (0, 1), (1, 0), (1, 1), (2, 0), (2, 1)]
+        self.buttonLayout.setSpacing(10 if self.images else 20)
+        if self.images:
+            self.buttonLayout.setContentsMargins(10, 10, 10, 10)
+
+        if is_large_section(self.name):
+            # Too many items for a button each: show them in a virtualized tile view
+            self.categories = {}
+            self.buttons = []
+            self.tiles = TileView(default_catalog(), self.name, self.open_item, self)
+            self.buttonLayout.addWidget(self.tiles.view, *self.view_cell)
+        else:
+            # One tile per catalog item, in the preset cells first
+            items = default_catalog().items(self.name)
+            self.categories = {item.title: item.url for item in items}
+            self.buttons = []
+            positions = grid_positions(len(items), self.preset, self.columns)
+            for position, item in zip(positions, items):
+                button = QPushButton(item.title, self)
+                button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+                button.setMinimumSize(150, 100)
+                if self.images:
+                    button.setMaximumSize(400, 400)  # Do not outgrow the pictures
+                tag(button, "tile", item.colour)
+                button.clicked.connect(lambda _, item=item: self.open_item(item))
+                self.buttonLayout.addWidget(button, *position)
+                self.buttons.append(button)
+
+            # Ranks and lays out the tiles, and marks the ones whose link is broken
+            self.tiles = TileGrid(self.buttonLayout, self.buttons, positions, urls=[item.url for item in items])
+
+        # The pictures are decoded in the background and grow with the window
+        for file_name, size, *cell in self.images:
+            self.buttonLayout.addWidget(ScaledImage(file_name, size, self), *cell)
 
-        # Create buttons for each category and add them to the grid layout
-        for position, (category, url) in zip(positions, self.categories.items()):
-            button = QPushButton(category, self)
-            button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-            button.setMinimumSize(150, 100)  # Set minimum size for the buttons
-            button.setStyleSheet(
-                "background-color: #3F37C9; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-            # Connect the button click to the open_url method with the respective URL
-            button.clicked.connect(lambda _, url=url: self.open_url(url))
-            self.buttonLayout.addWidget(button, *position)
-            self.buttons.append(button)
-
-        # Add the button layout to the main layout
         self.layout.addLayout(self.buttonLayout)
 
-        # Create the navigation buttons layout
-        navLayout = QHBoxLayout()
-        # Create the previous navigation button with style and connect its signal to the navigate_left method
-        self.prevButton = QPushButton("⬅", self)
-        self.prevButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 30pt; padding: 20px;")
-        self.prevButton.clicked.connect(self.navigate_left)
-        # Create the next navigation button with style and connect its signal to the navigate_right method
-        self.nextButton = QPushButton("➡", self)
-        self.nextButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 30pt; padding: 20px;")
-        self.nextButton.clicked.connect(self.navigate_right)
-
-        # Add navigation buttons to the navigation layout
-        navLayout.addWidget(self.prevButton, alignment=Qt.AlignLeft)
-        navLayout.addStretch()  # Add stretchable space between buttons
-        navLayout.addWidget(self.nextButton, alignment=Qt.AlignRight)
-
-        # Add the navigation layout to the main layout
-        self.layout.addLayout(navLayout)
-        # Set the main layout for the widget
-        self.setLayout(self.layout)
+        # Arrow buttons to the neighbouring sections, only for the sections on the main menu
+        if self.name in section_order():
+            navLayout = QHBoxLayout()
+            self.prevButton = QPushButton("⬅", self)
+            tag(self.prevButton, "nav")
+            self.prevButton.clicked.connect(self.navigate_left)
+            self.nextButton = QPushButton("➡", self)
+            tag(self.nextButton, "nav")
+            self.nextButton.clicked.connect(self.navigate_right)
+            navLayout.addWidget(self.prevButton, alignment=Qt.AlignLeft)
+            navLayout.addStretch()
+            navLayout.addWidget(self.nextButton, alignment=Qt.AlignRight)
+            self.layout.addLayout(navLayout)
 
-        # Set the window title, geometry, and background color
-        self.setWindowTitle("Miscellaneous Info")
+        self.setLayout(self.layout)
+        self.setWindowTitle(self.name)
         self.setGeometry(200, 200, 800, 600)
-        self.setStyleSheet("background-color: #121212;")
+        tag(self, "window")
 
-        # Initialize sorting order flag
-        self.ascending = True
+        self.sort_order = "az"  # A - Z until the sort button is pressed
 
     def on_search(self):
-        # Filter buttons based on the search text
-        search_text = self.searchBar.text().lower()
-        for button in self.buttons:
-            if search_text in button.text().lower():
-                button.show()
-            else:
-                button.hide()
+        self.tiles.filter_later(self.searchBar.text())  # Rank the tiles, hiding the ones that do not match
 
     def toggle_sort_order(self):
-        # Toggle the sorting order and update the button text
-        self.ascending = not self.ascending
-        self.azButton.setText("A - Z" if self.ascending else "Z - A")
-        # Call sort_buttons method to reorder the buttons
+        self.sort_order = next_sort_order(self.sort_order)  # A - Z, Z - A, most used first
+        self.azButton.setText(SORT_CAPTIONS[self.sort_order])
         self.sort_buttons()
 
     def sort_buttons(self):
-        # Sort the buttons based on their text
-        self.buttons.sort(key=lambda btn: btn.text(), reverse=not self.ascending)
-        # Re-add buttons to the layout in the new order
-        for i, button in enumerate(self.buttons):
-            self.buttonLayout.addWidget(button, i // 2, i % 2)
+        self.tiles.sort(self.sort_order)
+        self.tiles.filter(self.searchBar.text())  # Re-add the tiles to the grid, keeping the search
 
     def keyPressEvent(self, event):
-        # Set focus to the search bar when a key is pressed
-        if event.text():
+        if event.text():  # Typing goes to the search bar
             self.searchBar.setFocus()
 
     def navigate_left(self):
-        # Close the current window and open the "School Resources" window
-        self.close()
-        self.main_window.open_new_window("School Resources")
+        self.main_window.navigate(self, section_neighbour(self.name, -1))  # Close this window and open the previous one
 
     def navigate_right(self):
-        # Close the current window and open the "Health Check-Up" window
-        self.close()
-        self.main_window.open_new_window("Health Check-Up")
-
-    def open_url(self, url):
-        # Open the given URL in the default web browser
-        QDesktopServices.openUrl(QUrl(url))
-
-class HealthCheckUpWindow(QWidget):
-    def __init__(self, main_window):
-        super().__init__()
-        self.main_window = main_window  # Reference to the main window
-        self.initUI()  # Initialize the UI
+        self.main_window.navigate(self, section_neighbour(self.name, 1))  # Close this window and open the next one
 
-    def initUI(self):
-        self.layout = QVBoxLayout()  # Main layout of the window
+    def open_item(self, item):
+        # Open a tile: the section it points to, e.g. "Music", or its URL in the default web browser
+        if item.window:
+            self.main_window.open_new_window(item.window)
+        else:
+            url_launcher().open(item.url)
 
-        # Top bar layout
-        topLayout = QHBoxLayout()
 
-        # Create the "A-Z" toggle button
-        self.azButton = QPushButton("A - Z", self)
-        self.azButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
-        self.azButton.clicked.connect(self.toggle_sort_order)  # Connect button to toggle_sort_order method
+# The main menu sections: two tiles per row and the arrow buttons
+class StudyGuidesWindow(SectionWindow):
+    section = "Study Guides"
 
-        # Create the search bar
-        self.searchBar = QLineEdit(self)
-        self.searchBar.setPlaceholderText("Search...")  # Placeholder text for the search bar
-        self.searchBar.textChanged.connect(self.on_search)  # Connect text change to on_search method
-        self.searchBar.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 16pt; padding: 16px;")
 
-        # Add widgets to the top bar layout
-        topLayout.addWidget(self.azButton, alignment=Qt.AlignLeft)  # Add A-Z button aligned left
-        topLayout.addStretch()  # Add stretch to push search bar to the right
-        topLayout.addWidget(self.searchBar, alignment=Qt.AlignRight)  # Add search bar aligned right
+class SchoolResourcesWindow(SectionWindow):
+    section = "School Resources"
 
-        # Add the top bar layout to the main layout
-        self.layout.addLayout(topLayout)
 
-        # Main buttons layout
-        self.buttonLayout = QGridLayout()  # Grid layout for the category buttons
-        self.buttonLayout.setSpacing(20)  # Set spacing between buttons
+class MiscellaneousInfoWindow(SectionWindow):
+    section = "Miscellaneous Info"
 
-        # Categories buttons with links
-        self.categories = {
-            "Eating Habits": "https://www.nhs.uk/live-well/eat-well/how-to-eat-a-balanced-diet/eight-tips-for-healthy-eating/",
-            "Coping With Stress": "https://www.helpguide.org/articles/stress/stress-management.htm",
-            "Mental Health Quiz": "https://www.headtohealth.gov.au/quiz",
-            "Physical Habits": "https://nutritionsource.hsph.harvard.edu/2013/11/04/making-exercise-a-daily-habit-10-tips/",
-            "Mental Health Fact Sheet": "https://www.blackdoginstitute.org.au/resources-support/fact-sheets/",
-            "Get Better Sleep": "https://www.blackdoginstitute.org.au/resources-support/digital-tools-apps/sleep-ninja/"
-        }
-        self.buttons = []  # List to store the buttons
-        positions = [(0, 0), (0, 1), (1, 0), (1, 1), (2, 0), (2, 1)]  # Define button positions in a grid layout
 
-        # Create and add buttons for each category
-        for position, (category, url) in zip(positions, self.categories.items()):
-            button = QPushButton(category, self)
-            button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)  # Make button expandable
-            button.setMinimumSize(150, 100)  # Set minimum size for the button
-            button.setStyleSheet("background-color: #B5179E; color: #f8f9fa; font-family: Helvetica; font-size: 26pt;")
-            button.clicked.connect(lambda _, url=url: self.open_url(url))  # Connect button click to open_url method
-            self.buttonLayout.addWidget(button, *position)  # Add button to the grid layout at the specified position
-            self.buttons.append(button)  # Add button to the list of buttons
+class HealthCheckUpWindow(SectionWindow):
+    section = "Health Check-Up"
 
-        self.layout.addLayout(self.buttonLayout)  # Add the button layout to the main layout
 
-        # Navigation buttons at the bottom
-        navLayout = QHBoxLayout()  # Horizontal layout for navigation buttons
-        self.prevButton = QPushButton("⬅", self)
-        self.prevButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 30pt; padding: 20px;")
-        self.prevButton.clicked.connect(self.navigate_left)  # Connect button click to navigate_left method
+# The sub-sections opened from the Study Guides tiles
+class Music(SectionWindow):
+    section = "Music"
+    preset = [(0, 0), (0, 1), (1, 0), (1, 1), (1, 2)]  # The fifth tile sits beside the second row
 
-        self.nextButton = QPushButton("➡", self)
-        self.nextButton.setStyleSheet("background-color: #4895EF; color: #f8f9fa; font-family: Helvetica; font-size: 30pt; padding: 20px;")
-        self.nextButton.clicked.connect(self.navigate_right)  # Connect button click to navigate_right method
 
-        navLayout.addWidget(self.prevButton, alignment=Qt.AlignLeft)  # Add previous button aligned left
-        navLayout.addStretch()  # Add stretch to push next button to the right
-        navLayout.addWidget(self.nextButton, alignment=Qt.AlignRight)  # Add next button aligned right
+class RevisionTechniquesWindow(SectionWindow):
+    section = "Revision Techniques"
+    preset = [(0, 1), (2, 0)]  # Around the two pictures
+    images = [("stressed_student.png", QSize(400, 400), 0, 0, 2, 1), ("happy_student.jpg", QSize(400, 400), 2, 1, 1, 1)]
+    view_cell = (0, 1, 2, 1)  # Beside the first picture
 
-        self.layout.addLayout(navLayout)  # Add the navigation layout to the main layout
-        self.setLayout(self.layout)  # Set the main layout for the window
 
-        self.setWindowTitle("Health Check-Up")  # Set window title
-        self.setGeometry(200, 200, 800, 600)  # Set window size and position
-        self.setStyleSheet("background-color: #121212;")  # Set background color
+class ExamTechniquesWindow(SectionWindow):
+    section = "Exam Techniques"
+    columns = 1  # One column left of the pictures
+    images = [("perfection.jpg", QSize(400, 500), 0, 1, 2, 1), ("harvard_student.jpg", QSize(400, 400), 2, 1, 1, 1)]
+    view_cell = (0, 0, 3, 1)
 
-        self.ascending = True  # Flag to track sort order
 
-    def on_search(self):
-        search_text = self.searchBar.text().lower()  # Get the search text in lower case
-        for button in self.buttons:  # Iterate through all buttons
-            if search_text in button.text().lower():  # If the search text is in the button text
-                button.show()  # Show the button
-            else:
-                button.hide()  # Hide the button
-
-    def toggle_sort_order(self):
-        self.ascending = not self.ascending  # Toggle the sort order flag
-        self.azButton.setText("A - Z" if self.ascending else "Z - A")  # Update button text
-        self.sort_buttons()  # Sort the buttons
+# Qt options that take a value, e.g. -style fusion; the value must not be read as a request word
+QT_VALUE_OPTIONS = ("-style", "-stylesheet", "-platform", "-platformpluginpath", "-platformtheme", "-plugin",
+                    "-qwindowgeometry", "-qwindowtitle", "-qwindowicon", "-display", "-geometry", "-session")
 
-    def sort_buttons(self):
-        self.buttons.sort(key=lambda btn: btn.text(), reverse=not self.ascending)  # Sort buttons by text
-        for i, button in enumerate(self.buttons):  # Iterate through sorted buttons
-            self.buttonLayout.addWidget(button, i // 2, i % 2)  # Re-add buttons to the grid layout
 
-    def keyPressEvent(self, event):
-        if event.text():  # If a key is pressed
-            self.searchBar.setFocus()  # Focus the search bar
+def split_qt_options(argv):
+    # Split the command line into our part and the Qt options that take a value
+    ours, qt_args = [], []
+    arguments = iter(argv)
+    for arg in arguments:
+        if arg in QT_VALUE_OPTIONS:
+            qt_args += [arg, next(arguments, "")]
+        else:
+            ours.append(arg)
+    return ours, qt_args
 
-    def navigate_left(self):
-        self.close()  # Close the current window
-        self.main_window.open_new_window("Miscellaneous Info")  # Open the previous window
 
-    def navigate_right(self):
-        self.close()  # Close the current window
-        self.main_window.open_new_window("Study Guides")  # Open the next window
+def argument_parser():
+    # The app's own options; the rest (e.g. -style) is left to Qt
+    parser = argparse.ArgumentParser(description="Student Toolkit")
+    parser.add_argument("request", nargs="*", metavar="open NAME | search TEXT",
+                        help="open a section or link, or search for TEXT; "
+                             "handed to the running app if there is one")
+    parser.add_argument("--single-window", action="store_true",
+                        help="show the sections as pages of one window (or set STUDENT_TOOLKIT_SINGLE_WINDOW=1)")
+    parser.add_argument("--theme", choices=theme.theme_names(),
+                        help="colour theme, Ctrl+T switches while running (or set STUDENT_TOOLKIT_THEME)")
+    parser.add_argument("--profile-startup", nargs="?", const="", metavar="PATH",
+                        help="write startup timings as JSON to PATH, default startup-profile.json "
+                             "(or set STUDENT_TOOLKIT_PROFILE_STARTUP)")
+    parser.add_argument("--new-instance", action="store_true",
+                        help="start a new app even if one is running (or set STUDENT_TOOLKIT_SINGLE_INSTANCE=0)")
+    return parser
 
-    def open_url(self, url):
-        QDesktopServices.openUrl(QUrl(url))  # Open the URL in the default web browser
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    ex = SearchApp()  # Create the main application window
+    argv, qt_args = split_qt_options(sys.argv[1:])
+    args, unknown_args = argument_parser().parse_known_args(argv)  # The profiler read --profile-startup itself, before PyQt5 was imported
+
+    with PROFILER.phase("QApplication"):
+        app = QApplication(sys.argv[:1] + qt_args + unknown_args)
+        app.setApplicationName("StudentToolkit")  # Names the per-user cache folder
+    try:
+        default_catalog()
+    except CatalogError as error:
+        # e.g. STUDENT_TOOLKIT_CATALOG names a missing or broken file: show the catalog shipped with the app instead
+        try:
+            use_shipped_catalog()
+        except CatalogError as shipped_error:
+            QMessageBox.critical(None, "Student Toolkit", "The catalog cannot be read.\n\n%s" % shipped_error)
+            sys.exit(1)
+        QMessageBox.warning(None, "Student Toolkit",
+                            "The catalog cannot be read, the one that comes with the app is shown instead.\n\n%s"
+                            % error)
+    with PROFILER.phase("theme"):
+        # One stylesheet for every window; the section colours get their tile rules up front
+        theme.install(app, args.theme, [section.colour for section in default_catalog().sections])
+    single_window = args.single_window or os.environ.get("STUDENT_TOOLKIT_SINGLE_WINDOW") == "1"
+    usage_log().start()  # Reads the usage log in the background, so no click or keystroke waits for it
+    with PROFILER.phase("SearchApp"):
+        ex = SearchApp(single_window)  # Create the main application window
+    if not PROFILER.finished:
+        FirstPaintProbe(ex, PROFILER)  # Writes the report once the main menu is on screen
+    app.aboutToQuit.connect(ex.save_session)  # Also when the app quits without the main menu being closed
+    # Reopen the windows of the last session after the main menu is painted, STUDENT_TOOLKIT_RESTORE_SESSION=0 turns it off
+    session = load_session() if os.environ.get("STUDENT_TOOLKIT_RESTORE_SESSION") != "0" else None
+    if session is not None:
+        apply_window_state(ex, session["main"])
     ex.show()  # Show the main application window
+    # e.g. python App.py open "Health Check-Up", handled after the restore so it ends up in front
+    request = (lambda: ex.handle_request(args.request)) if args.request else None
+    if session is not None and session["windows"]:
+        restorer = SessionRestorer(ex, session["windows"], then=request)
+    elif request is not None:
+        request()
+    # Later launches hand their request to this app instead of starting another one
+    if supported() and os.environ.get("STUDENT_TOOLKIT_SINGLE_INSTANCE") != "0":
+        instance_server = InstanceServer(ex)
+        if instance_server.listen():
+            app.aboutToQuit.connect(instance_server.close)  # Removes the socket
+    QTimer.singleShot(0, ex.load_page_index)  # Full-text search over the saved pages, read in the background
+    app.aboutToQuit.connect(usage_log().close)  # Write the opens still queued
+    app.aboutToQuit.connect(detach_shared_images)  # The last session on the machine frees the shared images
+
+    # Check the catalog links for dead pages once the app is idle, STUDENT_TOOLKIT_LINK_CHECK=0 turns it off
+    if os.environ.get("STUDENT_TOOLKIT_LINK_CHECK") != "0":
+        QTimer.singleShot(LINK_CHECK_DELAY_MS, ex.check_links)
+    # Save the catalog pages so they open when the network is down, STUDENT_TOOLKIT_PREFETCH=0 turns it off
+    if os.environ.get("STUDENT_TOOLKIT_PREFETCH") != "0":
+        QTimer.singleShot(PREFETCH_DELAY_MS, ex.prefetch_pages)
+
+    # Record what blocks the event loop for longer than the threshold, 0 turns the watchdog off
+    stall_threshold = environ_int("STUDENT_TOOLKIT_STALL_THRESHOLD_MS", STALL_THRESHOLD_MS)
+    if stall_threshold > 0:
+        watchdog = StallWatchdog(stall_threshold)
+        app.aboutToQuit.connect(watchdog.stop)  # Merges this run's stalls into the report
+        watchdog.start()
     sys.exit(app.exec_())  # Start the application event loop
@@ -0,0 +1,345 @@
+# Headless benchmarks of the UI hot paths, run under Qt's offscreen platform so no display is needed:
+#
+#     python benchmark.py                                # 10, 1,000 and 100,000 item catalogs
+#     python benchmark.py --sizes 10,1000 --compare previous.json
+#
+# Every run is stored as JSON (in the user data folder unless --output is given),
+# and --compare prints how much slower or faster each measurement got.
+import argparse  # Used to read the command line options
+import json  # Results are stored as JSON
+import os  # Used to point the app at the synthetic catalogs
+import platform  # Recorded with the results, timings depend on the machine
+import shutil  # Removes the temporary catalogs again
+import statistics  # Median of the repeated runs
+import sys  # Used to exit with an error code when a regression is found
+import tempfile  # The synthetic catalogs and caches live in a temporary folder
+import time  # Timers
+
+# Must be set before PyQt5 is imported, the benchmarks never open a real window
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from paths import APP_DIR, user_data_dir  # noqa: E402
+
+RESULTS_VERSION = 1
+DEFAULT_SIZES = [10, 1000, 100000]
+# A measurement that got this much slower than in the compared run is reported as a regression
+REGRESSION_RATIO = 1.25
+
+# Every window class, and the section it shows
+WINDOW_CLASSES = [
+    ("StudyGuidesWindow", "Study Guides"),
+    ("Music", "Music"),
+    ("RevisionTechniquesWindow", "Revision Techniques"),
+    ("ExamTechniquesWindow", "Exam Techniques"),
+    ("SchoolResourcesWindow", "School Resources"),
+    ("MiscellaneousInfoWindow", "Miscellaneous Info"),
+    ("HealthCheckUpWindow", "Health Check-Up"),
+]
+
+IMAGES = ["happy_student.jpg", "harvard_student.jpg", "perfection.jpg", "stressed_student.png"]
+WORDS = ["maths", "english", "science", "history", "music", "health", "revision", "exam", "library", "portal",
+         "guide", "notes", "quiz", "sleep", "stress", "calendar", "biology", "physics", "chemistry", "art"]
+QUERIES = ["revison tips", "maths notes", "histry"]  # Typed one letter at a time, with typos on purpose
+
+
+def synthetic_catalog(size, directory):
+    """
+    Write a catalog with size items spread over the real sections and return its path.
+
+    :param size: Total number of items.
+    :param directory: Folder to write the catalog to.
+    """
+    with open(os.path.join(APP_DIR, "catalog.json"), "r", encoding="utf-8") as file:
+        source = json.load(file)
+    sections = source["sections"]
+    for index, section in enumerate(sections):
+        count = size // len(sections) + (1 if index < size % len(sections) else 0)
+        section["items"] = [{
+            "title": "%s %s %d" % (WORDS[(i * 7 + index) % len(WORDS)].title(), WORDS[(i * 3) % len(WORDS)], i),
+            "url": "https://example.com/%d/%d" % (index, i),
+        } for i in range(count)]
+    path = os.path.join(directory, "catalog-%d.json" % size)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(source, file)
+    return path
+
+
+def summary(times):
+    # Minimum, median and number of runs of a list of durations, in milliseconds
+    return {"min": round(min(times) * 1000, 4), "median": round(statistics.median(times) * 1000, 4),
+            "runs": len(times)}
+
+
+class Benchmarks:
+    def __init__(self, app, repeat):
+        """
+        Time the UI hot paths against the catalog the app currently loads.
+
+        :param app: The QApplication.
+        :param repeat: How often each measurement is repeated.
+        """
+        self.app = app
+        self.repeat = repeat
+        self.results = {}
+
+    def record(self, name, times):
+        self.results[name] = summary(times)
+        print("  %-44s %10.3f ms (median %.3f)" % (name, self.results[name]["min"], self.results[name]["median"]))
+
+    def settle(self):
+        # Run pending layouts, paints and deferred deletes
+        self.app.sendPostedEvents()
+        self.app.processEvents()
+
+    def run(self):
+        import App
+
+        self.construct(App.SearchApp, "SearchApp")
+        main = App.SearchApp()
+        start = time.perf_counter()
+        main.show()
+        self.settle()
+        # The main menu builds its search index in the background after the first paint; wait for it,
+        # so the keystrokes below measure the index and not the scan that answers until it is ready
+        while main.engine is None:
+            self.app.processEvents()
+            time.sleep(0.01)
+        self.record("search.index_ready", [time.perf_counter() - start])
+
+        start = time.perf_counter()
+        App.SearchEngine(App.default_catalog().all_items())
+        self.record("search.index_build", [time.perf_counter() - start])
+        start = time.perf_counter()
+        App.ScanSearch(App.default_catalog()).search(QUERIES[0])
+        self.record("search.scan_first_query", [time.perf_counter() - start])
+
+        for class_name, category in WINDOW_CLASSES:
+            self.construct(lambda category=category: main.create_window(category), class_name)
+
+        self.keystrokes(main, "SearchApp")
+        window = main.create_window("School Resources")
+        window.show()
+        self.keystrokes(window, "SchoolResourcesWindow")
+        self.sorting(main, "SearchApp")
+        for class_name, category in WINDOW_CLASSES:
+            window = main.create_window(category)
+            window.show()
+            self.settle()
+            self.sorting(window, class_name)
+            window.close()
+            window.deleteLater()
+        self.images()
+        self.navigation(App, single_window=False)
+        self.navigation(App, single_window=True)
+
+        main.close()
+        main.deleteLater()
+        self.settle()
+        return self.results
+
+    def construct(self, factory, name):
+        # Build and show a window, the time until it could be painted
+        times = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            window = factory()
+            window.show()
+            self.settle()
+            times.append(time.perf_counter() - start)
+            if getattr(window, "index_thread", None) is not None:
+                window.index_thread.join()  # The main menu's search index, built in the background, is not timed
+            window.close()
+            window.deleteLater()
+            self.settle()
+        self.record("construct.%s" % name, times)
+
+    def keystrokes(self, window, name):
+        # Latency of one keystroke in a search bar, debouncing left out
+        times = []
+        for _ in range(self.repeat):
+            for query in QUERIES:
+                for length in range(1, len(query) + 1):
+                    window.searchBar.blockSignals(True)  # Call on_search ourselves, once per keystroke
+                    window.searchBar.setText(query[:length])
+                    window.searchBar.blockSignals(False)
+                    start = time.perf_counter()
+                    window.on_search()
+                    window.tiles.flush()
+                    self.settle()
+                    times.append(time.perf_counter() - start)
+                window.searchBar.setText("")
+                window.tiles.flush()
+        self.record("search.keystroke.%s" % name, times)
+
+    def sorting(self, window, name):
+        # Cost of the A - Z / Z - A button, including the relayout
+        times = []
+        for _ in range(self.repeat * 2):
+            start = time.perf_counter()
+            window.toggle_sort_order()
+            self.settle()
+            times.append(time.perf_counter() - start)
+        self.record("sort.%s" % name, times)
+
+    def images(self):
+        # Decoding each window image, mapping it back from the image pack, and resizing it
+        from PyQt5.QtCore import QSize
+
+        from imagepack import ImagePack
+        from images import MAX_IMAGE_SIDE, PyramidLoadTask, ScaledImage
+
+        directory = tempfile.mkdtemp(prefix="stk-pack-")
+        try:
+            for name in IMAGES:
+                path = os.path.join(APP_DIR, name)
+                if not os.path.exists(path):
+                    continue
+                decode, hit = [], []
+                for _ in range(self.repeat):
+                    # A fresh pack each time, so every decode is a miss and every lookup maps a new file
+                    pack = ImagePack(os.path.join(directory, "%s.%d.pack" % (name, len(decode))))
+                    task = PyramidLoadTask(None, path, MAX_IMAGE_SIDE, MAX_IMAGE_SIDE, pack)
+                    start = time.perf_counter()
+                    levels, _ = task.levels()
+                    decode.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    ImagePack(pack.path).levels(path, (MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+                    hit.append(time.perf_counter() - start)
+                self.record("image.decode.%s" % name, decode)
+                self.record("image.packed.%s" % name, hit)
+
+                # One paint per resize step while the window is dragged, then the smooth pass once it settles
+                view = ScaledImage(path, QSize(400, 400))
+                view.set_levels(levels, True)
+                resize, refine = [], []
+                for _ in range(self.repeat):
+                    for width in range(300, 1000, 50):
+                        view.resize(width, width * 3 // 4)
+                        start = time.perf_counter()
+                        view.grab()
+                        resize.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    view.refine()
+                    refine.append(time.perf_counter() - start)
+                view.deleteLater()
+                self.record("image.resize_paint.%s" % name, resize)
+                self.record("image.refine.%s" % name, refine)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def navigation(self, App, single_window):
+        # One full loop through the sections with the arrow buttons
+        main = App.SearchApp(single_window)
+        order = App.section_order()
+        main.open_new_window(order[0])
+        self.settle()
+        times = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            for category in order[1:] + order[:1]:
+                main.navigate(main.new_window, category)
+                self.settle()
+            times.append(time.perf_counter() - start)
+        self.record("navigate.cycle.%s" % ("single_window" if single_window else "windows"), times)
+        main.windows.close_all()
+        main.deleteLater()
+        self.settle()
+
+
+def run(sizes, repeat):
+    """
+    Run every benchmark against a synthetic catalog of each size.
+
+    :param sizes: Catalog sizes in items.
+    :param repeat: How often each measurement is repeated.
+    :return: The results as a dictionary.
+    """
+    from PyQt5.QtCore import QT_VERSION_STR
+    from PyQt5.QtWidgets import QApplication
+
+    import catalog
+
+    directory = tempfile.mkdtemp(prefix="stk-bench-")
+    os.environ["XDG_CACHE_HOME"] = directory  # Keep the compiled catalogs out of the real cache
+    data_home = os.environ.get("XDG_DATA_HOME")
+    os.environ["XDG_DATA_HOME"] = directory  # and the windows opened by the benchmark out of the usage log
+    app = QApplication.instance() or QApplication(["benchmark"])
+    app.setApplicationName("StudentToolkitBenchmark")
+    results = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "sizes": {},
+    }
+    try:
+        for size in sizes:
+            print("catalog with %d items" % size)
+            os.environ["STUDENT_TOOLKIT_CATALOG"] = synthetic_catalog(size, directory)
+            catalog._catalog = None  # Open the new catalog on the next default_catalog()
+            start = time.perf_counter()
+            catalog.default_catalog()
+            load = time.perf_counter() - start
+            benchmarks = Benchmarks(app, repeat)
+            benchmarks.record("catalog.compile_and_open", [load])
+            results["sizes"][str(size)] = benchmarks.run()
+    finally:
+        catalog._catalog = None
+        if data_home is None:
+            os.environ.pop("XDG_DATA_HOME", None)
+        else:
+            os.environ["XDG_DATA_HOME"] = data_home  # The results are stored in the real data folder
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def compare(old, new):
+    """
+    Print the change of every measurement found in both runs.
+
+    :param old: Results of the earlier run.
+    :param new: Results of this run.
+    :return: Number of measurements that got slower than REGRESSION_RATIO.
+    """
+    regressions = 0
+    for size, measurements in new["sizes"].items():
+        before = old.get("sizes", {}).get(size, {})
+        print("catalog with %s items, compared with %s" % (size, old.get("created", "the earlier run")))
+        for name, result in measurements.items():
+            if name not in before or not before[name]["min"]:
+                continue
+            ratio = result["min"] / before[name]["min"]
+            flag = "  REGRESSION" if ratio > REGRESSION_RATIO else ""
+            regressions += bool(flag)
+            print("  %-44s %10.3f -> %10.3f ms  x%.2f%s" % (name, before[name]["min"], result["min"], ratio, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmarks of the Student Toolkit UI")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated catalog sizes (default %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (default %(default)s)")
+    parser.add_argument("--output", help="file to store the results in (default: the user data folder)")
+    parser.add_argument("--compare", metavar="PATH", help="earlier results to compare with")
+    args = parser.parse_args()
+
+    results = run([int(size) for size in args.sizes.split(",") if size], max(1, args.repeat))
+
+    output = args.output or os.path.join(user_data_dir(), "benchmarks",
+                                         "benchmark-%s.json" % time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print("results written to %s" % output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            if compare(json.load(file), results):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import hashlib  # Used to name the compiled index after its source file
+import json  # The catalog source is a JSON file
+import mmap  # The compiled index is memory-mapped instead of read
+import os  # Import the os module to work with files
+import struct  # Used to pack and unpack the binary index
+from collections import namedtuple
+
+from paths import APP_DIR, user_cache_dir
+
+# Catalog shipped with the app; STUDENT_TOOLKIT_CATALOG points to a school-specific one instead
+DEFAULT_CATALOG = os.path.join(APP_DIR, "catalog.json")
+
+# Index layout: a header, a table of sections, a table of items and a pool of UTF-8 strings.
+# Strings are stored as (offset, length) pairs into the pool so records have a fixed size.
+INDEX_MAGIC = b"STKI"
+INDEX_VERSION = 1
+# magic, version, flags, source mtime, source size, section count, item count, table offsets
+INDEX_HEADER = struct.Struct("<4sHHqqIIIII")
+# name, colour, first item, item count, flags
+SECTION_RECORD = struct.Struct("<IIIIIII")
+# title, url, window, colour, section index
+ITEM_RECORD = struct.Struct("<IIIIIIIII")
+
+SECTION_MENU = 1  # Section has a tile on the main menu
+
+Section = namedtuple("Section", "index name colour first_item item_count menu")
+CatalogItem = namedtuple("CatalogItem", "index title url window colour section")
+
+
+class CatalogError(Exception):
+    # Raised when the catalog source or its compiled index is invalid
+    pass
+
+
+class Catalog:
+    def __init__(self, buffer):
+        """
+        Read-only view of a compiled catalog index.
+
+        Only the header and the section table are read up front. Items are decoded
+        from the buffer when they are asked for, so opening the catalog takes the
+        same time however many links it holds.
+
+        :param buffer: The index bytes, usually an mmap of the index file.
+        """
+        self.buffer = buffer
+        if len(buffer) < INDEX_HEADER.size:
+            raise CatalogError("catalog index is truncated")
+        (magic, version, _, self.source_mtime, self.source_size, section_count, self.item_count,
+         self.sections_offset, self.items_offset, self.strings_offset) = INDEX_HEADER.unpack_from(buffer)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise CatalogError("not a catalog index")
+
+        self.sections = []
+        self.sections_by_name = {}
+        for index in range(section_count):
+            record = SECTION_RECORD.unpack_from(buffer, self.sections_offset + index * SECTION_RECORD.size)
+            section = Section(index, self.string(record[0], record[1]), self.string(record[2], record[3]),
+                              record[4], record[5], bool(record[6] & SECTION_MENU))
+            self.sections.append(section)
+            self.sections_by_name[section.name] = section
+
+    def string(self, offset, length):
+        # Decode one string from the pool
+        start = self.strings_offset + offset
+        return self.buffer[start:start + length].decode("utf-8")
+
+    def section(self, name):
+        """
+        Return the section with the given name.
+
+        :raises KeyError: If the catalog has no such section.
+        """
+        return self.sections_by_name[name]
+
+    def menu_sections(self):
+        # Sections that have a tile on the main menu, in catalog order
+        return [section for section in self.sections if section.menu]
+
+    def item(self, index):
+        # Decode a single item record
+        record = ITEM_RECORD.unpack_from(self.buffer, self.items_offset + index * ITEM_RECORD.size)
+        section = self.sections[record[8]]
+        return CatalogItem(index, self.string(record[0], record[1]), self.string(record[2], record[3]),
+                           self.string(record[4], record[5]),
+                           self.string(record[6], record[7]) or section.colour, section.name)
+
+    def items(self, name):
+        """
+        Return the items of a section, decoded on demand.
+
+        :param name: Name of the section.
+        """
+        section = self.section(name)
+        return [self.item(index) for index in range(section.first_item, section.first_item + section.item_count)]
+
+    def titles(self, name):
+        """
+        Return only the titles of a section's items, for sorting and filtering large sections.
+
+        :param name: Name of the section.
+        """
+        section = self.section(name)
+        titles = []
+        for index in range(section.first_item, section.first_item + section.item_count):
+            offset, length = struct.unpack_from("<II", self.buffer, self.items_offset + index * ITEM_RECORD.size)
+            titles.append(self.string(offset, length))
+        return titles
+
+    def urls(self, name):
+        """
+        Return only the URLs of a section's items, e.g. to look up their usage.
+
+        :param name: Name of the section.
+        """
+        section = self.section(name)
+        urls = []
+        for index in range(section.first_item, section.first_item + section.item_count):
+            offset, length = struct.unpack_from("<II", self.buffer, self.items_offset + index * ITEM_RECORD.size + 8)
+            urls.append(self.string(offset, length))
+        return urls
+
+    def all_items(self):
+        # Every item of every section, in catalog order
+        for index in range(self.item_count):
+            yield self.item(index)
+
+
+def compile_catalog(source):
+    """
+    Compile a catalog JSON file into the binary index format.
+
+    :param source: Path of the catalog JSON file.
+    :return: The index as bytes.
+    :raises CatalogError: If the file cannot be read or is not a valid catalog.
+    """
+    try:
+        stat = os.stat(source)
+        with open(source, "r", encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError) as error:
+        raise CatalogError("%s: %s" % (source, error))
+    if not isinstance(data, dict) or not isinstance(data.get("sections", []), list):
+        raise CatalogError("%s: the catalog must be an object with a list of sections" % source)
+
+    strings = bytearray()
+    string_offsets = {}
+
+    def add_string(text):
+        # Store each distinct string once and return its (offset, length)
+        encoded = text.encode("utf-8")
+        if encoded not in string_offsets:
+            string_offsets[encoded] = len(strings)
+            strings.extend(encoded)
+        return string_offsets[encoded], len(encoded)
+
+    section_records = []
+    item_records = []
+    for section_index, section in enumerate(data.get("sections", [])):
+        if not isinstance(section, dict) or not isinstance(section.get("name"), str):
+            raise CatalogError("%s: section %d has no name" % (source, section_index))
+        items = section.get("items", [])
+        if not isinstance(items, list) or not isinstance(section.get("colour", ""), str):
+            raise CatalogError("%s: the items of %s must be a list and its colour a string"
+                               % (source, section["name"]))
+        flags = SECTION_MENU if section.get("menu") else 0
+        section_records.append(SECTION_RECORD.pack(*add_string(section["name"]),
+                                                   *add_string(section.get("colour", "#4895EF")),
+                                                   len(item_records), len(items), flags))
+        for item in items:
+            if (not isinstance(item, dict) or "title" not in item or not ("url" in item or "window" in item)
+                    or not all(isinstance(item.get(key, ""), str) for key in ("title", "url", "window", "colour"))):
+                raise CatalogError("%s: every item in %s needs a title and a url or window, all strings"
+                                   % (source, section["name"]))
+            item_records.append(ITEM_RECORD.pack(*add_string(item["title"]), *add_string(item.get("url", "")),
+                                                 *add_string(item.get("window", "")),
+                                                 *add_string(item.get("colour", "")), section_index))
+
+    sections_offset = INDEX_HEADER.size
+    items_offset = sections_offset + len(section_records) * SECTION_RECORD.size
+    strings_offset = items_offset + len(item_records) * ITEM_RECORD.size
+    header = INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, stat.st_mtime_ns, stat.st_size,
+                               len(section_records), len(item_records),
+                               sections_offset, items_offset, strings_offset)
+    return header + b"".join(section_records) + b"".join(item_records) + bytes(strings)
+
+
+def index_path(source):
+    # The compiled index lives in the cache folder, named after the source path
+    name = hashlib.sha1(os.path.abspath(source).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(user_cache_dir(), "catalog-%s.idx" % name)
+
+
+def open_index(path, source_stat):
+    # Map an existing index, or return None if it is missing or older than the source
+    try:
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        catalog = Catalog(buffer)
+    except (CatalogError, struct.error):
+        return None
+    if catalog.source_mtime != source_stat.st_mtime_ns or catalog.source_size != source_stat.st_size:
+        return None  # The source was edited after the index was built
+    return catalog
+
+
+def load_catalog(source=None):
+    """
+    Open the catalog, recompiling its index first if the source file changed.
+
+    :param source: Path of the catalog JSON file, defaults to STUDENT_TOOLKIT_CATALOG or catalog.json.
+    :return: A Catalog.
+    :raises CatalogError: If the file cannot be read or is not a valid catalog.
+    """
+    source = source or os.environ.get("STUDENT_TOOLKIT_CATALOG") or DEFAULT_CATALOG
+    path = index_path(source)
+    try:
+        source_stat = os.stat(source)
+    except OSError as error:
+        raise CatalogError("%s: %s" % (source, error))
+    catalog = open_index(path, source_stat)
+    if catalog is not None:
+        return catalog
+
+    data = compile_catalog(source)
+    try:
+        # Write to a temporary file first so a running instance never maps half an index
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except OSError:
+        return Catalog(data)  # No writable cache folder, use the index from memory
+    return open_index(path, source_stat) or Catalog(data)
+
+
+_catalog = None
+
+
+def default_catalog():
+    # The catalog shared by all windows, opened on first use
+    global _catalog
+    if _catalog is None:
+        _catalog = load_catalog()
+    return _catalog
+
+
+def use_shipped_catalog():
+    # Make the catalog shipped with the app the one every window shows, e.g. when the configured one is broken
+    global _catalog
+    _catalog = load_catalog(DEFAULT_CATALOG)
+    return _catalog
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python catalog.py [catalog.json] compiles the index ahead of time and prints a summary
+    catalog = load_catalog(sys.argv[1] if len(sys.argv) > 1 else None)
+    for section in catalog.sections:
+        print("%-20s %5d items" % (section.name, section.item_count))
@@ -0,0 +1,243 @@
+import argparse  # Used to read the command line options
+import json  # Answers can be printed as JSON for scripts
+import sys  # Used to read queries from stdin and set the exit code
+
+# The catalog, search, sorting and usage modules are imported where a lookup needs them:
+# every launch imports this module for wants_cli(), including the ones that open a window
+# or hand over to the running app
+
+# Options that make App.py answer on the command line instead of opening a window
+CLI_OPTIONS = ("--search", "--list", "--open", "--stdin")
+
+
+class QueryError(Exception):
+    # Raised for a query that cannot be answered, e.g. an unknown section
+    pass
+
+
+def wants_cli(argv):
+    # True if the command line asks for an answer instead of the window
+    return any(arg.split("=", 1)[0] in CLI_OPTIONS for arg in argv)
+
+
+def item_record(item, score=None):
+    # A catalog item as a JSON-friendly dictionary
+    record = {"title": item.title, "section": item.section, "url": item.url, "window": item.window}
+    if score is not None:
+        record["score"] = score
+    return record
+
+
+class Lookup:
+    def __init__(self, catalog, limit=None):
+        """
+        Answers command line queries from the same catalog the windows show, without PyQt5.
+
+        The catalog index is memory-mapped and the search index is built on the first
+        search, so a single lookup costs little more than starting Python, and a
+        script piping queries through --stdin pays for the index only once.
+
+        :param catalog: The Catalog to answer from.
+        :param limit: Largest number of search results, defaults to SEARCH_LIMIT of search.py.
+        """
+        self.catalog = catalog
+        self.limit = limit
+        self.engine = None
+
+    def search(self, text):
+        """
+        Search every section like the main menu does.
+
+        :param text: The search text.
+        :return: List of (CatalogItem, score), best first; equal matches most used first.
+        """
+        from search import SEARCH_LIMIT, SearchEngine
+        from usage import usage_log
+
+        if self.engine is None:
+            self.engine = SearchEngine(self.catalog.all_items(), self.limit or SEARCH_LIMIT)
+        usage = usage_log()
+        hits = sorted(self.engine.search(text), key=lambda hit: (-hit.score, -usage.score(hit.item.url or hit.item.window)))
+        return [(hit.item, hit.score) for hit in hits]
+
+    def section_name(self, name):
+        # The catalog spelling of a section name typed in any case
+        for section in self.catalog.sections:
+            if section.name.casefold() == name.strip().casefold():
+                return section.name
+        raise QueryError("no section called %r (try --list)" % name)
+
+    def list(self, name=None, order=None):
+        """
+        List the sections, or the items of one section.
+
+        :param name: Section name, None for the list of sections.
+        :param order: Optional sort order, one of SORT_ORDERS; catalog order if None.
+        :return: List of Sections or CatalogItems.
+        """
+        from sorting import SortEngine
+
+        if not name:
+            entries = list(self.catalog.sections)
+            names = [section.name for section in entries]
+            usage_keys = names
+        else:
+            entries = self.catalog.items(self.section_name(name))
+            names = [item.title for item in entries]
+            usage_keys = [item.url or item.title for item in entries]
+        if order is None:
+            return entries
+        return [entries[position] for position in SortEngine(names, usage_keys=usage_keys).sort(order)]
+
+    def resolve(self, text):
+        # The item a title refers to: an exact title (in any case) first, else the best search match
+        wanted = text.strip().casefold()
+        for item in self.catalog.all_items():
+            if item.title.casefold() == wanted:
+                return item
+        hits = self.search(text)
+        if not hits:
+            raise QueryError("nothing matches %r" % text)
+        return hits[0][0]
+
+    def open(self, text):
+        """
+        Open the link of an item in the web browser.
+
+        :param text: Title of the item, or words to search for.
+        :return: The CatalogItem that was opened.
+        """
+        import pathlib
+        import webbrowser
+
+        from pagecache import offline_copy
+        from usage import usage_log
+
+        item = self.resolve(text)
+        if not item.url:
+            raise QueryError("%r is a section, run: python App.py open %r" % (item.title, item.window))
+        saved = offline_copy(item.url)  # The saved copy when the site is down, like the window does
+        if not webbrowser.open(pathlib.Path(saved).as_uri() if saved else item.url):
+            raise QueryError("no web browser found")
+        usage_log().record(item.url)
+        return item
+
+
+def answer(lookup, command, text, args):
+    """
+    Answer one query.
+
+    :param lookup: The Lookup to answer from.
+    :param command: "search", "list" or "open".
+    :param text: The search text, section or item.
+    :param args: The parsed options, --sort is used.
+    :return: List of JSON-friendly results; empty if nothing matched.
+    """
+    if command == "search":
+        return [item_record(item, score) for item, score in lookup.search(text)]
+    if command == "list":
+        entries = lookup.list(text, args.sort)
+        if not text:
+            return [{"section": section.name, "items": section.item_count} for section in entries]
+        return [item_record(item) for item in entries]
+    if command == "open":
+        return [item_record(lookup.open(text))]
+    raise QueryError("unknown command %r, use search, list or open" % command)
+
+
+def print_results(command, results):
+    # One line per result, tab-separated so scripts can cut the columns
+    for result in results:
+        if "items" in result:
+            print("%s\t%d" % (result["section"], result["items"]))
+        elif command == "open":
+            print("opened\t%s" % result["url"])
+        else:
+            print("%s\t%s\t%s" % (result["title"], result["section"], result["url"] or result["window"]))
+
+
+def main(argv=None):
+    """
+    Answer lookups on the command line, e.g. python App.py --search sleep --json.
+
+    --stdin reads one query per line ("search TEXT", "list [SECTION]" or "open ITEM";
+    a bare line is a search) and answers each one as it arrives; with --json every
+    answer is one JSON line.
+
+    :param argv: The arguments, defaults to sys.argv[1:].
+    :return: The exit code: 0 if every query had results, 1 otherwise.
+    """
+    from catalog import CatalogError, load_catalog
+    from search import SEARCH_LIMIT
+    from sorting import SORT_ORDERS
+    from usage import usage_log
+
+    parser = argparse.ArgumentParser(prog="App.py", description="Look up Student Toolkit links without a window")
+    queries = parser.add_mutually_exclusive_group(required=True)
+    queries.add_argument("--search", metavar="TEXT", help="search every section like the main menu")
+    queries.add_argument("--list", nargs="?", const="", metavar="SECTION",
+                         help="list the items of SECTION, or the sections")
+    queries.add_argument("--open", metavar="ITEM", help="open the link of ITEM (a title, or words to search for)")
+    queries.add_argument("--stdin", action="store_true", help="answer queries read from stdin, one per line")
+    parser.add_argument("--json", action="store_true", help="print JSON (JSON lines with --stdin)")
+    parser.add_argument("--limit", type=int, default=SEARCH_LIMIT, help="largest number of search results")
+    parser.add_argument("--sort", choices=SORT_ORDERS, help="order of --list (default: catalog order)")
+    parser.add_argument("--catalog", help="catalog JSON file (default: STUDENT_TOOLKIT_CATALOG or catalog.json)")
+    args = parser.parse_args(argv)
+
+    try:
+        lookup = Lookup(load_catalog(args.catalog), max(1, args.limit))
+    except (OSError, ValueError, CatalogError) as error:
+        print("cannot read the catalog: %s" % error, file=sys.stderr)
+        return 1
+
+    if not args.stdin:
+        command, text = next((name, value) for name, value in
+                             (("search", args.search), ("list", args.list), ("open", args.open)) if value is not None)
+        try:
+            results = answer(lookup, command, text, args)
+        except QueryError as error:
+            print(error, file=sys.stderr)
+            return 1
+        finally:
+            usage_log().close()  # Write the open before exiting
+        if args.json:
+            json.dump(results, sys.stdout, indent=2)
+            print()
+        else:
+            print_results(command, results)
+        return 0 if results else 1
+
+    status = 0
+    try:
+        for line in sys.stdin:
+            query = line.strip()
+            if not query:
+                continue
+            command, _, text = query.partition(" ")
+            if command not in ("search", "list", "open"):
+                command, text = "search", query
+            try:
+                results, error = answer(lookup, command, text.strip(), args), None
+            except QueryError as exception:
+                results, error = [], str(exception)
+            if not results:
+                status = 1
+            if args.json:
+                answer_line = {"query": query, "results": results}
+                if error:
+                    answer_line["error"] = error
+                sys.stdout.write(json.dumps(answer_line) + "\n")
+            else:
+                if error:
+                    print(error, file=sys.stderr)
+                print_results(command, results)
+                print()  # A blank line ends each answer
+            sys.stdout.flush()  # The script on the other end may wait for each answer
+    finally:
+        usage_log().close()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+import json  # The document table and vocabulary are stored as JSON inside the index file
+import math  # BM25 weights
+import os  # Used to build the index path
+import struct  # Used to pack the index header and term offsets
+import sys  # Used by the command line
+import threading  # The app builds the index in a background thread
+import time  # Used to time queries on the command line
+from array import array  # Term offsets are stored as a packed array
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+from html.parser import HTMLParser
+
+from paths import user_cache_dir
+from search import tokenize  # The same words the title search uses
+
+# BM25 parameters: how fast repeated words stop counting, and how much long pages are penalised
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Largest number of pages a search returns
+SEARCH_LIMIT = 20
+# The last query word is treated as a prefix while typing, matching at most this many words
+PREFIX_EXPANSIONS = 32
+# Query words shorter than this are ignored, they match nearly every page
+MIN_WORD_LENGTH = 3
+# Decoded posting lists kept in memory, typing a second word re-reads the first one
+POSTINGS_CACHE_SIZE = 256
+# Changed and removed pages leave an empty slot in the index until a quarter of the slots are empty,
+# then the index is rebuilt without them
+MAX_REMOVED_SHARE = 0.25
+
+# Index layout: header, JSON table of documents and vocabulary, term offsets, then the postings.
+# A term's postings are varint pairs of (document number gap, word count). A document whose URL is
+# null was removed; its postings stay until the next rebuild but no search returns it.
+INDEX_MAGIC = b"STKF"
+INDEX_VERSION = 1
+# magic, version, flags, JSON length, term count, postings length
+INDEX_HEADER = struct.Struct("<4sHHIII")
+
+# Words too common to tell pages apart
+STOP_WORDS = frozenset("""
+a about an and are as at be but by can do for from has have how if in into is it its not of on or our so that the
+their them then there these they this to was we what when which who will with you your
+""".split())
+
+# Page parts whose text is not content
+SKIPPED_TAGS = frozenset(["script", "style", "noscript", "template", "svg"])
+
+PageHit = namedtuple("PageHit", "url score")
+
+
+def normalize(word):
+    # Fold simple plurals together, e.g. "flashcards" -> "flashcard"
+    if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def terms(text):
+    # The index terms of a text, in order
+    return [normalize(word) for word in tokenize(text) if word not in STOP_WORDS and len(word) < 40]
+
+
+class TextExtractor(HTMLParser):
+    # Collects the visible text and the title of an HTML page
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.title = []
+        self.skipping = 0  # Depth inside tags whose text is skipped
+        self.in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag == "title":
+            self.in_title = True
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag == "title":
+            self.in_title = False
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title.append(data)
+        elif not self.skipping:
+            self.parts.append(data)
+
+
+def page_text(path):
+    """
+    Read the title and the visible text of a saved HTML page.
+
+    :param path: Path of the page file.
+    :return: (title, text)
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    extractor = TextExtractor()
+    try:
+        extractor.feed(data.decode("utf-8", errors="replace"))
+        extractor.close()
+    except (AssertionError, ValueError):
+        pass  # Broken markup: keep what was read so far
+    # The words of the title are searched like the rest of the page
+    title = " ".join(" ".join(extractor.title).split())
+    return title, " ".join(extractor.parts) + " " + title
+
+
+def encode_postings(postings, out, previous=0):
+    # Append (document, count) pairs as varints, documents as gaps to the previous one,
+    # which is the last document of the postings already in out when appending to a list
+    for document, count in postings:
+        for number in (document - previous, count):
+            while number >= 0x80:
+                out.append(number & 0x7F | 0x80)
+                number >>= 7
+            out.append(number)
+        previous = document
+
+
+def decode_postings(buffer, start, end):
+    # The (document, count) pairs stored between start and end
+    numbers = []
+    number = shift = 0
+    for byte in buffer[start:end]:
+        number |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            numbers.append(number)
+            number = shift = 0
+    postings = []
+    document = 0
+    for i in range(0, len(numbers), 2):
+        document += numbers[i]
+        postings.append((document, numbers[i + 1]))
+    return postings
+
+
+def index_path():
+    # The index lives in the cache folder next to the saved pages it is built from
+    return os.path.join(user_cache_dir(), "fulltext.idx")
+
+
+class FullTextIndex:
+    def __init__(self, data):
+        """
+        Inverted index over the saved pages, searched with BM25 ranking.
+
+        The vocabulary and the document table are read up front; the posting lists
+        stay packed until a query needs them, so a search only decodes the lists of
+        its own words.
+
+        :param data: The index file contents.
+        :raises ValueError: If the data is not a valid index.
+        """
+        if len(data) < INDEX_HEADER.size:
+            raise ValueError("full-text index is truncated")
+        magic, version, _, json_length, term_count, postings_length = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError("not a full-text index")
+        start = INDEX_HEADER.size
+        table = json.loads(data[start:start + json_length].decode("utf-8"))
+        start += json_length
+        self.offsets = array("I")
+        self.offsets.frombytes(data[start:start + 4 * (term_count + 1)])
+        if sys.byteorder != "little":
+            self.offsets.byteswap()
+        start += 4 * (term_count + 1)
+        self.postings_buffer = data[start:start + postings_length]
+
+        self.documents = table["documents"]  # [url, title, length in terms, fingerprint] per document
+        self.vocabulary = table["terms"]  # Sorted
+        self.positions = {term: i for i, term in enumerate(self.vocabulary)}
+        self.count = sum(1 for document in self.documents if document[0] is not None)  # Not removed
+        self.average_length = (sum(document[2] for document in self.documents) / self.count
+                               if self.count else 1.0)
+        self.cache = OrderedDict()  # Recently decoded posting lists by term
+
+    def postings(self, term):
+        # The (document, count) pairs of a term, [] if no page contains it
+        postings = self.cache.get(term)
+        if postings is not None:
+            self.cache.move_to_end(term)
+            return postings
+        position = self.positions.get(term)
+        if position is None:
+            return []
+        postings = decode_postings(self.postings_buffer, self.offsets[position], self.offsets[position + 1])
+        self.cache[term] = postings
+        if len(self.cache) > POSTINGS_CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return postings
+
+    def expand(self, prefix):
+        # The vocabulary words starting with prefix, for the word still being typed
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + "\uffff", start)
+        return self.vocabulary[start:min(end, start + PREFIX_EXPANSIONS)]
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """
+        Return the pages that contain every query word, best BM25 score first.
+
+        The last word may be unfinished, so it also matches longer words it is the start of.
+
+        :param query: Text typed into a search bar.
+        :param limit: Largest number of hits.
+        :return: A list of PageHit tuples.
+        """
+        words = [word for word in tokenize(query) if len(word) >= MIN_WORD_LENGTH and word not in STOP_WORDS]
+        if not words or not self.count:
+            return []
+        count = self.count
+        scores = None
+        for i, word in enumerate(words):
+            options = {normalize(word)}
+            if i == len(words) - 1 and not query[-1:].isspace():
+                options.update(self.expand(word))
+            word_scores = {}
+            for term in options:
+                postings = self.postings(term)
+                if count < len(self.documents):
+                    # Leave out the slots of removed pages and of old versions of downloaded-again ones
+                    postings = [posting for posting in postings if self.documents[posting[0]][0] is not None]
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for document, frequency in postings:
+                    length = self.documents[document][2]
+                    weight = idf * frequency * (BM25_K1 + 1) / (
+                        frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / self.average_length))
+                    if weight > word_scores.get(document, 0.0):
+                        word_scores[document] = weight  # The best of the prefix matches counts
+            if scores is None:
+                scores = word_scores
+            else:
+                # Every word has to occur on the page
+                scores = {document: score + word_scores[document] for document, score in scores.items()
+                          if document in word_scores}
+            if not scores:
+                return []
+        best = sorted(scores.items(), key=lambda entry: -entry[1])[:limit]
+        return [PageHit(self.documents[document][0], score) for document, score in best]
+
+    def encoded_postings(self, term):
+        # The packed postings of a term, to copy them into a new index without decoding them
+        position = self.positions[term]
+        return self.postings_buffer[self.offsets[position]:self.offsets[position + 1]]
+
+    def last_document(self, term):
+        # The highest document number in the postings of a term, new documents are appended after it
+        position = self.positions[term]
+        return decode_postings(self.postings_buffer, self.offsets[position], self.offsets[position + 1])[-1][0]
+
+    def document_terms(self):
+        # Term counts of every document, decoded from the postings to rebuild the index without re-reading pages
+        counts = [{} for _ in self.documents]
+        for position, term in enumerate(self.vocabulary):
+            for document, frequency in decode_postings(self.postings_buffer, self.offsets[position],
+                                                       self.offsets[position + 1]):
+                counts[document][term] = frequency
+        return counts
+
+
+def add_documents(table, lists, documents, last=None):
+    """
+    Append documents to the document table and the posting lists of an index being built.
+
+    :param table: The document table, extended in place.
+    :param lists: Dictionary of term -> bytearray of encoded postings, extended in place.
+    :param documents: List of (url, title, fingerprint, {term: count}).
+    :param last: Function returning the last document in the postings of a term already in lists.
+    """
+    postings = {}
+    for url, title, fingerprint, counts in documents:
+        number = len(table)
+        table.append([url, title, sum(counts.values()), fingerprint])
+        for term, count in counts.items():
+            postings.setdefault(term, []).append((number, count))
+    for term, pairs in postings.items():
+        if term in lists:
+            encode_postings(pairs, lists[term], last(term))
+        else:
+            lists[term] = bytearray()
+            encode_postings(pairs, lists[term])
+
+
+def index_data(table, lists):
+    """
+    Return the contents of an index file.
+
+    :param table: [url, title, length in terms, fingerprint] per document.
+    :param lists: Dictionary of term -> encoded postings.
+    """
+    vocabulary = sorted(lists)
+    blob = bytearray()
+    offsets = array("I", [0])
+    for term in vocabulary:
+        blob += lists[term]
+        offsets.append(len(blob))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    encoded = json.dumps({"documents": table, "terms": vocabulary}, separators=(",", ":")).encode("utf-8")
+    header = INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, len(encoded), len(vocabulary), len(blob))
+    return header + encoded + offsets.tobytes() + bytes(blob)
+
+
+def write_index(data, path):
+    # Write to a temporary file first so a running search never reads half an index
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def open_index(path=None):
+    # Read the index, or return None if there is no valid one
+    try:
+        with open(path or index_path(), "rb") as file:
+            return FullTextIndex(file.read())
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+
+def build_index(cache, path=None):
+    """
+    Bring the index up to date with the saved pages.
+
+    Only pages that are new or were downloaded again since the last build are
+    read, and only their words are added: the postings of the other pages are
+    copied over still packed, and the old version of a changed or removed page
+    becomes an empty slot. Once a quarter of the slots are empty the index is
+    rebuilt without them. Nothing is written when no page changed.
+
+    :param cache: The pagecache.PageCache to index.
+    :param path: The index file, defaults to index_path().
+    :return: The up-to-date FullTextIndex, or None if no page was ever saved.
+    """
+    path = path or index_path()
+    old = open_index(path)
+    pages = {}
+    for meta in cache.pages():
+        if meta.get("file", "").endswith(".html"):
+            pages[meta["url"]] = (meta["path"], "%s|%s" % (meta.get("fetched"), meta.get("etag")))
+
+    known = {}
+    if old is not None:
+        known = {document[0]: (number, document) for number, document in enumerate(old.documents)
+                 if document[0] is not None}
+    unchanged = {url for url, (_, fingerprint) in pages.items() if url in known and known[url][1][3] == fingerprint}
+    if old is not None and len(unchanged) == len(pages) == len(known):
+        return old  # No page was added, removed or downloaded again
+
+    added = []
+    for url, (page, fingerprint) in sorted(pages.items()):
+        if url in unchanged:
+            continue
+        try:
+            title, text = page_text(page)
+        except OSError:
+            continue  # Evicted while the index was being built
+        counts = {}
+        for term in terms(text):
+            counts[term] = counts.get(term, 0) + 1
+        added.append((url, title, fingerprint, counts))
+
+    table, lists = [], {}
+    if old is not None and len(old.documents) - len(unchanged) <= MAX_REMOVED_SHARE * (len(unchanged) + len(added)):
+        # Keep the document numbers, so the packed postings stay valid as they are
+        table = [document if document[0] in unchanged else [None, "", 0, None] for document in old.documents]
+        lists = {term: old.encoded_postings(term) for term in old.vocabulary}
+        for term in {term for document in added for term in document[3]} & lists.keys():
+            lists[term] = bytearray(lists[term])  # Only the lists that grow are copied
+        add_documents(table, lists, added, old.last_document)
+    else:
+        # First build, or too many empty slots: number the pages afresh
+        documents = []
+        if unchanged:
+            old_terms = old.document_terms()
+            documents = [(url, known[url][1][1], known[url][1][3], old_terms[known[url][0]])
+                         for url in sorted(unchanged)]
+        if not documents and not added and old is None:
+            return None
+        add_documents(table, lists, documents + added)
+
+    data = index_data(table, lists)
+    try:
+        write_index(data, path)
+    except OSError:
+        pass  # Not remembered for the next start, but searching works from the index in memory
+    return FullTextIndex(data)
+
+
+def build_in_background(cache, callback, path=None):
+    """
+    Bring the index up to date in a background thread.
+
+    :param cache: The pagecache.PageCache to index.
+    :param callback: Called from the thread with the FullTextIndex, or None.
+    :param path: The index file, defaults to index_path().
+    """
+    thread = threading.Thread(target=lambda: callback(build_index(cache, path)), name="fulltext-index", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    from pagecache import PageCache
+
+    # python fulltext.py updates the index from the saved pages; python fulltext.py WORDS searches it
+    if len(sys.argv) > 1:
+        index = open_index()
+        if index is None:
+            sys.exit("no full-text index yet, run python fulltext.py first")
+        start = time.perf_counter()
+        hits = index.search(" ".join(sys.argv[1:]))
+        elapsed = time.perf_counter() - start
+        titles = {document[0]: document[1] for document in index.documents}
+        for hit in hits:
+            print("%7.2f  %s  (%s)" % (hit.score, titles[hit.url] or "untitled", hit.url))
+        print("%d pages found in %.2f ms" % (len(hits), elapsed * 1000))
+    else:
+        start = time.perf_counter()
+        index = build_index(PageCache())
+        count = index.count if index else 0
+        print("%d pages indexed in %.2f s" % (count, time.perf_counter() - start))
@@ -0,0 +1,233 @@
+import asyncio  # Requests run concurrently on one event loop
+import ssl  # Most of the catalog links are https
+import time  # Used to drop connections that were idle for too long
+from collections import namedtuple
+from urllib.parse import urljoin, urlsplit
+
+# Sent with every request, some sites refuse clients without a user agent
+USER_AGENT = "StudentToolkit/1.0 (+link checker)"
+# Connections opened at the same time to one host
+PER_HOST_LIMIT = 4
+# Seconds a whole request, from connecting to the last body byte, may take; waiting for a free
+# connection to a busy host does not count
+REQUEST_TIMEOUT = 10.0
+# Idle keep-alive connections older than this are not reused, the server has probably closed them
+MAX_IDLE_SECONDS = 30.0
+MAX_REDIRECTS = 5
+
+Response = namedtuple("Response", "url status reason headers body")
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class HttpError(Exception):
+    # Raised when a request fails before a response arrives (connection, protocol or timeout error)
+    pass
+
+
+class Connection:
+    def __init__(self, reader, writer):
+        # One open keep-alive connection
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    def close(self):
+        self.writer.close()
+
+
+class HttpPool:
+    def __init__(self, per_host=PER_HOST_LIMIT, timeout=REQUEST_TIMEOUT, max_idle=MAX_IDLE_SECONDS,
+                 user_agent=USER_AGENT):
+        """
+        Small asyncio HTTP/1.1 client that keeps connections open between requests.
+
+        Requests to the same host share a pool of keep-alive connections and are
+        limited to per_host at a time, so checking or downloading many links never
+        floods one server. Only the standard library is used.
+
+        :param per_host: Maximum number of concurrent requests per host.
+        :param timeout: Seconds one request may take to connect, send and read, including redirects;
+                        the time it waits for its turn on a busy host is not counted.
+        :param max_idle: Seconds after which an idle connection is not reused.
+        :param user_agent: User-Agent header sent with every request.
+        """
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.user_agent = user_agent
+        self.idle = {}  # (scheme, host, port) -> idle connections
+        self.limits = {}  # (scheme, host, port) -> semaphore
+        self.ssl_context = ssl.create_default_context()
+
+    async def request(self, method, url, headers=None, read_body=True, max_body=None, max_redirects=MAX_REDIRECTS):
+        """
+        Send a request and follow redirects.
+
+        :param method: HTTP method, e.g. "GET" or "HEAD".
+        :param url: Absolute http or https URL.
+        :param headers: Extra request headers, e.g. If-None-Match.
+        :param read_body: False to skip the body; the connection is then closed instead of reused.
+        :param max_body: Largest body in bytes to read, longer bodies are cut off.
+        :param max_redirects: Redirects followed before giving up.
+        :return: The final Response; its url is the URL after redirects.
+        :raises HttpError: On connection errors, invalid responses and timeouts.
+        """
+        budget = [self.timeout]  # Seconds left for the network work, shared by the redirects
+        try:
+            return await self._follow(method, url, headers or {}, read_body, max_body, max_redirects, budget)
+        except asyncio.TimeoutError:
+            raise HttpError("timed out after %g s" % self.timeout)
+
+    async def _follow(self, method, url, headers, read_body, max_body, max_redirects, budget):
+        for _ in range(max_redirects + 1):
+            response = await self._request(method, url, headers, read_body, max_body, budget)
+            location = response.headers.get("location")
+            if response.status not in REDIRECT_CODES or not location:
+                return response
+            url = urljoin(url, location)
+            if response.status == 303:
+                method = "GET" if method != "HEAD" else method
+        raise HttpError("too many redirects")
+
+    async def _request(self, method, url, headers, read_body, max_body, budget):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise HttpError("unsupported URL: %s" % url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname, port)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+
+        lines = ["%s %s HTTP/1.1" % (method, target), "Host: %s" % parts.netloc.rsplit("@", 1)[-1],
+                 "User-Agent: %s" % self.user_agent, "Accept-Encoding: identity", "Connection: keep-alive"]
+        lines += ["%s: %s" % (name, value) for name, value in headers.items()]
+        data = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+        limit = self.limits.get(key)
+        if limit is None:
+            limit = self.limits[key] = asyncio.Semaphore(self.per_host)
+        async with limit:
+            # The clock only runs once this request has its slot on the host
+            started = time.monotonic()
+            try:
+                status, reason, response_headers, body = await asyncio.wait_for(
+                    self._exchange(key, data, method, read_body, max_body), max(0.0, budget[0]))
+            finally:
+                budget[0] -= time.monotonic() - started
+        return Response(url, status, reason, response_headers, body)
+
+    async def _exchange(self, key, data, method, read_body, max_body):
+        # Send one request on a pooled connection and read the response: (status, reason, headers, body)
+        # A reused connection may have been closed by the server meanwhile, then retry on a fresh one
+        for attempt in range(2):
+            connection, reused = await self._connection(key)
+            try:
+                connection.writer.write(data)
+                await connection.writer.drain()
+                status, reason, response_headers = await self._read_head(connection.reader)
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError,
+                    HttpError) as error:  # ValueError: a line longer than the stream limit
+                connection.close()
+                if reused and attempt == 0:
+                    continue
+                raise HttpError(str(error) or type(error).__name__)
+            except BaseException:
+                connection.close()  # Timed out or cancelled half-way, the connection is in an unknown state
+                raise
+            break
+
+        try:
+            body, reusable = await self._read_body(connection.reader, method, status, response_headers,
+                                                   read_body, max_body)
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as error:
+            connection.close()
+            raise HttpError("broken response body: %s" % (error or type(error).__name__))
+        except BaseException:
+            connection.close()
+            raise
+
+        if reusable and response_headers.get("connection", "").lower() != "close":
+            connection.last_used = time.monotonic()
+            self.idle.setdefault(key, []).append(connection)
+        else:
+            connection.close()
+        return status, reason, response_headers, body
+
+    async def _connection(self, key):
+        # Reuse an idle connection to the host, or open a new one
+        idle = self.idle.get(key, [])
+        while idle:
+            connection = idle.pop()
+            if time.monotonic() - connection.last_used < self.max_idle and not connection.reader.at_eof():
+                return connection, True
+            connection.close()
+        scheme, host, port = key
+        try:
+            reader, writer = await asyncio.open_connection(
+                host, port, ssl=self.ssl_context if scheme == "https" else None,
+                server_hostname=host if scheme == "https" else None)
+        except (OSError, ssl.SSLError) as error:
+            raise HttpError(str(error) or type(error).__name__)
+        return Connection(reader, writer), False
+
+    async def _read_head(self, reader):
+        # Status line and headers; header names are lower-cased
+        while True:
+            status_line = (await reader.readline()).decode("latin-1").rstrip("\r\n")
+            if not status_line:
+                raise HttpError("connection closed without a response")
+            parts = status_line.split(" ", 2)
+            if len(parts) < 2 or not parts[0].startswith("HTTP/") or not parts[1].isdigit():
+                raise HttpError("invalid status line: %r" % status_line[:80])
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").rstrip("\r\n")
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                name = name.strip().lower()
+                headers[name] = "%s, %s" % (headers[name], value.strip()) if name in headers else value.strip()
+            status = int(parts[1])
+            if 100 <= status < 200:
+                continue  # Informational responses are followed by the real one
+            return status, parts[2] if len(parts) > 2 else "", headers
+
+    async def _read_body(self, reader, method, status, headers, read_body, max_body):
+        # Returns the body and whether the connection can be reused afterwards
+        if method == "HEAD" or status in (204, 304):
+            return b"", True
+        if not read_body:
+            return b"", False
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            chunks, size = [], 0
+            while True:
+                length = int((await reader.readline()).split(b";", 1)[0].strip() or b"0", 16)
+                if length == 0:
+                    while (await reader.readline()).strip():
+                        pass  # Trailer headers
+                    return b"".join(chunks), True
+                chunks.append(await reader.readexactly(length))
+                await reader.readexactly(2)  # The CRLF after each chunk
+                size += length
+                if max_body is not None and size > max_body:
+                    return b"".join(chunks)[:max_body], False
+
+        if "content-length" in headers:
+            length = int(headers["content-length"])
+            if max_body is not None and length > max_body:
+                return await reader.readexactly(max_body), False
+            return await reader.readexactly(length), True
+
+        # No length given: the body ends when the server closes the connection
+        body = await reader.read(-1 if max_body is None else max_body)
+        return body, False
+
+    async def close(self):
+        # Close every idle connection
+        for connections in self.idle.values():
+            for connection in connections:
+                connection.close()
+        self.idle.clear()
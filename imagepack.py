@@ -0,0 +1,299 @@
+import ctypes  # Gives the address of the mapped pixels to QImage
+import json  # The table of images is stored as JSON after the header
+import mmap  # The pack is memory-mapped, never read into memory
+import os  # Used to build the pack path and check the source images
+import struct  # Used to pack the header
+import tempfile  # The new pack is written to a fresh temporary file
+import threading  # Workers look up and add images at the same time
+import time  # Entries remember when they were last used, the oldest are dropped first
+
+# Import necessary modules and classes from PyQt5
+from PyQt5 import sip
+from PyQt5.QtGui import QImage
+
+from paths import APP_DIR, user_cache_dir
+
+# The images the windows show, packed ahead of time by python imagepack.py
+WINDOW_IMAGES = ["stressed_student.png", "happy_student.jpg", "perfection.jpg", "harvard_student.jpg"]
+
+# Pack layout: a header, a JSON table of images and their pyramid levels, then the raw pixels
+# of every level. Each level starts on a 64-byte boundary, so its rows are aligned for QImage.
+PACK_MAGIC = b"STKP"
+PACK_VERSION = 1
+# magic, version, flags, table length, offset of the pixels
+PACK_HEADER = struct.Struct("<4sHHII")
+PIXEL_ALIGNMENT = 64
+# Opening a pack never follows a symbolic link planted in its place (not available on Windows)
+O_NOFOLLOW = getattr(os, "O_NOFOLLOW", 0)
+# Pixel format of every level, the one the painter draws without converting
+PACK_FORMAT = QImage.Format_ARGB32_Premultiplied
+# Size the pixels of a pack may take before the least recently used images are dropped from it;
+# the window images at the largest box take about a third of it
+PACK_SIZE_LIMIT = 64 * 1024 * 1024
+
+
+def pack_path():
+    # The pack lives in the cache folder, e.g. ~/.cache/StudentToolkit/images.pack
+    return os.path.join(user_cache_dir(), "images.pack")
+
+
+def asset_path(name):
+    # Images are found next to App.py whatever the working directory is
+    return os.path.join(APP_DIR, name)
+
+
+def source_version(source):
+    # Identifies the version of a source image; a pack entry of another version is not used
+    stat = os.stat(source)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class ImagePack:
+    def __init__(self, path=None, max_bytes=PACK_SIZE_LIMIT):
+        """
+        Decoded image pyramids stored in one file and shown straight from a memory map.
+
+        Every level is kept as raw pixels in the format the painter draws, so showing
+        an image costs no decoding and no copy: the QImage points into the mapped file.
+        Windows, and every app started by the same user, map the same file and share its
+        pages, and a level is only read from disk when it is drawn. The pack is
+        rewritten with a new image in a temporary file and swapped in, so images
+        shown from the old file stay valid.
+
+        :param path: The pack file, defaults to pack_path().
+        :param max_bytes: Size cap of the pixels, the least recently used images are dropped above it.
+        """
+        self.path = path or pack_path()
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.maps = []  # [mapping, True once QImages were built over it] of every mapping still open
+        self.data = None  # The current mapping
+        self.pixels = 0  # Offset of the pixels in the current mapping
+        self.table = {}  # Source path -> entry of the current mapping
+        self.identity = None  # (inode, mtime) of the mapped file
+        self.used = {}  # Source path -> when this app last showed it, saved with the next add()
+        self.mode = 0o600  # Only the user's own apps map the pack
+
+    def refresh(self):
+        # Map the pack again if another window or app replaced it since it was mapped
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self.data, self.table, self.identity = None, {}, None
+            return
+        if (stat.st_ino, stat.st_mtime_ns) == self.identity:
+            return
+        try:
+            with open(os.open(self.path, os.O_RDONLY | O_NOFOLLOW), "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)  # Private, so QImage may point into it
+            magic, version, _, table_length, pixels = PACK_HEADER.unpack_from(data)
+            if magic != PACK_MAGIC or version != PACK_VERSION:
+                raise ValueError("not an image pack")
+            if not PACK_HEADER.size + table_length <= pixels <= len(data):
+                raise ValueError("truncated image pack")
+            table = json.loads(bytes(data[PACK_HEADER.size:PACK_HEADER.size + table_length]).decode("utf-8"))
+            if not isinstance(table, dict):
+                raise ValueError("not an image pack")
+        except (OSError, ValueError, struct.error):
+            self.data, self.table, self.identity = None, {}, None  # Rewritten on the next add()
+            self.prune()
+            return
+        self.maps.append([data, False])
+        self.data, self.pixels, self.table = data, pixels, table
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        self.prune()
+
+    def prune(self):
+        # Close the old mappings no QImage was ever built over. One that handed out images stays
+        # open until the app exits: Qt may hold copies of them (pixmaps, scaled or shallow copies)
+        # that Python cannot see, and would read unmapped memory. There are only a few, one per
+        # rewrite of the pack that was shown, and their pages are shared with the file cache.
+        maps = []
+        for data, used in self.maps:
+            if data is self.data or used:
+                maps.append([data, used])
+                continue
+            try:
+                data.close()
+            except (BufferError, ValueError):
+                maps.append([data, used])  # Still exported somewhere, try again later
+        self.maps = maps
+
+    def entry(self, source, box=None):
+        """
+        Return the table entry of a source image, or None if it is missing, out of date or invalid.
+
+        Every level is checked against the mapping, so a damaged or hand-edited table is a
+        cache miss and the image is decoded again, never a QImage over memory outside the file.
+
+        :param source: Absolute path of the image file.
+        :param box: (width, height) the largest level was fitted into; None accepts any box.
+        """
+        entry = self.table.get(source)
+        try:
+            if entry is None or (box is not None and entry["box"] != list(box)):
+                return None
+            if entry["version"] != source_version(source) or not entry["levels"]:
+                return None
+            if not all(self.fits(level) for level in entry["levels"]):
+                return None
+        except (OSError, KeyError, TypeError, ValueError):
+            return None
+        return entry
+
+    def fits(self, level):
+        # True if a level record describes whole rows of pixels inside the current mapping
+        width, height, bytes_per_line, image_format, offset = level
+        if not all(type(value) is int for value in level):
+            return False
+        return (width > 0 and height > 0 and bytes_per_line >= 4 * width and bytes_per_line % 4 == 0
+                and image_format == int(PACK_FORMAT) and offset >= 0
+                and self.pixels + offset + bytes_per_line * height <= len(self.data))
+
+    def levels(self, source, box):
+        """
+        Return the pyramid levels of an image straight from the mapped pack.
+
+        :param source: Absolute path of the image file.
+        :param box: (width, height) the largest level was fitted into.
+        :return: List of QImages over the mapped file, largest first, or None if the pack has no
+                 up-to-date entry for the image.
+        """
+        with self.lock:
+            self.refresh()
+            levels = self.mapped(self.entry(source, box))
+            if levels is not None:
+                self.used[source] = time.time()
+            return levels
+
+    def mapped(self, entry):
+        # QImages over the current mapping for each level of a checked table entry, None for no entry
+        if entry is None:
+            return None
+        levels = []
+        for width, height, bytes_per_line, image_format, offset in entry["levels"]:
+            address = ctypes.addressof(ctypes.c_char.from_buffer(self.data, self.pixels + offset))
+            levels.append(QImage(sip.voidptr(address), width, height, bytes_per_line, QImage.Format(image_format)))
+        self.maps[-1][1] = True  # The current mapping is the last one; it is never closed now
+        return levels
+
+    def release(self):
+        # Drop the pages of the current mapping this process has read, e.g. after they were copied
+        # elsewhere; they are read from the file again when needed
+        with self.lock:
+            if self.data is not None and hasattr(mmap, "MADV_DONTNEED"):
+                self.data.madvise(mmap.MADV_DONTNEED)
+
+    def add(self, source, box, levels):
+        """
+        Store the pyramid of an image, keeping the other up-to-date images of the pack.
+
+        :param source: Absolute path of the image file.
+        :param box: (width, height) the largest level was fitted into.
+        :param levels: The decoded levels, largest first.
+        :return: The levels over the new mapping, or None if the pack could not be written.
+        """
+        with self.lock:
+            self.refresh()
+            try:
+                version = source_version(source)
+            except OSError:
+                return None
+            now = time.time()
+            levels = [level.convertToFormat(PACK_FORMAT) for level in levels]  # No copy if already in it
+            entry = {"box": list(box), "version": version, "used": now,
+                     "levels": [[level.width(), level.height(), level.bytesPerLine(), int(PACK_FORMAT), 0]
+                                for level in levels]}
+            # (source, entry, pixels of each level) of every image in the new pack, the new one first
+            images = [(source, entry, [level.constBits().asstring(level.sizeInBytes()) for level in levels])]
+            size = sum(len(data) for data in images[0][2])
+            others = [(other, entry) for other, entry in self.table.items()
+                      if other != source and self.entry(other) is not None]
+            # Keep the most recently used of the other images while they fit, by this app or any other
+            others.sort(key=lambda other: -max(self.used.get(other[0], 0.0), other[1].get("used", 0.0)))
+            for other, entry in others:
+                pixels = [self.data[self.pixels + level[4]:self.pixels + level[4] + level[2] * level[1]]
+                          for level in entry["levels"]]
+                size += sum(len(data) for data in pixels)
+                if size > self.max_bytes:
+                    break
+                # Copy the levels, their offsets change and the current table must stay valid
+                used = max(self.used.get(other, 0.0), entry.get("used", 0.0))
+                images.append((other, dict(entry, used=used, levels=[list(level) for level in entry["levels"]]),
+                               pixels))
+
+            # Place every level after the one before, offsets counted from the start of the pixels
+            position = 0
+            for _, entry, pixels in images:
+                for level, data in zip(entry["levels"], pixels):
+                    level[4] = position
+                    position = align(position + len(data))
+            table = json.dumps({name: entry for name, entry, _ in images}).encode("utf-8")
+            start = align(PACK_HEADER.size + len(table))
+
+            temp_path = None
+            try:
+                # Write to a temporary file first so a running app never maps half a pack; mkstemp
+                # creates a new file, never opening one or a link another account put there
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp",
+                                                 dir=directory)
+                if hasattr(os, "fchmod"):
+                    os.fchmod(fd, self.mode)  # Set in full, whatever the umask is
+                with open(fd, "wb") as file:
+                    file.write(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(table), start))
+                    file.write(table)
+                    for _, entry, pixels in images:
+                        for level, data in zip(entry["levels"], pixels):
+                            file.seek(start + level[4])  # The gaps read back as zeros
+                            file.write(data)
+                os.replace(temp_path, self.path)
+            except OSError:
+                if temp_path is not None:
+                    try:
+                        os.remove(temp_path)
+                    except OSError:
+                        pass
+                return None
+            self.identity = None  # Map the new file
+            self.refresh()
+            return self.mapped(self.entry(source, box))
+
+
+def align(offset):
+    # The next offset on a PIXEL_ALIGNMENT boundary
+    return (offset + PIXEL_ALIGNMENT - 1) // PIXEL_ALIGNMENT * PIXEL_ALIGNMENT
+
+
+_pack = None
+
+
+def image_pack():
+    # The pack shared by every window, mapped on first use
+    global _pack
+    if _pack is None:
+        _pack = ImagePack()
+    return _pack
+
+
+if __name__ == "__main__":
+    import sys
+
+    from images import MAX_IMAGE_SIDE, PyramidLoadTask
+
+    # python imagepack.py decodes the window images into the pack ahead of the first launch,
+    # e.g. when setting up a kiosk; python imagepack.py --list shows what the pack holds
+    pack = image_pack()
+    if sys.argv[1:] != ["--list"]:
+        for name in WINDOW_IMAGES:
+            PyramidLoadTask(None, asset_path(name), MAX_IMAGE_SIDE, MAX_IMAGE_SIDE, pack).levels()
+    pack.refresh()
+    for source in sorted(pack.table):
+        entry = pack.entry(source)
+        if entry is None:
+            print("%-26s %-11s %s" % ("", "out of date", source))
+            continue
+        width, height = entry["levels"][0][:2]
+        print("%5d x %-5d %d levels  %-11s %s" % (width, height, len(entry["levels"]), "ok", source))
+    print("%s: %d bytes" % (pack.path, os.path.getsize(pack.path) if os.path.exists(pack.path) else 0))
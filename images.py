@@ -0,0 +1,303 @@
+# Import necessary modules and classes from PyQt5
+from PyQt5.QtCore import Qt, QObject, QRect, QRunnable, QSize, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QImage, QImageReader, QPainter
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+
+from imagepack import asset_path
+from sharedimages import shared_image_pack
+
+# Largest side of the biggest pyramid level in pixels, the same on every screen so one pack serves them all
+MAX_IMAGE_SIDE = 2048
+# Levels halve in size until their longest side is below this
+MIN_LEVEL_SIDE = 64
+# The exact, smoothly scaled image is made once the size has not changed for this long
+REFINE_DELAY_MS = 120
+# Colour of the box shown while an image is decoded
+PLACEHOLDER_COLOUR = "#1E1E1E"
+
+class ImageLoadSignals(QObject):
+    # QRunnable is not a QObject, so the results are delivered through this helper
+    finished = pyqtSignal(object, QImage)
+
+
+class ImageLoadTask(QRunnable):
+    def __init__(self, key, path, width, height, dpr=1.0):
+        """
+        Decode a single image in a worker thread.
+
+        :param key: The tuple identifying this request.
+        :param path: Path of the image file to decode.
+        :param width: Width of the box the image has to fit in.
+        :param height: Height of the box the image has to fit in.
+        :param dpr: Device pixel ratio of the screen the image is shown on.
+        """
+        super().__init__()
+        self.key = key
+        self.path = path
+        self.width = width
+        self.height = height
+        self.dpr = dpr
+        self.signals = ImageLoadSignals()
+
+    def run(self):
+        self.deliver(self.decode())
+
+    def deliver(self, result):
+        try:
+            self.signals.finished.emit(self.key, result)
+        except RuntimeError:
+            pass  # The application is shutting down and the loader is already gone
+
+    def decode(self):
+        # Only QImage may be used off the GUI thread, QPixmap must stay on it
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)  # Respect the EXIF orientation of photos
+
+        # Scale to device pixels so the image stays sharp on HiDPI screens
+        box = QSize(round(self.width * self.dpr), round(self.height * self.dpr))
+
+        # Ask the decoder to downscale while decoding (JPEG decodes straight to a smaller size)
+        source_size = reader.size()
+        if source_size.isValid():
+            target = source_size.scaled(box, Qt.KeepAspectRatio)
+            if target.width() < source_size.width():
+                reader.setScaledSize(target)
+
+        image = reader.read()
+        if not image.isNull():
+            # Finish with a smooth pass in case the decoder could not hit the exact size
+            if image.width() > box.width() or image.height() > box.height():
+                image = image.scaled(box, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            # Convert once here so the GUI thread does not have to when it is painted
+            image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+            image.setDevicePixelRatio(self.dpr)
+        return image
+
+
+class PyramidLoadSignals(QObject):
+    # Delivers the pyramid levels of a PyramidLoadTask, and whether they are mapped from the pack
+    finished = pyqtSignal(object, object)
+
+
+class PyramidLoadTask(ImageLoadTask):
+    def __init__(self, key, path, width, height, pack=None):
+        """
+        Read an image pyramid from the pack, or decode and pack it, in a worker thread.
+
+        :param key: The tuple identifying this request.
+        :param path: Absolute path of the image file.
+        :param width: Width of the largest level in device pixels.
+        :param height: Height of the largest level in device pixels.
+        :param pack: Optional ImagePack checked before decoding.
+        """
+        super().__init__(key, path, width, height, 1.0)
+        self.pack = pack
+        self.signals = PyramidLoadSignals()
+
+    def run(self):
+        self.deliver(self.levels())
+
+    def levels(self):
+        """
+        Return (levels, mapped): the pyramid, largest first, and True if it points into the pack.
+
+        An image packed by an earlier run, or by another window or app, is only mapped:
+        no decoding and no copy. Otherwise it is decoded once and added to the pack.
+        """
+        box = (self.width, self.height)
+        if self.pack is not None:
+            levels = self.pack.levels(self.path, box)
+            if levels is not None:
+                return levels, True
+        image = self.decode()
+        if image.isNull():
+            return [], False
+        levels = build_pyramid(image)
+        if self.pack is not None:
+            mapped = self.pack.add(self.path, box, levels)
+            if mapped is not None:
+                return mapped, True  # The decoded copies are freed, every window shares the mapped pages
+        return levels, False  # The pack cannot be written, e.g. a read-only home folder
+
+
+def build_pyramid(image):
+    """
+    Return the levels of an image pyramid, largest first.
+
+    Every level is a smooth half-size copy of the one before, so each one is as sharp
+    as a direct downscale while costing only a quarter of the pixels of the last.
+
+    :param image: The largest level.
+    """
+    levels = [image]
+    while max(levels[-1].width(), levels[-1].height()) >= 2 * MIN_LEVEL_SIDE:
+        level = levels[-1]
+        levels.append(level.scaled(max(1, level.width() // 2), max(1, level.height() // 2),
+                                   Qt.IgnoreAspectRatio, Qt.SmoothTransformation))
+    return levels
+
+
+def pick_level(levels, size):
+    # The smallest level that is at least size, so it is only ever scaled down; the largest if none is
+    for level in reversed(levels):
+        if level.width() >= size.width() and level.height() >= size.height():
+            return level
+    return levels[0]
+
+
+class ScaledImage(QWidget):
+    def __init__(self, path, size_hint, parent=None):
+        """
+        Show an image as large as its layout cell allows, sharp at any size and pixel ratio.
+
+        The image is decoded once, in the background, into a pyramid of levels that
+        halve in size. While the window is being resized every paint scales the nearest
+        larger level with a fast transform, which costs about the same for the 3 MB
+        PNG as for a small JPEG. Once the size has not changed for REFINE_DELAY_MS,
+        one smooth pass makes the exact image for the new size.
+        The image is never shown larger than its own pixels.
+
+        :param path: Path of the image file.
+        :param size_hint: Size the layout gives the image when there is room, e.g. QSize(400, 400).
+        :param parent: Optional parent widget.
+        """
+        super().__init__(parent)
+        self.hint = size_hint
+        self.levels = []  # Pyramid levels, largest first; empty until decoded
+        self.mapped = False  # True if the levels point into the image pack instead of the heap
+        self.exact = None  # Smoothly scaled image for the current size, None while it is out of date
+
+        self.refineTimer = QTimer(self)
+        self.refineTimer.setSingleShot(True)
+        self.refineTimer.setInterval(REFINE_DELAY_MS)
+        self.refineTimer.timeout.connect(self.refine)
+
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setMinimumSize(size_hint / 4)
+        image_loader().load_pyramid(self, path)
+
+    def sizeHint(self):
+        return self.hint
+
+    def set_levels(self, levels, mapped=False):
+        # Called by the loader once the pyramid is ready
+        self.levels = levels
+        self.mapped = mapped
+        self.exact = None
+        self.refineTimer.start()
+        self.update()
+
+    def image_bytes(self):
+        # Memory held by the pyramid and the exact image, for the window manager's budget;
+        # mapped levels are pages of the pack file that every window shares, so they are not counted
+        images = [] if self.mapped else list(self.levels)
+        if self.exact is not None and all(self.exact is not level for level in self.levels):
+            images.append(self.exact)
+        return sum(image.sizeInBytes() for image in images)
+
+    def image_rect(self):
+        # Where the image is drawn: fitted into the widget, centred, never larger than the largest level
+        if self.levels:
+            size = self.levels[0].size() / self.devicePixelRatioF()
+            size = size.scaled(size.boundedTo(self.size()), Qt.KeepAspectRatio)
+        else:
+            size = self.hint.boundedTo(self.size())  # Placeholder of the expected size
+        rect = QRect(0, 0, size.width(), size.height())
+        rect.moveCenter(self.rect().center())
+        return rect
+
+    def device_size(self, rect):
+        # The size of rect in device pixels
+        dpr = self.devicePixelRatioF()
+        return QSize(round(rect.width() * dpr), round(rect.height() * dpr))
+
+    def resizeEvent(self, event):
+        # The exact image no longer fits; paint from the pyramid until the size settles
+        self.exact = None
+        if self.levels:
+            self.refineTimer.start()
+        super().resizeEvent(event)
+
+    def refine(self):
+        # Make the exact image for the settled size with one smooth pass from the nearest larger level
+        if not self.levels:
+            return
+        size = self.device_size(self.image_rect())
+        if size.isEmpty():
+            return
+        level = pick_level(self.levels, size)
+        self.exact = level if level.size() == size else level.scaled(size, Qt.IgnoreAspectRatio,
+                                                                       Qt.SmoothTransformation)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = self.image_rect()
+        if not self.levels:
+            painter.fillRect(rect, QColor(PLACEHOLDER_COLOUR))
+        elif self.exact is not None:
+            painter.drawImage(rect, self.exact)  # Exactly the device pixels of rect, no scaling
+        else:
+            painter.drawImage(rect, pick_level(self.levels, self.device_size(rect)))  # Fast transform
+        painter.end()
+
+
+class ImageLoader(QObject):
+    def __init__(self, max_threads=2, pack=None):
+        """
+        Decode window images in a pool of worker threads.
+
+        :param max_threads: Number of images that may be decoded at the same time.
+        :param pack: ImagePack used to skip decoding, None disables it.
+        """
+        super().__init__()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self.pack = pack
+        self.pending = {}  # Views waiting for each (path, width, height) request
+        self.tasks = {}  # Running tasks, kept alive until their result arrives
+
+    def load_pyramid(self, view, path):
+        """
+        Load the pyramid of an image for a ScaledImage, sharing the work with other windows.
+
+        :param view: The ScaledImage that shows the image.
+        :param path: Path of the image file, relative paths are found next to App.py.
+        """
+        # One box on every screen, so the pack made on one screen serves them all; levels
+        # larger than a window shows are never touched, so their pages are never read
+        key = (asset_path(path), MAX_IMAGE_SIDE, MAX_IMAGE_SIDE)
+        if key in self.pending:
+            # Another window already asked for the same image, share the result
+            self.pending[key].append(view)
+            return
+        self.pending[key] = [view]
+
+        task = PyramidLoadTask(key, key[0], MAX_IMAGE_SIDE, MAX_IMAGE_SIDE, self.pack)
+        task.signals.finished.connect(self.on_finished)
+        self.tasks[key] = task
+        self.pool.start(task)
+
+    def on_finished(self, key, result):
+        # Runs on the GUI thread: hand the pyramid to every waiting view
+        levels, mapped = result
+        self.tasks.pop(key, None)
+        views = self.pending.pop(key, [])
+        if not levels:
+            return  # Keep the placeholder if the file is missing or unreadable
+        for view in views:
+            try:
+                view.set_levels(levels, mapped)
+            except RuntimeError:
+                pass  # The window was closed and deleted before the image was ready
+
+
+_loader = None
+
+
+def image_loader():
+    # Create the shared loader on first use (it needs a running QApplication)
+    global _loader
+    if _loader is None:
+        _loader = ImageLoader(pack=shared_image_pack())
+    return _loader
@@ -0,0 +1,133 @@
+import json  # Requests are sent to the running app as one JSON line
+import os  # Used to build the socket path
+import socket  # Later launches talk to the running app over a local socket
+import stat  # Used to check who owns the socket
+import sys  # Used to tell the operating systems apart
+
+from paths import APP_NAME, user_data_dir
+
+# Seconds a later launch waits for the running app to confirm a request
+REPLY_TIMEOUT = 1.0
+# Longest request line accepted, a request is a handful of words
+MAX_REQUEST_BYTES = 64 * 1024
+
+# Options that always start a new process instead of handing the launch over
+NEW_INSTANCE_OPTIONS = ("--new-instance", "--profile-startup", "-h", "--help")
+
+
+def supported():
+    # Local sockets that Python can reach without PyQt5 are needed, e.g. not on Windows
+    return hasattr(socket, "AF_UNIX") and sys.platform != "win32"
+
+
+def owned_by_user(path):
+    # True if the current user owns path, so no other account can have put it there
+    try:
+        return os.lstat(path).st_uid == os.getuid()
+    except OSError:
+        return False
+
+
+def socket_path():
+    """
+    Return the socket of the user's running app, e.g. /run/user/1000/StudentToolkit.sock.
+
+    One socket per user, so students sharing a lab machine each get their own app. It lives in
+    a folder only the user can write to, so another account cannot put its own socket there
+    first: the runtime folder, or else a private run folder in user_data_dir() that is created
+    with mode 0700. A shared folder such as /tmp is never used.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir) and owned_by_user(runtime_dir):
+        return os.path.join(runtime_dir, "%s.sock" % APP_NAME)
+    directory = os.path.join(user_data_dir(), "run")
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        os.chmod(directory, 0o700)  # makedirs leaves an existing folder as it is
+    except OSError:
+        pass  # Then nothing can listen there either, and every launch starts its own app
+    return os.path.join(directory, "%s.sock" % APP_NAME)
+
+
+def is_own_socket(path):
+    # True if path is a socket of the current user, the only kind a launch hands over to
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(info.st_mode) and info.st_uid == os.getuid()
+
+
+def encode_request(args):
+    # The request line a later launch sends
+    return (json.dumps({"args": list(args), "cwd": os.getcwd()}) + "\n").encode("utf-8")
+
+
+def decode_request(line):
+    """
+    Read a request line sent by a later launch.
+
+    :param line: One line of bytes.
+    :return: The launch's command line arguments, or None if the line is not a valid request.
+    """
+    try:
+        request = json.loads(line.decode("utf-8"))
+        args = request["args"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+        return None
+    return args
+
+
+def hand_off(args, path=None, timeout=REPLY_TIMEOUT):
+    """
+    Pass a launch to the app that is already running, if there is one.
+
+    Called before PyQt5 is imported, so handing a launch over only costs starting
+    Python and one round trip over the socket. A socket left behind by an app that
+    crashed refuses the connection, and the launch starts normally.
+
+    :param args: The command line arguments of this launch, without the program name.
+    :param path: The socket, defaults to socket_path().
+    :param timeout: Seconds to wait for the running app to confirm the request.
+    :return: True if the running app took the request and this launch can exit.
+    """
+    if not supported() or os.environ.get("STUDENT_TOOLKIT_SINGLE_INSTANCE") == "0":
+        return False
+    if any(arg.split("=", 1)[0] in NEW_INSTANCE_OPTIONS for arg in args):
+        return False
+    path = path or socket_path()
+    if not is_own_socket(path):
+        return False  # No app running, or a socket of another account that must not see this launch
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(path)
+    except OSError:
+        client.close()
+        return False  # No app running, or a stale socket
+    try:
+        client.sendall(encode_request(args))
+        client.recv(64)  # The confirmation, so the request is not lost when this process exits
+    except OSError:
+        pass  # The request was sent; a busy app still reads it once its event loop is free
+    finally:
+        client.close()
+    return True
+
+
+def is_stale(path=None):
+    # True if nothing of this user answers on the socket, e.g. it was left behind by an app that crashed
+    path = path or socket_path()
+    if not is_own_socket(path):
+        return True
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(REPLY_TIMEOUT)
+    try:
+        client.connect(path)
+        return False
+    except OSError:
+        return True
+    finally:
+        client.close()
@@ -0,0 +1,176 @@
+import json  # Requests and results are sent to and from the helper as JSON lines
+import os  # Used to find this file, which is also the helper
+import sys  # Used to start the helper with the same Python
+import time  # Used to ignore repeated clicks on the same link
+from collections import deque
+
+# Import necessary modules and classes from PyQt5
+from PyQt5.QtCore import QCoreApplication, QObject, QProcess, QUrl, pyqtSignal
+from PyQt5.QtGui import QDesktopServices
+
+from usage import usage_log
+
+# Launching the same URL again within this many seconds is ignored, e.g. after a double-click
+DEDUPE_SECONDS = 2.0
+
+
+class UrlLauncher(QObject):
+    # Emitted for every URL that was handed to a browser: url, success, message (the error, or a note
+    # that the saved copy was opened because the site is down)
+    finished = pyqtSignal(str, bool, str)
+
+    def __init__(self, dedupe_seconds=DEDUPE_SECONDS):
+        """
+        Open URLs in the web browser without blocking the GUI thread.
+
+        Requests are queued and passed to a long-lived helper process, which
+        starts the browser and reports back. Repeated launches of the same URL
+        within dedupe_seconds are dropped, so a double-click opens one tab.
+        When a site is down and pagecache.py has a saved copy of the page, the
+        helper opens the copy instead.
+
+        :param dedupe_seconds: Time in which a repeated launch of a URL is ignored.
+        """
+        super().__init__()
+        self.dedupe_seconds = dedupe_seconds
+        self.queue = deque()  # Requests waiting for the helper to start
+        self.recent = {}  # URL -> time it was last requested
+        self.next_id = 0
+        self.buffer = b""  # Incomplete line of helper output
+        self.in_flight = {}  # Request id -> URL sent to the helper and not answered yet
+        self.process = None
+
+    def open(self, url):
+        """
+        Queue a URL to be opened.
+
+        :param url: The URL to open.
+        :return: False if the same URL was requested a moment ago and is skipped.
+        """
+        now = time.monotonic()
+        if now - self.recent.get(url, -self.dedupe_seconds) < self.dedupe_seconds:
+            return False
+        self.recent = {key: when for key, when in self.recent.items() if now - when < self.dedupe_seconds}
+        self.recent[url] = now
+        usage_log().record(url)  # Only queued, the usage log is written in the background
+
+        self.next_id += 1
+        self.queue.append({"id": self.next_id, "url": url})
+        self.flush()
+        return True
+
+    def helper(self):
+        # Start the helper the first time a URL is opened, or again if it died
+        if self.process is None or self.process.state() == QProcess.NotRunning:
+            self.process = QProcess(self)
+            self.process.readyReadStandardOutput.connect(self.on_output)
+            self.process.started.connect(self.flush)
+            self.process.errorOccurred.connect(self.on_error)
+            self.process.finished.connect(self.on_exit)
+            self.buffer = b""
+            self.process.start(sys.executable, [os.path.abspath(__file__)])
+        return self.process
+
+    def flush(self):
+        # Send the queued requests once the helper is running
+        process = self.helper()
+        if process.state() != QProcess.Running:
+            return  # Sent from the started signal
+        while self.queue:
+            request = self.queue.popleft()
+            self.in_flight[request["id"]] = request["url"]
+            process.write((json.dumps(request) + "\n").encode("utf-8"))
+
+    def on_output(self):
+        # One JSON line per opened URL
+        self.buffer += bytes(self.process.readAllStandardOutput())
+        *lines, self.buffer = self.buffer.split(b"\n")
+        for line in lines:
+            try:
+                result = json.loads(line.decode("utf-8"))
+            except ValueError:
+                continue
+            self.in_flight.pop(result.get("id"), None)
+            self.finished.emit(result.get("url") or "", bool(result.get("ok")), result.get("error") or "")
+
+    def on_error(self, error):
+        # The helper could not be started: open what is queued the blocking way rather than not at all
+        if error != QProcess.FailedToStart:
+            return  # A crash is handled by starting a new helper on the next request
+        while self.queue:
+            url = self.queue.popleft()["url"]
+            ok = QDesktopServices.openUrl(QUrl(url))
+            self.finished.emit(url, ok, "" if ok else "could not start the browser")
+
+    def on_exit(self):
+        # The helper died: report the URLs it was still working on instead of leaving them hanging
+        for url in self.in_flight.values():
+            self.finished.emit(url, False, "the link helper stopped")
+        self.in_flight.clear()
+
+    def close(self):
+        # Let the helper finish the queued links and exit, called when the app quits
+        if self.process is not None and self.process.state() != QProcess.NotRunning:
+            self.process.finished.disconnect(self.on_exit)
+            self.process.closeWriteChannel()  # The helper exits at the end of its input
+            if not self.process.waitForFinished(1000):
+                self.process.kill()
+
+
+_launcher = None
+
+
+def url_launcher():
+    # Create the shared launcher on first use (it needs a running QApplication)
+    global _launcher
+    if _launcher is None:
+        _launcher = UrlLauncher()
+        QCoreApplication.instance().aboutToQuit.connect(_launcher.close)
+    return _launcher
+
+
+def open_url(url):
+    """
+    Open a URL in the web browser without blocking the GUI thread.
+
+    :param url: The URL to open.
+    """
+    return url_launcher().open(url)
+
+
+def helper_main():
+    """
+    The helper process: read one JSON request per line and open its URL.
+
+    Opening a browser can block for a while (on Linux it forks xdg-open), so it is
+    done here instead of on the GUI thread. Every request is answered with one
+    JSON line saying whether the browser could be started. A page that has a
+    saved copy is opened from disk when its site does not answer quickly.
+    """
+    import pathlib
+    import webbrowser
+
+    from pagecache import offline_copy
+
+    for line in sys.stdin:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue
+        try:
+            saved = offline_copy(request["url"])  # Only probes the site if there is a copy to fall back on
+            ok = webbrowser.open(pathlib.Path(saved).as_uri() if saved else request["url"])
+            if not ok:
+                error = "no web browser found"
+            else:
+                error = "The site is not reachable, opened the saved copy" if saved else ""
+        except Exception as exception:  # The helper must keep running for the next link
+            ok, error = False, str(exception)
+        sys.stdout.write(json.dumps({"id": request.get("id"), "url": request.get("url"), "ok": ok, "error": error}))
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    # Started by UrlLauncher as: python launcher.py
+    helper_main()
@@ -0,0 +1,251 @@
+import argparse  # Used to read the command line options
+import asyncio  # Every link is checked concurrently on one event loop
+import json  # Results are cached as JSON
+import os  # Used to build the cache path
+import sys  # Used to exit with an error code when links are broken
+import threading  # The app checks its links in a background thread
+import time  # Results remember when they were checked
+from collections import namedtuple
+
+from http_pool import HttpError, HttpPool
+from paths import user_cache_dir
+
+# Links checked at the same time over all hosts, and per host
+CONCURRENCY = 16
+PER_HOST_LIMIT = 2
+# Seconds one link may take to answer
+TIMEOUT = 10.0
+# The app checks a link again in the background once its result is older than this
+MAX_AGE = 24 * 60 * 60
+CACHE_VERSION = 1
+
+# What a result means for the tile showing the link
+OK = "ok"  # The page answered
+RESTRICTED = "restricted"  # The server answered but wants a login or refused the checker, e.g. the Sentral portal
+BROKEN = "broken"  # The page does not exist (any more)
+SERVER_ERROR = "server-error"  # The server failed to answer the request
+UNREACHABLE = "unreachable"  # No answer at all: unknown host, refused connection or timeout
+
+# States that get a badge on the tile showing the link
+PROBLEMS = (BROKEN, SERVER_ERROR, UNREACHABLE)
+
+LinkResult = namedtuple("LinkResult", "url state status error final_url etag last_modified checked")
+
+
+def classify(status):
+    # Health state of an HTTP status code
+    if status < 400 or status == 304:
+        return OK
+    if status in (401, 403, 407, 429, 451):
+        return RESTRICTED
+    if status >= 500:
+        return SERVER_ERROR
+    return BROKEN
+
+
+def has_problem(result):
+    # True if the tile of a result should carry a badge
+    return result is not None and result.state in PROBLEMS
+
+
+def cache_path():
+    # The results live in the cache folder, e.g. ~/.cache/StudentToolkit/links.json
+    return os.path.join(user_cache_dir(), "links.json")
+
+
+def load_results(path=None):
+    """
+    Read the cached results.
+
+    :param path: Cache file, defaults to cache_path().
+    :return: Dictionary of URL -> LinkResult, empty if there is no valid cache.
+    """
+    try:
+        with open(path or cache_path(), "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != CACHE_VERSION:
+            return {}
+        return {url: LinkResult(url, *(entry.get(field) for field in LinkResult._fields[1:]))
+                for url, entry in data["results"].items()}
+    except (OSError, ValueError, KeyError, AttributeError, TypeError):
+        return {}
+
+
+def save_results(results, path=None):
+    """
+    Merge results into the cache file.
+
+    :param results: Dictionary of URL -> LinkResult.
+    :param path: Cache file, defaults to cache_path().
+    """
+    path = path or cache_path()
+    merged = load_results(path)
+    merged.update(results)
+    data = {"version": CACHE_VERSION,
+            "results": {url: dict(result._asdict()) for url, result in merged.items()}}
+    try:
+        # Write to a temporary file first so a reader never sees half a cache
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=1)
+        os.replace(temp_path, path)
+    except OSError:
+        pass  # The results are still returned, they are just not remembered
+
+
+async def check_link(pool, url, previous=None):
+    """
+    Check one link.
+
+    A HEAD request is tried first, it keeps the connection reusable and downloads
+    nothing. Servers that do not answer HEAD properly get a GET whose body is
+    skipped. The ETag and Last-Modified of the last check are sent along, so an
+    unchanged page only costs a 304 answer.
+
+    :param pool: The HttpPool to send the requests through.
+    :param url: The link to check.
+    :param previous: The LinkResult of the last check, or None.
+    :return: A LinkResult.
+    """
+    headers = {}
+    if previous is not None and previous.state == OK:
+        if previous.etag:
+            headers["If-None-Match"] = previous.etag
+        if previous.last_modified:
+            headers["If-Modified-Since"] = previous.last_modified
+    try:
+        response = await pool.request("HEAD", url, headers)
+        if response.status >= 400:
+            # Some servers reject or mishandle HEAD, ask again the way a browser would
+            response = await pool.request("GET", url, headers, read_body=False)
+    except HttpError as error:
+        return LinkResult(url, UNREACHABLE, 0, str(error), url, None, None, time.time())
+
+    if response.status == 304 and previous is not None:
+        return previous._replace(checked=time.time())  # Not modified since the last check
+    return LinkResult(url, classify(response.status), response.status,
+                      "" if response.status < 400 else "%d %s" % (response.status, response.reason),
+                      response.url, response.headers.get("etag"), response.headers.get("last-modified"), time.time())
+
+
+async def check_links(urls, previous=None, concurrency=CONCURRENCY, per_host=PER_HOST_LIMIT, timeout=TIMEOUT,
+                      progress=None):
+    """
+    Check many links concurrently.
+
+    :param urls: The links to check; duplicates are checked once.
+    :param previous: Dictionary of URL -> LinkResult from the last check, for conditional requests.
+    :param concurrency: Links checked at the same time over all hosts.
+    :param per_host: Links checked at the same time on one host.
+    :param timeout: Seconds one link may take.
+    :param progress: Optional function called with every LinkResult as it arrives.
+    :return: Dictionary of URL -> LinkResult.
+    """
+    previous = previous or {}
+    pool = HttpPool(per_host=per_host, timeout=timeout)
+    limit = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async def check(url):
+        async with limit:
+            result = await check_link(pool, url, previous.get(url))
+        results[url] = result
+        if progress is not None:
+            progress(result)
+
+    try:
+        await asyncio.gather(*(check(url) for url in dict.fromkeys(urls)))
+    finally:
+        await pool.close()
+    return results
+
+
+def stale_urls(urls, results, max_age=MAX_AGE):
+    # The links that were never checked or were checked longer than max_age seconds ago
+    now = time.time()
+    return [url for url in dict.fromkeys(urls)
+            if url not in results or now - (results[url].checked or 0) > max_age]
+
+
+def catalog_urls(catalog):
+    # Every distinct link in the catalog, in catalog order
+    return list(dict.fromkeys(item.url for item in catalog.all_items() if item.url))
+
+
+def check_in_background(urls, callback, path=None, max_age=MAX_AGE):
+    """
+    Read the cached results, then check the links that are due, all in a background thread.
+
+    :param urls: The links shown by the app, or a function returning them that is called in the thread,
+                 e.g. to read them from a large catalog.
+    :param callback: Called from the background thread with a dictionary of results: first the cached
+                     ones, if there are any, then the new ones once they are checked.
+    :param path: Cache file, defaults to cache_path().
+    :param max_age: Seconds after which a cached result is checked again.
+    :return: The thread.
+    """
+    def run():
+        previous = load_results(path)
+        if previous:
+            callback(previous)
+        due = stale_urls(urls() if callable(urls) else urls, previous, max_age)
+        if not due:
+            return  # Every cached result is still fresh
+        results = asyncio.run(check_links(due, previous))
+        if all(result.state == UNREACHABLE for result in results.values()):
+            return  # Nothing answered at all: the computer is offline, which says nothing about the links
+        save_results(results, path)
+        callback(results)
+
+    thread = threading.Thread(target=run, name="link-check", daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check every link of the Student Toolkit catalog")
+    parser.add_argument("urls", nargs="*", help="links to check instead of the catalog")
+    parser.add_argument("--catalog", help="catalog JSON file (default: STUDENT_TOOLKIT_CATALOG or catalog.json)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="links checked at the same time (default %(default)s)")
+    parser.add_argument("--per-host", type=int, default=PER_HOST_LIMIT,
+                        help="links checked at the same time on one host (default %(default)s)")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="seconds per link (default %(default)s)")
+    parser.add_argument("--max-age", type=float, default=0,
+                        help="only check links whose cached result is older than this many hours")
+    parser.add_argument("--cache", help="results file (default: links.json in the user cache folder)")
+    args = parser.parse_args()
+
+    if args.urls:
+        urls = list(dict.fromkeys(args.urls))
+    else:
+        from catalog import load_catalog
+        urls = catalog_urls(load_catalog(args.catalog))
+
+    previous = load_results(args.cache)
+    due = stale_urls(urls, previous, args.max_age * 3600)
+
+    def progress(result):
+        if not args.json:
+            print("%-12s %3s  %s%s" % (result.state, result.status or "", result.url,
+                                       "  (%s)" % result.error if result.error else ""), flush=True)
+
+    results = asyncio.run(check_links(due, previous, max(1, args.concurrency), max(1, args.per_host),
+                                      args.timeout, progress))
+    save_results(results, args.cache)
+
+    results = {url: results.get(url) or previous[url] for url in urls}
+    if args.json:
+        json.dump([dict(result._asdict()) for result in results.values()], sys.stdout, indent=2)
+        print()
+    else:
+        problems = sum(has_problem(result) for result in results.values())
+        print("%d links, %d checked now, %d with problems" % (len(urls), len(due), problems))
+    if any(has_problem(result) for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import argparse  # Used to read the command line options
+import asyncio  # Pages are downloaded concurrently on one event loop
+import hashlib  # Used to build file names for the cached pages
+import json  # Page details are stored as JSON next to the page
+import mimetypes  # Picks the file extension a browser needs to show a saved page
+import os  # Used to build the cache paths
+import re  # Used to point relative links of a saved page back at the site
+import socket  # Used to find out whether a site answers before opening it
+import threading  # The app prefetches in a background thread
+import time  # Pages remember when they were downloaded
+from urllib.parse import urlsplit
+
+from http_pool import HttpError, HttpPool
+from paths import user_cache_dir
+
+# Total size the saved pages may use on disk before the least recently used ones are evicted
+PAGE_CACHE_LIMIT = 64 * 1024 * 1024
+# Larger pages (e.g. big Google Drive downloads) are not saved
+MAX_PAGE_BYTES = 4 * 1024 * 1024
+# Pages downloaded at the same time over all hosts, and per host
+CONCURRENCY = 8
+PER_HOST_LIMIT = 2
+TIMEOUT = 20.0
+# The app revalidates a saved page in the background once it is older than this
+MAX_AGE = 12 * 60 * 60
+# A site that cannot be connected to within this many seconds counts as down, and its saved copy is opened
+PROBE_TIMEOUT = 1.5
+
+
+def page_cache_directory():
+    # Saved pages live in the per-user cache folder, e.g. ~/.cache/StudentToolkit/pages
+    return os.path.join(user_cache_dir(), "pages")
+
+
+class PageCache:
+    def __init__(self, directory=None, max_bytes=PAGE_CACHE_LIMIT):
+        """
+        Keep copies of the catalog's web pages on disk for when the network is down.
+
+        Every page is stored as a file a browser can open, next to a small JSON file
+        with its URL, ETag and Last-Modified, so it can be revalidated cheaply. Opening
+        a saved page marks it as used; above max_bytes the least recently used pages
+        are removed first.
+
+        :param directory: Folder that holds the saved pages, defaults to page_cache_directory().
+        :param max_bytes: Size cap of the saved pages.
+        """
+        self.directory = directory or page_cache_directory()
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()  # Stores may come from the prefetch thread and the GUI thread
+        self.total_bytes = None  # Size of the cache on disk, counted on the first store
+
+    def meta_name(self, url):
+        # The details file of a URL, the page file has the same name with its own extension
+        return os.path.join(self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest()[:20] + ".json")
+
+    def meta(self, url):
+        # Details of the saved copy of a URL, or None if there is none
+        try:
+            with open(self.meta_name(url), "r", encoding="utf-8") as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not os.path.exists(os.path.join(self.directory, meta.get("file", ""))):
+            return None
+        return meta
+
+    def lookup(self, url):
+        """
+        Return the path of the saved copy of a URL, or None, and mark it as recently used.
+        """
+        meta = self.meta(url)
+        if meta is None:
+            return None
+        path = os.path.join(self.directory, meta["file"])
+        try:
+            os.utime(path)  # Mark the page as recently used for the LRU eviction
+        except OSError:
+            pass
+        return path
+
+    def store(self, url, response):
+        """
+        Save a downloaded page, replacing an older copy.
+
+        :param url: The URL the page was requested for.
+        :param response: The http_pool Response with the full body.
+        """
+        content_type = response.headers.get("content-type", "text/html").split(";")[0].strip().lower()
+        extension = ".html" if content_type in ("text/html", "application/xhtml+xml") else \
+            (mimetypes.guess_extension(content_type) or ".html")
+        meta_name = self.meta_name(url)
+        file_name = os.path.basename(meta_name)[:-len(".json")] + extension
+        body = response.body
+        if extension == ".html":
+            body = with_base_url(body, response.url)
+        meta = {"url": url, "final_url": response.url, "file": file_name, "content_type": content_type,
+                "etag": response.headers.get("etag"), "last_modified": response.headers.get("last-modified"),
+                "fetched": time.time(), "checked": time.time()}
+
+        with self.lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                if self.total_bytes is None:
+                    self.total_bytes = sum(size for _, size, _ in self.entries())
+                self.remove(url)  # The old copy may have had another extension
+
+                # Write to temporary files first so the launcher never opens half a page
+                for name, data in ((file_name, body), (os.path.basename(meta_name), json.dumps(meta).encode("utf-8"))):
+                    path = os.path.join(self.directory, name)
+                    temp_name = "%s.%d.tmp" % (path, threading.get_ident())
+                    with open(temp_name, "wb") as file:
+                        file.write(data)
+                    os.replace(temp_name, path)
+                    self.total_bytes += len(data)
+            except OSError:
+                return  # The cache is an optimisation only, a read-only home folder is fine
+
+            self.evict()
+
+    def revalidated(self, url):
+        # The server said the saved copy is still current, remember when that was checked
+        meta = self.meta(url)
+        if meta is None:
+            return
+        meta["checked"] = time.time()
+        try:
+            with open(self.meta_name(url), "w", encoding="utf-8") as file:
+                json.dump(meta, file)
+        except OSError:
+            pass
+
+    def pages(self):
+        # Details of every saved page, with the full path of its file under "path"
+        for meta_name, _, _ in self.entries():
+            try:
+                with open(meta_name, "r", encoding="utf-8") as file:
+                    meta = json.load(file)
+            except (OSError, ValueError):
+                continue
+            meta["path"] = os.path.join(self.directory, meta["file"])
+            yield meta
+
+    def entries(self):
+        # List (details file, size of page and details, last use) for every saved page
+        result = []
+        if not os.path.isdir(self.directory):
+            return result
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            meta_name = os.path.join(self.directory, name)
+            try:
+                with open(meta_name, "r", encoding="utf-8") as file:
+                    page_name = os.path.join(self.directory, json.load(file)["file"])
+                page = os.stat(page_name)
+                size = page.st_size + os.path.getsize(meta_name)
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+            result.append((meta_name, size, page.st_mtime))
+        return result
+
+    def evict(self):
+        # Remove the least recently used pages until the cache fits in its size cap
+        if self.total_bytes <= self.max_bytes:
+            return
+        for meta_name, _, _ in sorted(self.entries(), key=lambda entry: entry[2]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.remove_files(meta_name)
+
+    def remove(self, url):
+        # Delete the saved copy of a URL, if there is one
+        self.remove_files(self.meta_name(url))
+
+    def remove_files(self, meta_name):
+        # Delete a page and its details file and keep the running total in step
+        try:
+            with open(meta_name, "r", encoding="utf-8") as file:
+                names = [os.path.join(self.directory, json.load(file)["file"]), meta_name]
+        except (OSError, ValueError, KeyError, TypeError):
+            names = [meta_name]
+        for name in names:
+            try:
+                size = os.path.getsize(name)
+                os.remove(name)
+            except OSError:
+                continue
+            self.total_bytes = max(0, (self.total_bytes or 0) - size)
+
+
+def with_base_url(body, url):
+    # Point the relative links, styles and scripts of a saved page at the site it came from
+    if re.search(rb"<base[\s>]", body[:4096], re.IGNORECASE):
+        return body
+    tag = b'<base href="%s">' % url.replace('"', "%22").encode("utf-8")
+    match = re.search(rb"<head[^>]*>", body[:4096], re.IGNORECASE)
+    if match is None:
+        return tag + body
+    return body[:match.end()] + tag + body[match.end():]
+
+
+async def prefetch_page(pool, cache, url, max_page=MAX_PAGE_BYTES):
+    """
+    Download a page into the cache, or confirm the saved copy is still current.
+
+    :param pool: The HttpPool to send the request through.
+    :param cache: The PageCache to store the page in.
+    :param url: The page to download.
+    :param max_page: Pages larger than this are not saved.
+    :return: "saved", "unchanged", "skipped" or "failed".
+    """
+    headers = {}
+    meta = cache.meta(url)
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        # One byte more than allowed tells a page that is too large from one that fits exactly
+        response = await pool.request("GET", url, headers, max_body=max_page + 1)
+    except HttpError:
+        return "failed"
+
+    if response.status == 304 and meta is not None:
+        cache.revalidated(url)
+        return "unchanged"
+    if response.status != 200 or len(response.body) > max_page:
+        return "skipped"
+    cache.store(url, response)
+    return "saved"
+
+
+async def prefetch(urls, cache, concurrency=CONCURRENCY, per_host=PER_HOST_LIMIT, timeout=TIMEOUT,
+                   max_page=MAX_PAGE_BYTES, progress=None):
+    """
+    Download many pages into the cache concurrently.
+
+    :param urls: The pages to download; duplicates are downloaded once.
+    :param cache: The PageCache to store them in.
+    :param concurrency: Pages downloaded at the same time over all hosts.
+    :param per_host: Pages downloaded at the same time from one host.
+    :param timeout: Seconds one page may take.
+    :param max_page: Pages larger than this are not saved.
+    :param progress: Optional function called with the URL and outcome of every page.
+    :return: Dictionary of URL -> outcome, see prefetch_page().
+    """
+    pool = HttpPool(per_host=per_host, timeout=timeout)
+    limit = asyncio.Semaphore(concurrency)
+    outcomes = {}
+
+    async def fetch(url):
+        async with limit:
+            outcomes[url] = await prefetch_page(pool, cache, url, max_page)
+        if progress is not None:
+            progress(url, outcomes[url])
+
+    try:
+        await asyncio.gather(*(fetch(url) for url in dict.fromkeys(urls)))
+    finally:
+        await pool.close()
+    return outcomes
+
+
+def stale_urls(urls, cache, max_age=MAX_AGE):
+    # The pages that were never saved or were last checked longer than max_age seconds ago
+    now = time.time()
+    due = []
+    for url in dict.fromkeys(urls):
+        meta = cache.meta(url)
+        if meta is None or now - meta.get("checked", 0) > max_age:
+            due.append(url)
+    return due
+
+
+def prefetch_in_background(urls, cache=None, max_age=MAX_AGE, callback=None):
+    """
+    Pick the pages that are due and download them, all in a background thread.
+
+    :param urls: The pages shown by the app, or a function returning them that is called in the thread,
+                 e.g. to read them from a large catalog.
+    :param cache: The PageCache, defaults to one in page_cache_directory().
+    :param max_age: Seconds after which a saved page is revalidated.
+    :param callback: Optional function called from the thread with the outcomes when done, an empty
+                     dictionary if every saved page was still fresh.
+    :return: The thread.
+    """
+    cache = cache or PageCache()
+
+    def run():
+        # Reading the details file of every saved page is disk work too, so it stays off the caller's thread
+        due = stale_urls(urls() if callable(urls) else urls, cache, max_age)
+        outcomes = asyncio.run(prefetch(due, cache)) if due else {}
+        if callback is not None:
+            callback(outcomes)
+
+    thread = threading.Thread(target=run, name="page-prefetch", daemon=True)
+    thread.start()
+    return thread
+
+
+def reachable(url, timeout=PROBE_TIMEOUT):
+    # True if the site of a URL accepts a connection within timeout seconds
+    parts = urlsplit(url)
+    if not parts.hostname:
+        return True
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    try:
+        socket.create_connection((parts.hostname, port), timeout).close()
+    except OSError:
+        return False
+    return True
+
+
+def offline_copy(url, cache=None, timeout=PROBE_TIMEOUT):
+    """
+    Return the saved copy of a URL if its site is down or too slow to connect to, else None.
+
+    The site is only probed when there is a saved copy to fall back on.
+
+    :param url: The URL about to be opened.
+    :param cache: The PageCache, defaults to one in page_cache_directory().
+    :param timeout: Seconds a connection may take before the site counts as down.
+    """
+    cache = cache or PageCache()
+    if cache.meta(url) is None or reachable(url, timeout):
+        return None
+    return cache.lookup(url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Save the pages of the Student Toolkit catalog for offline use")
+    parser.add_argument("urls", nargs="*", help="pages to save instead of the catalog")
+    parser.add_argument("--catalog", help="catalog JSON file (default: STUDENT_TOOLKIT_CATALOG or catalog.json)")
+    parser.add_argument("--directory", help="cache folder (default: pages in the user cache folder)")
+    parser.add_argument("--budget", type=float, default=PAGE_CACHE_LIMIT / 1024 / 1024,
+                        help="disk budget in MB (default %(default)g)")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="seconds per page (default %(default)s)")
+    parser.add_argument("--list", action="store_true", help="list the saved pages instead of downloading")
+    args = parser.parse_args()
+
+    cache = PageCache(args.directory, int(args.budget * 1024 * 1024))
+    if args.list:
+        for meta_name, size, used in sorted(cache.entries(), key=lambda entry: -entry[2]):
+            with open(meta_name, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+            print("%8d KB  %s  %s" % (size // 1024, time.strftime("%Y-%m-%d %H:%M", time.localtime(used)), meta["url"]))
+        return
+
+    if args.urls:
+        urls = args.urls
+    else:
+        from catalog import load_catalog
+        urls = [item.url for item in load_catalog(args.catalog).all_items() if item.url]
+    outcomes = asyncio.run(prefetch(urls, cache, timeout=args.timeout,
+                                    progress=lambda url, outcome: print("%-9s %s" % (outcome, url), flush=True)))
+    counts = {}
+    for outcome in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    print(", ".join("%d %s" % (count, outcome) for outcome, count in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import os  # Import the os module to build the folder paths
+import sys  # Used to tell the operating systems apart
+
+# Name of the per-user folders the toolkit keeps its files in
+APP_NAME = "StudentToolkit"
+
+# Folder App.py and its assets live in, so files are found from any working directory
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def user_cache_dir():
+    # Folder for files that can be rebuilt at any time, e.g. ~/.cache/StudentToolkit
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        return os.path.join(base, APP_NAME, "cache")
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~/Library/Caches"), APP_NAME)
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, APP_NAME)
+
+
+def user_data_dir():
+    # Folder for files that should survive a restart, e.g. ~/.local/share/StudentToolkit
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~\\AppData\\Roaming")
+        return os.path.join(base, APP_NAME)
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~/Library/Application Support"), APP_NAME)
+    base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, APP_NAME)
@@ -0,0 +1,146 @@
+import json  # The report is written as JSON so it can be compared between releases
+import os  # Used to read the environment variable that turns profiling on
+import platform  # Recorded in the report, startup times depend on the machine
+import sys  # Used to read the command line before the app parses it
+import time  # Wall-clock and CPU timers
+from contextlib import contextmanager
+from functools import wraps
+
+# Report written when --profile-startup or STUDENT_TOOLKIT_PROFILE_STARTUP=1 gives no path
+DEFAULT_REPORT = "startup-profile.json"
+REPORT_VERSION = 1
+
+
+class StartupProfiler:
+    def __init__(self, path):
+        """
+        Record wall-clock and CPU time of the startup phases and write them as a JSON report.
+
+        Created at the very top of App.py, so the time to import PyQt5 is measured too.
+        Times are in seconds since the profiler was created; "interpreter_cpu" is the
+        CPU time Python had already used before that.
+
+        :param path: File the report is written to.
+        """
+        self.path = path
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.phases = []  # (name, start, wall, cpu), in the order the phases finished
+        self.marks = []  # (name, wall, cpu) of single moments, e.g. the first paint
+        self.finished = False
+
+    def now(self):
+        # Wall-clock and CPU time since the profiler was created
+        return time.perf_counter() - self.wall_start, time.process_time() - self.cpu_start
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time the code in a with block as one phase.
+
+        :param name: Name of the phase in the report.
+        """
+        wall, cpu = self.now()
+        try:
+            yield
+        finally:
+            if not self.finished:
+                end_wall, end_cpu = self.now()
+                self.phases.append((name, wall, end_wall - wall, end_cpu - cpu))
+
+    def timed(self, method):
+        # Decorator that times every call of a method as a phase named after the class, e.g. "Music.initUI"
+        @wraps(method)
+        def wrapper(instance, *args, **kwargs):
+            with self.phase("%s.%s" % (type(instance).__name__, method.__name__)):
+                return method(instance, *args, **kwargs)
+        return wrapper
+
+    def mark(self, name):
+        # Record a single moment, e.g. when the first window is painted
+        if not self.finished:
+            self.marks.append((name,) + self.now())
+
+    def report(self):
+        # The report as a dictionary
+        wall, cpu = self.now()
+        return {
+            "version": REPORT_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "argv": sys.argv,
+            "interpreter_cpu": round(self.cpu_start, 6),
+            "total": {"wall": round(wall, 6), "cpu": round(cpu, 6)},
+            "phases": [{"name": name, "start": round(start, 6), "wall": round(wall, 6), "cpu": round(cpu, 6)}
+                       for name, start, wall, cpu in self.phases],
+            "marks": [{"name": name, "wall": round(wall, 6), "cpu": round(cpu, 6)}
+                      for name, wall, cpu in self.marks],
+        }
+
+    def finish(self):
+        """
+        Stop recording, write the report and print a short summary to stderr.
+        """
+        if self.finished:
+            return
+        report = self.report()
+        self.finished = True
+        try:
+            with open(self.path, "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+        except OSError as error:
+            print("startup profile: cannot write %s: %s" % (self.path, error), file=sys.stderr)
+            return
+
+        for phase in report["phases"]:
+            print("%-32s %8.1f ms wall %8.1f ms cpu" % (phase["name"], phase["wall"] * 1000, phase["cpu"] * 1000),
+                  file=sys.stderr)
+        for mark in report["marks"]:
+            print("%-32s %8.1f ms after start" % (mark["name"], mark["wall"] * 1000), file=sys.stderr)
+        print("startup profile written to %s" % self.path, file=sys.stderr)
+
+
+class NullProfiler:
+    # Stands in for StartupProfiler when profiling is off, so the app never has to check
+
+    finished = True
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def timed(self, method):
+        return method  # No wrapper, so there is no overhead at all
+
+    def mark(self, name):
+        pass
+
+    def finish(self):
+        pass
+
+
+def startup_profiler(argv=None, environ=None):
+    """
+    Return a StartupProfiler if --profile-startup[=PATH] or STUDENT_TOOLKIT_PROFILE_STARTUP is set,
+    a NullProfiler otherwise.
+
+    :param argv: Command line, defaults to sys.argv.
+    :param environ: Environment, defaults to os.environ.
+    """
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+
+    path = None
+    for i, arg in enumerate(argv[1:], 1):
+        if arg == "--profile-startup":
+            # Like argparse with nargs="?": a following argument that is not an option is the path
+            following = argv[i + 1] if i + 1 < len(argv) else ""
+            path = following if following and not following.startswith("-") else DEFAULT_REPORT
+        elif arg.startswith("--profile-startup="):
+            path = arg.split("=", 1)[1] or DEFAULT_REPORT
+    if path is None:
+        value = environ.get("STUDENT_TOOLKIT_PROFILE_STARTUP", "")
+        if value and value != "0":
+            path = DEFAULT_REPORT if value == "1" else value
+    return StartupProfiler(path) if path else NullProfiler()
@@ -0,0 +1,418 @@
+import heapq  # Picks the best hits without sorting every match
+import re  # Used to split titles into words
+from bisect import bisect_left
+from collections import namedtuple
+
+# Largest number of hits a search returns
+SEARCH_LIMIT = 20
+
+# Score of a query word matching the first or a later word of an item's title
+FIRST_WORD, TITLE_WORD = 3, 2
+# Extra score when the whole title starts with, or is exactly, the query
+PREFIX_BONUS, EXACT_BONUS = 5, 10
+
+# Typo matches are only looked for when exact matching finds fewer hits than this
+FUZZY_MIN_HITS = 3
+
+SearchHit = namedtuple("SearchHit", "item score")
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    # Split text into lower-case words, e.g. "Get Better Sleep" -> ["get", "better", "sleep"]
+    return WORD_PATTERN.findall(text.lower())
+
+
+def edit_bound(word):
+    # Typos allowed in a query word: none up to three letters, one up to seven letters, two above
+    if len(word) <= 3:
+        return 0
+    return 1 if len(word) <= 7 else 2
+
+
+def prefix_distance(query, word, bound):
+    """
+    Edit distance between query and the closest prefix of word, e.g. "revison" and "revision" -> 1.
+
+    Two swapped neighbouring letters count as one edit, so "ambeint" is as close
+    to "ambient" as "ambent" is. Returns bound + 1 as soon as the distance is
+    known to be larger than bound, so most non-matching words are rejected after
+    a few letters.
+
+    :param query: The (possibly misspelt) query word.
+    :param word: A word from a title.
+    :param bound: Largest distance of interest.
+    """
+    if len(word) < len(query) - bound:
+        return bound + 1
+    word = word[:len(query) + bound]  # Letters further on cannot be part of the closest prefix
+    # previous[j] is the distance between the query typed so far and word[:j], before is the row one letter earlier
+    before, previous = None, list(range(len(word) + 1))
+    for i, letter in enumerate(query, 1):
+        current = [i]
+        for j, other in enumerate(word, 1):
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (letter != other))
+            if i > 1 and j > 1 and letter == word[j - 2] and query[i - 2] == other and letter != other:
+                distance = min(distance, before[j - 2] + 1)  # The last two letters are swapped
+            current.append(distance)
+        if min(current) > bound:
+            return bound + 1  # A swap only reaches back one row, so later rows cannot get below bound again
+        before, previous = previous, current
+    return min(previous)
+
+
+def trigrams(word):
+    # Three-letter pieces of a word, padded at the front so the start of a word counts most
+    padded = "  " + word
+    return {padded[i:i + 3] for i in range(len(word))}
+
+
+def fuzzy_score(query, text):
+    """
+    Score how well a tile caption matches a query, 0 if it does not match at all.
+
+    Every query word has to match a word of the text: as a prefix (best), anywhere
+    inside it, or within a few typos (e.g. "helth" for "Health"). The score is the
+    average quality of the word matches, plus a bonus when the whole text starts
+    with the query. Used for the handful of tiles in a window.
+
+    :param query: Text typed into a search bar.
+    :param text: The caption of a tile.
+    """
+    query = query.strip().lower()
+    text = text.lower()
+    if not query:
+        return 1.0
+    if query in text:
+        return 2.0 if text.startswith(query) else 1.5  # Plain substring, as the search bars always matched
+
+    text_words = tokenize(text)
+    total = 0.0
+    for query_word in tokenize(query):
+        bound = edit_bound(query_word)
+        best = 0.0
+        for word in text_words:
+            if word.startswith(query_word):
+                best = 1.0
+                break
+            if query_word in word:
+                best = max(best, 0.8)
+            elif bound:
+                distance = prefix_distance(query_word, word, bound)
+                if distance <= bound:
+                    best = max(best, 1.0 - distance / (len(query_word) + 1.0))
+        if not best:
+            return 0.0  # Every word of the query has to match somewhere
+        total += best
+    return total / len(tokenize(query) or [query])
+
+
+def narrows(previous, query):
+    """
+    True if every tile matching query also matched previous, so a search-as-you-type
+    filter only has to re-check the tiles that matched the previous keystroke.
+
+    This holds when query only adds letters at the end, unless a word grew long
+    enough to be allowed an extra typo (e.g. "hel" -> "helt" may now match "halt").
+
+    :param previous: The search text of the last filter pass.
+    :param query: The new search text.
+    """
+    if not query.lower().startswith(previous.lower()):
+        return False
+    query_words = tokenize(query)
+    for i, word in enumerate(tokenize(previous)):
+        if edit_bound(query_words[i]) != edit_bound(word):
+            return False
+    return True
+
+
+class FuzzyIndex:
+    def __init__(self, vocabulary):
+        """
+        Trigram index over a vocabulary, to find words within a few typos of a query word.
+
+        Each typo changes at most three trigrams (four for two swapped letters), so
+        a word within the edit bound shares most of the query's trigrams. Only those words are checked with
+        the (slower) edit distance.
+
+        :param vocabulary: Sorted list of distinct words.
+        """
+        self.vocabulary = vocabulary
+        self.cache = {}  # Recent expansions, typing a second word re-expands the first one
+        self.postings = {}  # Trigram -> indexes of the words that contain it
+        for index, word in enumerate(vocabulary):
+            for gram in trigrams(word):
+                self.postings.setdefault(gram, []).append(index)
+
+    def expand(self, query_word):
+        """
+        Return {vocabulary index: distance} for the words with a prefix within the edit bound of query_word.
+        """
+        bound = edit_bound(query_word)
+        if not bound:
+            return {}
+        if query_word in self.cache:
+            return dict(self.cache[query_word])
+        grams = trigrams(query_word)
+        needed = len(grams) - 4 * bound  # Trigrams a matching word must still share
+
+        # Count shared trigrams per word; words without enough of them cannot be close
+        counts = {}
+        for gram in grams:
+            for index in self.postings.get(gram, ()):
+                counts[index] = counts.get(index, 0) + 1
+
+        matches = {}
+        for index, count in counts.items():
+            if count >= needed:
+                distance = prefix_distance(query_word, self.vocabulary[index], bound)
+                if distance <= bound:
+                    matches[index] = distance
+
+        if len(self.cache) > 256:
+            self.cache.clear()
+        self.cache[query_word] = matches
+        return dict(matches)
+
+
+class PrefixIndex:
+    def __init__(self, titles):
+        """
+        Sorted vocabulary of catalog titles, searched by prefix with bisect.
+
+        Every distinct word keeps the items whose first word it is and the items
+        that contain it later on, both sorted from the shortest title to the
+        longest. All items matching a prefix come from a contiguous slice of the
+        vocabulary, and a running count tells how many there are without
+        looking at them.
+
+        :param titles: The title of every catalog item.
+        """
+        lengths = [len(title) for title in titles]
+        first_lists = {}
+        later_lists = {}
+        for position, title in enumerate(titles):
+            for i, word in enumerate(tokenize(title)):
+                postings = (first_lists if i == 0 else later_lists).setdefault(word, [])
+                if not postings or postings[-1] != position:
+                    postings.append(position)
+
+        self.vocabulary = sorted(set(first_lists) | set(later_lists))
+        self.first_lists = [sorted(first_lists.get(word, []), key=lengths.__getitem__) for word in self.vocabulary]
+        self.later_lists = [sorted(later_lists.get(word, []), key=lengths.__getitem__) for word in self.vocabulary]
+
+        # counts[i] is the number of postings of all words before vocabulary[i]
+        self.counts = [0]
+        for first, later in zip(self.first_lists, self.later_lists):
+            self.counts.append(self.counts[-1] + len(first) + len(later))
+
+    def span(self, prefix):
+        # The slice of the vocabulary holding every word that starts with prefix
+        start = bisect_left(self.vocabulary, prefix)
+        return start, bisect_left(self.vocabulary, prefix + "\uffff", start)
+
+    def size(self, span):
+        # Number of postings in a span, an upper bound on the number of matching items
+        return self.counts[span[1]] - self.counts[span[0]]
+
+    def items(self, span):
+        # Every item with a word in the span, as a set
+        start, end = span
+        return set().union(*self.first_lists[start:end], *self.later_lists[start:end])
+
+
+class ScanSearch:
+    def __init__(self, catalog, limit=SEARCH_LIMIT):
+        """
+        Search every item by checking each title in turn, without an index.
+
+        Answers the first searches while the SearchEngine index is still being built.
+        Only the titles are read up front, and query words are only matched as they
+        are typed (no typos), so a keystroke costs about a millisecond per thousand
+        items; typo matches appear once the index is ready.
+
+        :param catalog: The Catalog to search.
+        :param limit: Largest number of hits a search returns.
+        """
+        self.catalog = catalog
+        self.limit = limit
+        self.titles = []  # Lower-case title of every item
+        self.positions = []  # Catalog index of the item of each title
+        for section in catalog.sections:
+            self.titles.extend(title.lower() for title in catalog.titles(section.name))
+            self.positions.extend(range(section.first_item, section.first_item + section.item_count))
+
+    def search(self, query):
+        """
+        Return the items whose title contains every query word: titles starting with the query first, then shorter titles.
+
+        :param query: Text typed into a search bar.
+        :return: A list of SearchHit tuples.
+        """
+        query = query.strip().lower()
+        words = tokenize(query)
+        if not words:
+            return []
+        matches = (position for position, title in enumerate(self.titles) if all(word in title for word in words))
+        titles = self.titles
+        best = heapq.nsmallest(self.limit, matches,
+                               key=lambda position: (not titles[position].startswith(query), len(titles[position])))
+        return [SearchHit(self.catalog.item(self.positions[position]),
+                          FIRST_WORD + PREFIX_BONUS if titles[position].startswith(query) else TITLE_WORD)
+                for position in best]
+
+
+class SearchEngine:
+    def __init__(self, items, limit=SEARCH_LIMIT):
+        """
+        Search every item of every catalog section at once.
+
+        Results for one and two letter queries, which match most of a large
+        catalog, are worked out up front so every keystroke stays fast. When a
+        query has fewer exact matches than the limit, words within a few typos
+        of the query words are tried as well.
+
+        :param items: The catalog items to search, e.g. catalog.all_items().
+        :param limit: Largest number of hits a search returns.
+        """
+        self.items = list(items)
+        self.limit = limit
+        self.titles = [item.title.lower() for item in self.items]
+        self.lengths = [len(title) for title in self.titles]
+        # " word word word" per item, so a word prefix can be checked with one substring test
+        self.joined = [" " + " ".join(tokenize(title)) for title in self.titles]
+        self.index = PrefixIndex(self.titles)
+        self.fuzzy = FuzzyIndex(self.index.vocabulary)
+
+        # Vocabulary indexes of the words of every item, to check typo matches per item
+        self.item_words = [[] for _ in self.items]
+        for index, (first, later) in enumerate(zip(self.index.first_lists, self.index.later_lists)):
+            for position in first + later:
+                self.item_words[position].append(index)
+
+        # Items by their exact title, for the exact match bonus
+        self.exact = {}
+        for position, title in enumerate(self.titles):
+            self.exact.setdefault(title, []).append(position)
+
+        # Prebuilt results for every one and two letter prefix that occurs in the catalog
+        self.short_results = {}
+        for prefix in {word[:length] for word in self.index.vocabulary for length in (1, 2)}:
+            self.short_results[prefix] = self.search_word(prefix, prefix)
+
+    def search(self, query):
+        """
+        Return the best matching items for a query, best first.
+
+        Each query word has to be the start of a word in the item's title. Items
+        score higher when the words match the first word of their title, when the
+        whole title starts with the query, and most when it is the query.
+
+        :param query: Text typed into a search bar.
+        :return: A new list of SearchHit tuples.
+        """
+        query = query.strip().lower()
+        words = tokenize(query)
+        if not words:
+            return []
+        if len(words) == 1:
+            if query in self.short_results:
+                return list(self.short_results[query])  # A copy, callers may sort or extend it
+            hits = self.search_word(words[0], query)
+        else:
+            hits = self.search_words(words, query)
+
+        # Hardly any exact matches: the query probably has a typo, so try close words as well
+        if len(hits) < FUZZY_MIN_HITS:
+            hits += self.search_fuzzy(words, {hit.item for hit in hits})
+        return hits
+
+    def search_words(self, words, query):
+        # Rank the items that match every one of several query words
+
+        # Start from the rarest word; common words are checked against those few candidates only
+        spans = sorted(((self.index.span(word), word) for word in words), key=lambda entry: self.index.size(entry[0]))
+        candidates = self.index.items(spans[0][0])
+        for span, word in spans[1:]:
+            if self.index.size(span) < 4 * len(candidates):
+                candidates &= self.index.items(span)
+            else:
+                joined, needle = self.joined, " " + word
+                candidates = {position for position in candidates if needle in joined[position]}
+
+        # Split the candidates into tiers: exact title, title starts with the query,
+        # first word matches a query word, and the rest. Within a tier shorter titles win.
+        joined, titles = self.joined, self.titles
+        first = set()
+        for word in words:
+            needle = " " + word
+            first.update(position for position in candidates if joined[position].startswith(needle))
+        prefix = {position for position in first if titles[position].startswith(query)}
+        exact = prefix.intersection(self.exact.get(query, []))
+        base = TITLE_WORD * len(words) + FIRST_WORD - TITLE_WORD
+        tiers = ((exact, base + EXACT_BONUS), (prefix - exact, base + PREFIX_BONUS),
+                 (first - prefix, base), (candidates - first, TITLE_WORD * len(words)))
+
+        hits = []
+        for tier, score in tiers:
+            for position in heapq.nsmallest(self.limit - len(hits), tier, key=self.lengths.__getitem__):
+                hits.append(SearchHit(self.items[position], score))
+            if len(hits) >= self.limit:
+                break
+        return hits
+
+    def search_word(self, word, query):
+        # Rank the matches of a single word: exact titles, then titles starting with it, then the rest
+        start, end = self.index.span(word)
+        exact = self.exact.get(query, [])
+        hits = [SearchHit(self.items[position], FIRST_WORD + EXACT_BONUS) for position in exact[:self.limit]]
+        seen = set(exact)
+
+        # The postings are sorted by title length, so merging them yields the shortest titles first
+        for lists, score in ((self.index.first_lists, FIRST_WORD + PREFIX_BONUS), (self.index.later_lists, TITLE_WORD)):
+            for position in heapq.merge(*lists[start:end], key=self.lengths.__getitem__):
+                if len(hits) >= self.limit:
+                    return hits
+                if position not in seen:
+                    seen.add(position)
+                    hits.append(SearchHit(self.items[position], score))
+        return hits
+
+    def search_fuzzy(self, words, exclude):
+        # Rank the items whose words are within a few typos of the query words, fewest typos first
+        options = []
+        for word in words:
+            close = self.fuzzy.expand(word)
+            start, end = self.index.span(word)
+            close.update(dict.fromkeys(range(start, end), 0))  # Exact prefixes count as no typo
+            if not close:
+                return []
+            size = sum(self.index.counts[index + 1] - self.index.counts[index] for index in close)
+            options.append((size, close))
+        options.sort(key=lambda option: option[0])
+
+        # Candidates come from the rarest word, the other words are checked per candidate
+        typos = {}
+        first_lists, later_lists = self.index.first_lists, self.index.later_lists
+        for index, distance in options[0][1].items():
+            for position in first_lists[index] + later_lists[index]:
+                if distance < typos.get(position, distance + 1):
+                    typos[position] = distance
+        for _, close in options[1:]:
+            narrowed = {}
+            for position, total in typos.items():
+                distances = [close[index] for index in self.item_words[position] if index in close]
+                if distances:
+                    narrowed[position] = total + min(distances)
+            typos = narrowed
+
+        # Fewer typos first, then shorter titles; every fuzzy hit ranks below the exact ones
+        best = heapq.nsmallest(self.limit + len(exclude), typos.items(),
+                               key=lambda entry: (entry[1], self.lengths[entry[0]]))
+        hits = []
+        for position, total in best:
+            if self.items[position] not in exclude and len(hits) < self.limit - len(exclude):
+                hits.append(SearchHit(self.items[position], TITLE_WORD * len(words) - total))
+        return hits
@@ -0,0 +1,65 @@
+import json  # The session is stored as JSON
+import os  # Used to build the session path
+import time  # The session remembers when it was saved
+
+from paths import user_data_dir
+from sorting import SORT_ORDERS
+
+SESSION_VERSION = 1
+# A session older than this is not restored, the student has moved on
+MAX_AGE = 7 * 24 * 60 * 60
+# Longest search text kept per window
+MAX_SEARCH_LENGTH = 200
+
+
+def session_path():
+    # The session lives with the other per-user files, e.g. ~/.local/share/StudentToolkit/session.json
+    return os.path.join(user_data_dir(), "session.json")
+
+
+def window_state(name, search="", sort="az"):
+    # What is remembered of one window: its section, search text and sort order
+    return {"name": name, "search": search[:MAX_SEARCH_LENGTH], "sort": sort if sort in SORT_ORDERS else "az"}
+
+
+def load_session(path=None, max_age=MAX_AGE):
+    """
+    Read the session saved when the app was last closed.
+
+    :param path: Session file, defaults to session_path().
+    :param max_age: Seconds after which a saved session is ignored.
+    :return: Dictionary with the "main" window state and the list of open "windows",
+             front-most first, or None if there is no valid recent session.
+    """
+    try:
+        with open(path or session_path(), "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != SESSION_VERSION or time.time() - data.get("saved", 0) > max_age:
+            return None
+        main = window_state("Main Menu", str(data["main"].get("search", "")), data["main"].get("sort"))
+        windows = [window_state(entry["name"], str(entry.get("search", "")), entry.get("sort"))
+                   for entry in data["windows"] if isinstance(entry.get("name"), str)]
+    except (OSError, ValueError, KeyError, AttributeError, TypeError):
+        return None
+    return {"main": main, "windows": windows}
+
+
+def save_session(main, windows, path=None):
+    """
+    Write the session, replacing the last one.
+
+    :param main: window_state() of the main menu.
+    :param windows: window_state() of every open window, front-most first.
+    :param path: Session file, defaults to session_path().
+    """
+    path = path or session_path()
+    data = {"version": SESSION_VERSION, "saved": time.time(), "main": main, "windows": windows}
+    try:
+        # Write to a temporary file first so a crash never leaves half a session
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=1)
+        os.replace(temp_path, path)
+    except OSError:
+        pass  # The next launch simply starts with a fresh main menu
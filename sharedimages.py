@@ -0,0 +1,158 @@
+import os  # Used to build the segment paths and remove them
+import sys  # Used to tell the operating systems apart
+
+try:
+    import fcntl  # Attached apps hold a lock on the segment, the kernel counts them
+except ImportError:
+    fcntl = None  # Windows: every app keeps its images to itself
+
+from imagepack import ImagePack, image_pack
+
+# Folder in shared memory the apps of every session put the decoded images in, e.g. /dev/shm/studenttoolkit.
+# Set by the administrator of a terminal server; every account running the toolkit needs write access
+# (e.g. a folder of the kiosk group with mode 2770), and no other account should have it.
+SHARED_IMAGES_ENV = "STUDENT_TOOLKIT_SHARED_IMAGES"
+
+
+def shared_directory():
+    # The shared folder, or None if the apps of different sessions do not share their images
+    directory = os.environ.get(SHARED_IMAGES_ENV, "")
+    if not directory or directory == "0" or fcntl is None or sys.platform == "win32":
+        return None
+    return directory if os.path.isdir(directory) else None
+
+
+def last_user(users):
+    # Lock the users file exclusively, only granted once no other app holds its shared lock
+    try:
+        fcntl.flock(users, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+class SharedImagePack(ImagePack):
+    def __init__(self, directory, fallback=None):
+        """
+        An image pack in shared memory that the apps of every login session on a terminal server map.
+
+        The first app to show an image decodes it into the segment, and later apps,
+        whoever they run as, map the same pixels instead of decoding again, so the
+        images take their memory once per server instead of once per session.
+        Every attached app holds a shared lock on the users file: the kernel keeps
+        that reference count, also for apps that crash. The last app to detach
+        can take the lock exclusively and removes the segment.
+
+        :param directory: The shared folder, on a tmpfs such as /dev/shm.
+        :param fallback: Optional ImagePack copied from, instead of decoding, when the segment
+                         does not have an image yet, e.g. the user's own pack.
+        """
+        super().__init__(os.path.join(directory, "images.pack"))
+        self.mode = 0o660  # The apps of every account in the folder's group map it, no one else
+        self.fallback = fallback
+        self.users_path = os.path.join(directory, "images.users")
+        self.users = None  # Descriptor of the users file while attached
+
+    def attach(self):
+        """
+        Count this app as a user of the segment.
+
+        Waits while the last user of an earlier run removes the segment.
+
+        :return: True if attached, False if the shared folder cannot be used.
+        """
+        if self.users is not None:
+            return True
+        try:
+            # Never through a link another account put in the folder
+            users = os.open(self.users_path, os.O_RDONLY | os.O_CREAT | os.O_NOFOLLOW, 0o660)
+        except OSError:
+            return False
+        try:
+            os.fchmod(users, 0o660)  # Whatever the umask is, every account of the group can open and lock it
+        except OSError:
+            pass  # Created by another account, which already set its mode
+        try:
+            fcntl.flock(users, fcntl.LOCK_SH)
+        except OSError:
+            os.close(users)
+            return False
+        self.users = users
+        return True
+
+    def detach(self):
+        # Stop counting this app; the last user removes the segment
+        if self.users is None:
+            return
+        users, self.users = self.users, None
+        if not last_user(users):
+            # Another app quitting at the same moment fails the same way while we hold our lock,
+            # so drop it and ask once more: one of the two then always removes the segment
+            os.close(users)
+            try:
+                users = os.open(self.users_path, os.O_RDONLY | os.O_NOFOLLOW)
+            except OSError:
+                return
+            if not last_user(users):
+                os.close(users)  # Other sessions still use the segment
+                return
+        directory = os.path.dirname(self.path)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            names = []
+        for name in names:
+            if name.startswith(os.path.basename(self.path)):  # The pack and temporary files left by a crash
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass  # e.g. no write access to the folder; the next last user tries again
+        os.close(users)
+
+    def add(self, source, box, levels):
+        # Keep a freshly decoded image in the user's pack too, for the next time no session is running
+        if self.fallback is not None and self.fallback.levels(source, box) is None:
+            self.fallback.add(source, box, levels)
+        return super().add(source, box, levels)
+
+    def levels(self, source, box):
+        """
+        Return the pyramid levels of an image from the segment, copying them in from the fallback pack first if needed.
+
+        :param source: Absolute path of the image file.
+        :param box: (width, height) the largest level was fitted into.
+        :return: List of QImages over the shared mapping, or None if the image has to be decoded.
+        """
+        levels = super().levels(source, box)
+        if levels is None and self.fallback is not None:
+            packed = self.fallback.levels(source, box)
+            if packed is not None:
+                levels = self.add(source, box, packed)  # A copy of mapped pixels, no decoding
+                self.fallback.release()  # The pixels are shown from the segment, not from the user's pack
+        return levels
+
+
+_shared_pack = None
+
+
+def shared_image_pack():
+    """
+    Return the pack the window images are loaded from.
+
+    The shared segment when STUDENT_TOOLKIT_SHARED_IMAGES names a usable folder, with the
+    user's own pack behind it; otherwise the user's own pack.
+    """
+    global _shared_pack
+    if _shared_pack is None:
+        directory = shared_directory()
+        if directory is not None:
+            pack = SharedImagePack(directory, fallback=image_pack())
+            if pack.attach():
+                _shared_pack = pack
+    return _shared_pack or image_pack()
+
+
+def detach_shared_images():
+    # Called when the app quits: the last session to quit frees the shared images
+    if _shared_pack is not None:
+        _shared_pack.detach()
@@ -0,0 +1,127 @@
+import locale  # Titles are ordered the way the user's language orders them
+import unicodedata  # Accents only break ties, so "École" sorts with "Ecole"
+
+from usage import usage_log
+
+# The orders the sort button cycles through, and its caption in each
+SORT_ORDERS = ["az", "za", "used"]
+SORT_CAPTIONS = {"az": "A - Z", "za": "Z - A", "used": "Most used"}
+
+# Sort keys each order compares, and whether the result is reversed.
+# Z - A is the A - Z order read backwards, so it never needs a sort of its own.
+ORDER_KEYS = {
+    "az": (("name",), False),
+    "za": (("name",), True),
+    "used": (("usage", "name"), False),
+    "section": (("section", "name"), False),
+}
+
+_collation_ready = False
+
+
+def next_sort_order(order):
+    # The sort order after order, back to A - Z after "most used"
+    return SORT_ORDERS[(SORT_ORDERS.index(order) + 1) % len(SORT_ORDERS)]
+
+
+def collation_key(text):
+    """
+    Return a key that orders text the way the user's locale does, e.g. "apple" < "Banana" < "École" < "zoo".
+
+    Case and accents are ignored first and only decide between otherwise equal
+    texts, so the order never depends on how a title happens to be capitalised.
+
+    :param text: A tile caption or section name.
+    """
+    global _collation_ready
+    if not _collation_ready:
+        # Qt sets the locale when the window starts, the command line tools have to ask for it
+        _collation_ready = True
+        try:
+            locale.setlocale(locale.LC_COLLATE, "")
+        except locale.Error:
+            pass  # Unknown locale in the environment: folded code point order is used instead
+    folded = text.casefold()
+    if not folded.isascii():
+        folded = "".join(char for char in unicodedata.normalize("NFKD", folded) if not unicodedata.combining(char))
+    try:
+        return locale.strxfrm(folded), text
+    except ValueError:
+        return folded, text  # strxfrm refuses text with NUL characters
+
+
+class SortEngine:
+    def __init__(self, names, sections=None, usage_keys=None):
+        """
+        Orders one list of tiles by name, section or usage, and keeps every order it computed.
+
+        Collation keys are computed once, on the first sort, and each order is kept
+        as a list of positions into names. Switching back to an order that was used
+        before costs nothing, and Z - A is the A - Z order reversed instead of a new
+        sort. Orders that use the usage scores are only computed again after a new
+        open was recorded: all scores decay at the same rate, so time alone never
+        changes their order.
+
+        :param names: Caption of every tile.
+        :param sections: Optional section of every tile, for the "section" key.
+        :param usage_keys: Key each tile is recorded under in the usage log (its URL or name), defaults to names.
+        """
+        self.names = names
+        self.sections = sections
+        self.usage_keys = usage_keys or names
+        self.columns = {}  # Sort key -> one comparable value per tile
+        self.orders = {}  # (sort keys, reversed) -> positions of the tiles in that order
+        self.usage_version = None  # Usage log version the usage column was computed at
+
+    def column(self, key):
+        # One comparable value per tile for a sort key, computed on first use
+        values = self.columns.get(key)
+        if values is None:
+            if key == "name":
+                values = [collation_key(name) for name in self.names]
+            elif key == "section":
+                values = [collation_key(section) for section in (self.sections or [""] * len(self.names))]
+            elif key == "usage":
+                usage = usage_log()
+                values = [-usage.score(usage_key) for usage_key in self.usage_keys]  # Most used first
+            else:
+                raise ValueError("unknown sort key: %r" % key)
+            self.columns[key] = values
+        return values
+
+    def order(self, keys, reverse=False):
+        """
+        Return the positions of the tiles sorted by one or more keys.
+
+        :param keys: Sort keys to compare, most significant first: "name", "section" or "usage".
+        :param reverse: True for the reversed order, e.g. Z - A.
+        :return: A list of positions into names; do not modify it, it is shared by later calls.
+        """
+        keys = tuple(keys)
+        if "usage" in keys:
+            version = usage_log().version
+            if version != self.usage_version:
+                # New opens were recorded: forget everything derived from the old scores
+                self.columns.pop("usage", None)
+                self.orders = {cached: order for cached, order in self.orders.items() if "usage" not in cached[0]}
+                self.usage_version = version
+
+        order = self.orders.get((keys, reverse))
+        if order is None:
+            if reverse:
+                order = self.order(keys)[::-1]  # No comparisons at all
+            else:
+                columns = [self.column(key) for key in keys]
+                values = columns[0] if len(columns) == 1 else list(zip(*columns))
+                order = sorted(range(len(self.names)), key=values.__getitem__)
+            self.orders[(keys, reverse)] = order
+        return order
+
+    def sort(self, order):
+        """
+        Return the positions of the tiles in one of the sort button's orders.
+
+        :param order: One of SORT_ORDERS, or "section".
+        """
+        keys, reverse = ORDER_KEYS[order]
+        return self.order(keys, reverse)
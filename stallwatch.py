@@ -0,0 +1,168 @@
+import json  # The stall report is stored as JSON
+import os  # Used to build the report path
+import sys  # sys._current_frames() gives the stack of the GUI thread
+import threading  # The watchdog runs in its own thread, it has to keep going while the GUI thread is blocked
+import time  # Heartbeat and stall timers
+import traceback  # Turns the captured frame into a readable stack
+
+from PyQt5.QtCore import QObject, QTimer
+
+from paths import user_data_dir
+
+# The GUI thread beats this often; a beat that is late by more than the threshold is a stall
+HEARTBEAT_MS = 100
+STALL_THRESHOLD_MS = 250
+# Distinct offenders kept in the report, the ones that blocked longest in total
+REPORT_LIMIT = 50
+REPORT_VERSION = 1
+
+
+def stall_report_path():
+    # The report lives with the other per-user files, e.g. ~/.local/share/StudentToolkit/stalls.json
+    return os.path.join(user_data_dir(), "stalls.json")
+
+
+class StallWatchdog(QObject):
+    def __init__(self, threshold_ms=STALL_THRESHOLD_MS, heartbeat_ms=HEARTBEAT_MS, path=None):
+        """
+        Detect when the GUI event loop is blocked and find out what blocked it.
+
+        A timer on the GUI thread records a heartbeat; a background thread checks
+        it and, when no beat arrived for threshold_ms, captures the Python stack
+        of the GUI thread. The slot that was running is the first frame below the
+        event loop. Stalls are grouped by slot and the line they were stuck on,
+        and the worst offenders are merged into a JSON report when the app quits.
+
+        The cost is one timer tick per heartbeat on the GUI thread and a sleeping
+        thread, so the watchdog can stay on all the time.
+
+        :param threshold_ms: Event-loop delay that counts as a stall.
+        :param heartbeat_ms: Interval of the GUI heartbeat.
+        :param path: Report file, defaults to stall_report_path().
+        """
+        super().__init__()
+        self.threshold = threshold_ms / 1000.0
+        self.interval = heartbeat_ms / 1000.0
+        self.path = path or stall_report_path()
+
+        self.gui_thread = threading.get_ident()  # Created on the GUI thread
+        self.last_beat = time.monotonic()
+        self.captured = None  # (slot, location, stack) of the stall in progress
+        self.offenders = {}  # (slot, location) -> statistics
+        self.beats = 0
+        self.worst_latency = 0.0
+        self.lock = threading.Lock()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(heartbeat_ms)
+        self.timer.timeout.connect(self.beat)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.watch, name="stall-watchdog", daemon=True)
+
+    def start(self):
+        # Start the heartbeat and the watching thread
+        self.last_beat = time.monotonic()
+        self.timer.start()
+        self.thread.start()
+
+    def stop(self):
+        # Stop watching and merge this run's stalls into the report
+        self.stopped.set()
+        self.timer.stop()
+        self.write_report()
+
+    def beat(self):
+        # Runs on the GUI thread: how late this beat is, is the event-loop latency
+        now = time.monotonic()
+        latency = max(0.0, now - self.last_beat - self.interval)
+        self.last_beat = now
+        self.beats += 1
+        self.worst_latency = max(self.worst_latency, latency)
+
+        with self.lock:
+            captured, self.captured = self.captured, None
+        if captured is not None:
+            self.record(captured, latency)
+
+    def watch(self):
+        # Runs in the background thread: check the heartbeat a few times per threshold
+        while not self.stopped.wait(self.threshold / 4):
+            if time.monotonic() - self.last_beat - self.interval < self.threshold:
+                continue
+            with self.lock:
+                if self.captured is None:
+                    self.captured = self.capture()
+
+    def capture(self):
+        # Take the stack of the GUI thread while it is blocked
+        frame = sys._current_frames().get(self.gui_thread)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame)
+        # The outermost frame runs the event loop, the one below it is the slot Qt called
+        slot = stack[1] if len(stack) > 1 else stack[0]
+        location = stack[-1]
+        return ("%s:%s" % (os.path.basename(slot.filename), slot.name),
+                "%s:%d %s" % (os.path.basename(location.filename), location.lineno, location.name),
+                traceback.format_list(stack[-12:]))
+
+    def record(self, captured, latency):
+        # Add one finished stall to its offender
+        slot, location, stack = captured
+        entry = self.offenders.setdefault((slot, location), {
+            "slot": slot, "location": location, "count": 0, "total_ms": 0.0, "worst_ms": 0.0, "stack": stack})
+        entry["count"] += 1
+        entry["total_ms"] += latency * 1000
+        if latency * 1000 >= entry["worst_ms"]:
+            entry["worst_ms"] = latency * 1000
+            entry["stack"] = stack  # Keep the stack of the longest stall
+
+    def write_report(self):
+        # Merge the stalls of this run into the report of earlier runs
+        if not self.offenders:
+            return
+        report = load_report(self.path)
+        merged = {(entry["slot"], entry["location"]): entry for entry in report["offenders"]}
+        for key, entry in self.offenders.items():
+            old = merged.get(key)
+            if old is None:
+                merged[key] = dict(entry)
+                continue
+            old["count"] += entry["count"]
+            old["total_ms"] += entry["total_ms"]
+            if entry["worst_ms"] > old["worst_ms"]:
+                old["worst_ms"], old["stack"] = entry["worst_ms"], entry["stack"]
+        offenders = sorted(merged.values(), key=lambda entry: -entry["total_ms"])[:REPORT_LIMIT]
+        for entry in offenders:
+            entry["total_ms"] = round(entry["total_ms"], 1)
+            entry["worst_ms"] = round(entry["worst_ms"], 1)
+        report.update(offenders=offenders, updated=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                      worst_latency_ms=round(max(report.get("worst_latency_ms", 0), self.worst_latency * 1000), 1))
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = "%s.%d.tmp" % (self.path, os.getpid())
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass  # The watchdog must never be the reason the app fails to quit
+
+
+def load_report(path):
+    # Read a stall report, or start an empty one
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            report = json.load(file)
+        if report.get("version") == REPORT_VERSION:
+            return report
+    except (OSError, ValueError):
+        pass
+    return {"version": REPORT_VERSION, "offenders": []}
+
+
+if __name__ == "__main__":
+    # python stallwatch.py [stalls.json] lists the worst offenders
+    report = load_report(sys.argv[1] if len(sys.argv) > 1 else stall_report_path())
+    for entry in report["offenders"]:
+        print("%8.0f ms total %6d stalls %8.0f ms worst  %s  (%s)"
+              % (entry["total_ms"], entry["count"], entry["worst_ms"], entry["slot"], entry["location"]))
@@ -0,0 +1,156 @@
+import asyncio  # The checks run on an event loop like in the app
+import os  # Used to find the app modules and the cache file
+import socket  # Used to find a port nothing listens on
+import sys
+import tempfile  # Every test gets its own results file
+import threading  # The test server answers from a background thread
+import time  # The slow pages take their time to answer
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The app modules live in the folder above this one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import linkcheck  # noqa: E402
+from http_pool import HttpPool  # noqa: E402
+
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Each path answers the way one kind of site does
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the servers the app talks to
+    statuses = {"/ok": 200, "/missing": 404, "/error": 500, "/login": 401, "/forbidden": 403}
+
+    def do_HEAD(self):
+        self.answer(send_body=False)
+
+    def do_GET(self):
+        self.answer(send_body=True)
+
+    def answer(self, send_body):
+        self.server.seen.append((self.command, self.path, self.headers.get("If-None-Match")))
+        if self.path.startswith("/slow"):
+            time.sleep(0.4)  # A busy host, each answer takes a while
+        if self.path == "/nohead" and self.command == "HEAD":
+            status = 405  # A server that only knows GET
+        elif self.path == "/nohead":
+            status = 200
+        elif self.path == "/ok" and self.headers.get("If-None-Match") == ETAG:
+            status = 304
+        else:
+            status = 200 if self.path.startswith("/slow") else self.statuses.get(self.path, 404)
+        body = b"" if status == 304 else b"hello"
+        self.send_response(status)
+        if self.path == "/ok":
+            self.send_header("ETag", ETAG)
+        if self.path == "/longheader":
+            self.send_header("X-Padding", "x" * (1 << 17))  # Longer than the stream limit of the reader
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body and status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # Keep the test output clean
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # The checker hangs up on purpose, e.g. after an overlong header
+
+
+class LinkCheckTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = Server(("127.0.0.1", 0), Handler)
+        cls.server.seen = []
+        cls.base = "http://127.0.0.1:%d" % cls.server.server_address[1]
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.seen.clear()
+
+    def check(self, path, previous=None):
+        # Check one link of the test server with a fresh pool
+        async def run():
+            pool = HttpPool(timeout=5.0)
+            try:
+                return await linkcheck.check_link(pool, self.base + path, previous)
+            finally:
+                await pool.close()
+        return asyncio.run(run())
+
+    def test_states(self):
+        expected = {"/ok": (linkcheck.OK, 200), "/missing": (linkcheck.BROKEN, 404),
+                    "/error": (linkcheck.SERVER_ERROR, 500), "/login": (linkcheck.RESTRICTED, 401),
+                    "/forbidden": (linkcheck.RESTRICTED, 403)}
+        results = asyncio.run(linkcheck.check_links([self.base + path for path in expected], timeout=5.0))
+        for path, (state, status) in expected.items():
+            result = results[self.base + path]
+            self.assertEqual((result.state, result.status), (state, status), path)
+        self.assertFalse(linkcheck.has_problem(results[self.base + "/login"]))
+        self.assertTrue(linkcheck.has_problem(results[self.base + "/missing"]))
+
+    def test_head_rejected_falls_back_to_get(self):
+        result = self.check("/nohead")
+        self.assertEqual((result.state, result.status), (linkcheck.OK, 200))
+        self.assertEqual([request[0] for request in self.server.seen], ["HEAD", "GET"])
+
+    def test_unreachable(self):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]  # Closed again before the check, so the connection is refused
+        result = asyncio.run(linkcheck.check_links(["http://127.0.0.1:%d/" % port], timeout=5.0))
+        self.assertEqual(result["http://127.0.0.1:%d/" % port].state, linkcheck.UNREACHABLE)
+
+    def test_overlong_header_is_unreachable(self):
+        # A header line longer than the stream limit must not escape the gather of the other links
+        urls = [self.base + "/longheader", self.base + "/ok"]
+        results = asyncio.run(linkcheck.check_links(urls, timeout=5.0))
+        self.assertEqual(results[urls[0]].state, linkcheck.UNREACHABLE)
+        self.assertEqual(results[urls[1]].state, linkcheck.OK)
+
+    def test_waiting_for_a_busy_host_is_not_timed(self):
+        # Ten links on one host, two at a time: the last ones wait about 2 s for their turn, longer than
+        # the timeout, but each answer only takes 0.4 s
+        urls = [self.base + "/slow?page=%d" % number for number in range(10)]
+        results = asyncio.run(linkcheck.check_links(urls, per_host=2, timeout=1.0))
+        self.assertEqual([results[url].state for url in urls], [linkcheck.OK] * len(urls))
+
+    def test_revalidation_with_etag(self):
+        first = self.check("/ok")
+        self.assertEqual(first.etag, ETAG)
+        second = self.check("/ok", first)
+        self.assertEqual(self.server.seen[-1], ("HEAD", "/ok", ETAG))  # Conditional request
+        self.assertEqual((second.state, second.status, second.etag), (linkcheck.OK, 200, ETAG))
+        self.assertGreaterEqual(second.checked, first.checked)
+
+    def test_no_revalidation_of_problems(self):
+        previous = self.check("/missing")._replace(etag=ETAG)
+        self.check("/missing", previous)
+        self.assertIsNone(self.server.seen[-1][2])  # A broken link is checked in full again
+
+    def test_check_in_background(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "links.json")
+            fresh = self.check("/ok")
+            linkcheck.save_results({fresh.url: fresh}, path)
+            calls = []
+            urls = lambda: [fresh.url, self.base + "/missing"]  # Read in the thread, like the catalog links
+            linkcheck.check_in_background(urls, calls.append, path).join(10)
+            self.assertEqual(list(calls[0]), [fresh.url])  # The cached results come first
+            self.assertEqual(list(calls[1]), [self.base + "/missing"])  # Then only the links that were due
+            self.assertEqual(set(linkcheck.load_results(path)), {fresh.url, self.base + "/missing"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import asyncio  # The downloads run on an event loop like in the app
+import os  # Used to find the app modules and look at the saved files
+import sys
+import tempfile  # Every test gets its own cache folder
+import threading  # The test server answers from a background thread
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The app modules live in the folder above this one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pagecache  # noqa: E402
+
+ETAG = '"p1"'
+LAST_MODIFIED = "Mon, 05 Oct 2026 10:00:00 GMT"
+
+
+class Handler(BaseHTTPRequestHandler):
+    # /tagged has an ETag, /dated a Last-Modified date, /page<n> is a plain page of about a kilobyte
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.seen.append((self.path, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+        if (self.path == "/tagged" and self.headers.get("If-None-Match") == ETAG
+                or self.path == "/dated" and self.headers.get("If-Modified-Since") == LAST_MODIFIED):
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = ("<html><head><title>%s</title></head><body>%s</body></html>"
+                % (self.path, "study " * 160)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.path == "/tagged":
+            self.send_header("ETag", ETAG)
+        if self.path == "/dated":
+            self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # Keep the test output clean
+
+
+def start_server():
+    # A test server on a free port, returns (server, base URL)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.seen = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:%d" % server.server_address[1]
+
+
+def stop_server(server):
+    server.shutdown()
+    server.server_close()
+
+
+class PageCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.base = start_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_server(cls.server)
+
+    def setUp(self):
+        self.server.seen.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = pagecache.PageCache(os.path.join(self.directory.name, "pages"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def prefetch(self, *paths):
+        return asyncio.run(pagecache.prefetch([self.base + path for path in paths], self.cache, timeout=5.0))
+
+    def test_prefetch_stores_pages(self):
+        outcomes = self.prefetch("/page1", "/tagged")
+        self.assertEqual(set(outcomes.values()), {"saved"})
+        path = self.cache.lookup(self.base + "/page1")
+        self.assertTrue(path.endswith(".html"))
+        with open(path, "rb") as file:
+            body = file.read()
+        self.assertIn(b"study", body)
+        self.assertIn(b'<base href="%s/page1">' % self.base.encode("utf-8"), body)  # Relative links still work
+        self.assertEqual(self.cache.meta(self.base + "/tagged")["etag"], ETAG)
+
+    def test_revalidation_keeps_the_saved_page(self):
+        for path, header in (("/tagged", 1), ("/dated", 2)):
+            self.prefetch(path)
+            url = self.base + path
+            saved = self.cache.lookup(url)
+            os.utime(saved, ns=(1, 1))  # Rewriting the page would change its time
+            checked = self.cache.meta(url)["checked"]
+            self.assertEqual(self.prefetch(path), {url: "unchanged"})
+            self.assertIsNotNone(self.server.seen[-1][header])  # Asked conditionally
+            self.assertEqual(os.stat(saved).st_mtime_ns, 1)
+            self.assertGreaterEqual(self.cache.meta(url)["checked"], checked)
+            self.assertEqual(pagecache.stale_urls([url], self.cache), [])  # Fresh again
+
+    def test_eviction_keeps_recently_used_pages(self):
+        self.prefetch("/page1", "/page2")
+        size = sum(entry[1] for entry in self.cache.entries()) // 2
+        self.cache.max_bytes = 3 * size + size // 2  # Room for three pages
+        for number, path in enumerate(("/page1", "/page2")):
+            os.utime(self.cache.lookup(self.base + path), (1000 + number, 1000 + number))
+        self.cache.lookup(self.base + "/page1")  # Used just now, so page2 is the least recently used
+        self.prefetch("/page3")
+        self.prefetch("/page4")
+        saved = {path for path in ("/page1", "/page2", "/page3", "/page4") if self.cache.meta(self.base + path)}
+        self.assertEqual(saved, {"/page1", "/page3", "/page4"})
+        self.assertLessEqual(sum(entry[1] for entry in self.cache.entries()), self.cache.max_bytes)
+
+    def test_offline_copy_when_the_site_is_down(self):
+        server, base = start_server()
+        try:
+            asyncio.run(pagecache.prefetch([base + "/page1"], self.cache, timeout=5.0))
+            self.assertIsNone(pagecache.offline_copy(base + "/page1", self.cache))  # The site is up
+        finally:
+            stop_server(server)
+        saved = pagecache.offline_copy(base + "/page1", self.cache)
+        self.assertEqual(saved, self.cache.lookup(base + "/page1"))
+        self.assertIsNone(pagecache.offline_copy(base + "/never-saved", self.cache))
+
+    def test_prefetch_in_background(self):
+        outcomes = []
+        urls = lambda: [self.base + "/page1"]  # Read in the thread, like the catalog links
+        pagecache.prefetch_in_background(urls, self.cache, callback=outcomes.append).join(10)
+        self.assertEqual(outcomes, [{self.base + "/page1": "saved"}])
+        pagecache.prefetch_in_background(urls, self.cache, callback=outcomes.append).join(10)
+        self.assertEqual(outcomes[-1], {})  # Still fresh, nothing downloaded
+
+
+if __name__ == "__main__":
+    unittest.main()
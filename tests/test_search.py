@@ -0,0 +1,54 @@
+import os  # Used to find the app modules
+import sys
+import unittest
+from collections import namedtuple
+
+# The app modules live in the folder above this one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import FuzzyIndex, SearchEngine, fuzzy_score, prefix_distance  # noqa: E402
+
+Item = namedtuple("Item", "title url")  # Stands in for a CatalogItem, the search only reads the title
+
+TITLES = ["Ambient Music Playlist Online", "Download Ambient Music", "Revision Techniques", "Study Guide Videos",
+          "Studying At Home", "Mental Health Quiz"]
+
+
+class PrefixDistanceTest(unittest.TestCase):
+    def test_typos(self):
+        # A missing, extra or wrong letter is one edit, also in a prefix of the word
+        self.assertEqual(prefix_distance("revison", "revision", 1), 1)
+        self.assertEqual(prefix_distance("helth", "health", 1), 1)
+        self.assertEqual(prefix_distance("musik", "music", 1), 1)
+
+    def test_swapped_letters_are_one_edit(self):
+        self.assertEqual(prefix_distance("ambeint", "ambient", 1), 1)
+        self.assertEqual(prefix_distance("studyign", "studying", 2), 1)
+        self.assertEqual(prefix_distance("hte", "the", 1), 1)
+
+    def test_larger_distances_stop_at_the_bound(self):
+        self.assertEqual(prefix_distance("ambeint", "download", 1), 2)
+        self.assertEqual(prefix_distance("studyign", "videos", 2), 3)
+
+
+class FuzzySearchTest(unittest.TestCase):
+    def test_tile_captions(self):
+        self.assertGreater(fuzzy_score("ambeint", "Ambient Music Playlist Online"), 0)
+        self.assertGreater(fuzzy_score("studyign", "Studying At Home"), 0)
+        self.assertEqual(fuzzy_score("ambeint", "Mental Health Quiz"), 0)
+
+    def test_trigram_index_keeps_swapped_letters(self):
+        # A swap changes four trigrams, the index must not drop the word before the distance is checked
+        index = FuzzyIndex(sorted(["ambient", "studying", "music"]))
+        self.assertEqual(index.expand("ambeint"), {0: 1})
+        self.assertEqual(index.expand("studyign"), {2: 1})
+
+    def test_engine(self):
+        engine = SearchEngine([Item(title, "") for title in TITLES])
+        self.assertEqual({hit.item.title for hit in engine.search("ambeint")},
+                         {"Ambient Music Playlist Online", "Download Ambient Music"})
+        self.assertIn("Studying At Home", [hit.item.title for hit in engine.search("studyign")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import fcntl
+import os  # Used to find the app modules and look at the shared folder
+import sys
+import tempfile  # Every test gets its own shared folder
+import threading  # Two apps quitting at once are two threads, flock locks belong to the open file
+import unittest
+
+# The app modules live in the folder above this one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sharedimages  # noqa: E402
+from sharedimages import SharedImagePack  # noqa: E402
+
+
+class SameMomentFcntl:
+    # Stands in for fcntl: the first exclusive lock attempt of each app fails after both apps got to it,
+    # as it does when two apps ask while both still hold their shared lock
+    LOCK_SH, LOCK_EX, LOCK_NB = fcntl.LOCK_SH, fcntl.LOCK_EX, fcntl.LOCK_NB
+
+    def __init__(self):
+        self.barrier = threading.Barrier(2, timeout=5)
+        self.refused = set()
+
+    def flock(self, fd, operation):
+        if operation & fcntl.LOCK_EX and threading.get_ident() not in self.refused:
+            self.refused.add(threading.get_ident())
+            self.barrier.wait()
+            raise BlockingIOError("the other app holds its shared lock")
+        fcntl.flock(fd, operation)
+
+
+class DetachTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.pack_path = os.path.join(self.directory.name, "images.pack")
+
+    def tearDown(self):
+        sharedimages.fcntl = fcntl
+        self.directory.cleanup()
+
+    def attached_pack(self):
+        pack = SharedImagePack(self.directory.name)
+        self.assertTrue(pack.attach())
+        return pack
+
+    def test_last_user_removes_the_segment(self):
+        first, second = self.attached_pack(), self.attached_pack()
+        with open(self.pack_path, "wb") as file:
+            file.write(b"pixels")
+        first.detach()
+        self.assertTrue(os.path.exists(self.pack_path))  # The second app still shows the images
+        second.detach()
+        self.assertFalse(os.path.exists(self.pack_path))
+
+    def test_apps_quitting_at_the_same_moment(self):
+        first, second = self.attached_pack(), self.attached_pack()
+        with open(self.pack_path, "wb") as file:
+            file.write(b"pixels")
+        sharedimages.fcntl = SameMomentFcntl()
+        threads = [threading.Thread(target=pack.detach) for pack in (first, second)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(os.path.exists(self.pack_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
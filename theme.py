@@ -0,0 +1,148 @@
+import os  # Used to read the theme chosen in the environment
+import re  # Used to turn tile colours into property values
+
+from PyQt5.QtCore import QTimer
+
+# Theme used when none is chosen, STUDENT_TOOLKIT_THEME picks another one
+DEFAULT_THEME = "dark"
+
+# Colours and extra rules of each theme. Tiles keep their catalog colour unless the theme sets "tile".
+THEMES = {
+    "dark": {
+        "window": "#121212", "text": "#f8f9fa", "bar": "#4895EF", "bar_text": "#f8f9fa",
+        "results": "#1E1E1E", "tile": None, "tile_text": "#f8f9fa", "border": "",
+    },
+    "light": {
+        "window": "#F1F3F8", "text": "#1B1B1F", "bar": "#3A7BD5", "bar_text": "#ffffff",
+        "results": "#ffffff", "tile": None, "tile_text": "#ffffff", "border": "",
+    },
+    "high-contrast": {
+        "window": "#000000", "text": "#ffffff", "bar": "#000000", "bar_text": "#ffff00",
+        "results": "#000000", "tile": "#000000", "tile_text": "#ffff00", "border": "border: 3px solid #ffffff;",
+    },
+}
+
+# One stylesheet for the whole application; widgets pick their rules through their "role" property
+STYLESHEET = """
+QWidget[role="window"] {{ background-color: {window}; }}
+QPushButton[role="bar"], QLineEdit[role="bar"] {{
+    background-color: {bar}; color: {bar_text}; font-family: Helvetica; font-size: 16pt; padding: 16px; {border}
+}}
+QPushButton[role="nav"] {{
+    background-color: {bar}; color: {bar_text}; font-family: Helvetica; font-size: 30pt; padding: 20px; {border}
+}}
+QPushButton[role="tile"] {{ color: {tile_text}; font-family: Helvetica; font-size: 26pt; {border} }}
+QListWidget[role="results"] {{
+    background-color: {results}; color: {text}; font-family: Helvetica; font-size: 16pt; {border}
+}}
+QListView[role="tiles"] {{ background-color: {window}; border: none; }}
+QLabel[role="badge"] {{ font-family: Helvetica; font-size: 11pt; font-weight: bold; padding: 2px 6px; }}
+"""
+# The background of the tiles of one catalog colour
+TONE_RULE = 'QPushButton[role="tile"][tone="%s"] { background-color: %s; }\n'
+# Text, background and text colour of the badge on tiles whose link has a problem, by state (see linkcheck.py)
+BADGES = {
+    "broken": ("Broken link", "#E63946", "#ffffff"),
+    "server-error": ("Server error", "#F4A261", "#000000"),
+    "unreachable": ("Unreachable", "#F4A261", "#000000"),
+}
+BADGE_RULE = 'QLabel[role="badge"][health="%s"] { background-color: %s; color: %s; }\n'
+
+_app = None
+_theme_name = DEFAULT_THEME
+_tones = {}  # Tone property value -> catalog colour, for every tile colour seen so far
+_stale = False  # A new tone was tagged after the stylesheet was installed
+
+
+def tone_name(colour):
+    # Property value for a tile colour, e.g. "#480CA8" -> "480CA8"
+    return re.sub(r"\W", "", colour).upper()
+
+
+def theme_names():
+    # Names of the available themes, in the order they are cycled through
+    return list(THEMES)
+
+
+def current():
+    # Colours of the active theme, also used by widgets that paint themselves
+    return THEMES[_theme_name]
+
+
+def tile_colour(colour):
+    # Background of a tile with the given catalog colour in the active theme
+    return current()["tile"] or colour
+
+
+def stylesheet(name):
+    """
+    Build the application stylesheet of a theme.
+
+    :param name: Name of the theme.
+    :raises KeyError: If there is no such theme.
+    """
+    colours = THEMES[name]
+    text = STYLESHEET.format(**colours)
+    for tone, colour in sorted(_tones.items()):
+        text += TONE_RULE % (tone, colours["tile"] or colour)
+    for state, (_, background, foreground) in BADGES.items():
+        text += BADGE_RULE % (state, background, foreground)
+    return text
+
+
+def tag(widget, role, colour=None):
+    """
+    Give a widget its role (and tile colour) so the application stylesheet styles it.
+
+    This replaces a setStyleSheet call per widget: Qt then only has to parse and
+    resolve one stylesheet for the whole application.
+
+    :param widget: The widget to style.
+    :param role: One of "window", "bar", "nav", "tile", "results", "tiles" or "badge".
+    :param colour: Catalog colour of a tile.
+    """
+    global _stale
+    widget.setProperty("role", role)
+    if colour is not None:
+        tone = tone_name(colour)
+        widget.setProperty("tone", tone)
+        if tone not in _tones:
+            _tones[tone] = colour
+            if _app is not None and not _stale:
+                # A colour the stylesheet has no rule for yet, add it once the event loop is back
+                _stale = True
+                QTimer.singleShot(0, refresh)
+
+
+def refresh():
+    # Re-install the active theme, picking up tile colours tagged since the last install
+    global _stale
+    _stale = False
+    if _app is not None:
+        _app.setStyleSheet(stylesheet(_theme_name))
+
+
+def install(app, name=None, colours=()):
+    """
+    Install a theme on the application, restyling every open window in place.
+
+    :param app: The QApplication.
+    :param name: Name of the theme, defaults to STUDENT_TOOLKIT_THEME or DEFAULT_THEME.
+    :param colours: Tile colours known up front, so the stylesheet rarely has to be rebuilt.
+    """
+    global _app, _theme_name
+    name = name or os.environ.get("STUDENT_TOOLKIT_THEME") or DEFAULT_THEME
+    if name not in THEMES:
+        name = DEFAULT_THEME
+    for colour in colours:
+        _tones.setdefault(tone_name(colour), colour)
+    _app = app
+    _theme_name = name
+    refresh()
+
+
+def cycle():
+    # Switch to the next theme, returns its name
+    names = theme_names()
+    install(_app, names[(names.index(_theme_name) + 1) % len(names)])
+    return _theme_name
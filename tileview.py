@@ -0,0 +1,232 @@
+from collections import OrderedDict  # Keeps the recently decoded items in least recently used order
+
+# Import necessary modules and classes from PyQt5
+from PyQt5.QtWidgets import QAbstractItemView, QListView, QStyle, QStyledItemDelegate
+from PyQt5.QtCore import Qt, QAbstractListModel, QAbstractProxyModel, QModelIndex, QPoint, QSize
+from PyQt5.QtGui import QColor, QFont
+
+from search import fuzzy_score, narrows  # The same matching the tile buttons use
+from theme import BADGES, current, tag, tile_colour  # The view follows the application theme
+
+# Role that returns the CatalogItem behind a row
+ITEM_ROLE = Qt.UserRole + 1
+# Role that returns the link check result of a row's URL, or None
+HEALTH_ROLE = Qt.UserRole + 2
+
+# Size of one tile in the list view, and the gap around it
+TILE_SIZE = QSize(300, 120)
+TILE_SPACING = 20
+
+# Number of decoded items kept per section; rows further away are decoded again from the index
+ITEM_CACHE_SIZE = 512
+
+
+class SectionModel(QAbstractListModel):
+    def __init__(self, catalog, name, parent=None):
+        """
+        List model over the items of one catalog section.
+
+        Items are decoded from the catalog index when a row is painted, and only
+        the last few hundred are kept, so the model stays small however many
+        links the section has.
+
+        :param catalog: The Catalog the section is read from.
+        :param name: Name of the section.
+        :param parent: Optional QObject owning the model.
+        """
+        super().__init__(parent)
+        self.catalog = catalog
+        self.name = name
+        section = catalog.section(name)
+        self.first_item = section.first_item
+        self.count = section.item_count
+        self.cache = OrderedDict()  # Recently decoded items by row
+        self._titles = None
+        self.health = {}  # URL -> link check result, shared with the other windows
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.count
+
+    def item(self, row):
+        # Decode one item, reusing it while it is still on screen
+        item = self.cache.get(row)
+        if item is None:
+            item = self.catalog.item(self.first_item + row)
+            self.cache[row] = item
+            if len(self.cache) > ITEM_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(row)
+        return item
+
+    def titles(self):
+        # Titles of every row, read once for sorting and filtering
+        if self._titles is None:
+            self._titles = self.catalog.titles(self.name)
+        return self._titles
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.item(index.row()).title
+        if role == Qt.ToolTipRole:
+            return self.item(index.row()).url or None
+        if role == Qt.BackgroundRole:
+            return QColor(tile_colour(self.item(index.row()).colour))
+        if role == ITEM_ROLE:
+            return self.item(index.row())
+        if role == HEALTH_ROLE:
+            return self.health.get(self.item(index.row()).url) if self.health else None
+        return None
+
+
+class TileFilterModel(QAbstractProxyModel):
+    def __init__(self, source, parent=None):
+        """
+        Filter and sort proxy over a SectionModel, ranking rows like TileGrid ranks buttons.
+
+        The order is computed in Python in one pass and stored as a list of source
+        rows, instead of letting Qt call back into Python for every comparison.
+
+        :param source: The SectionModel to filter.
+        :param parent: Optional QObject owning the model.
+        """
+        super().__init__(parent)
+        self.setSourceModel(source)
+        self.order = list(range(source.rowCount()))  # Source rows in the current sort order
+        self.rank = None  # Position of each source row in self.order, built when first searched
+        self.rows = list(self.order)  # Source row shown in each proxy row
+        self.proxy_rows = None  # Proxy row of each source row, built when first asked for
+        self.text = ""  # Search text the rows are currently filtered by
+
+    def set_order(self, order):
+        """
+        Show the rows in a new order, e.g. one computed by a SortEngine.
+
+        :param order: Every source row once, in the new order.
+        """
+        self.order = order
+        self.rank = None
+        self.text = None  # The next filter has to start from the whole section again
+
+    def filter(self, text):
+        """
+        Show the rows matching the search text, best match first.
+
+        :param text: The text in the window's search bar.
+        """
+        if not text.strip():
+            rows = list(self.order)
+        else:
+            titles = self.sourceModel().titles()
+            if self.rank is None:
+                self.rank = [0] * len(self.order)
+                for position, row in enumerate(self.order):
+                    self.rank[row] = position
+            # When the text only grew, only the rows that matched before can still match
+            candidates = self.rows if self.text and narrows(self.text, text) else self.order
+            scored = [(fuzzy_score(text, titles[row]), row) for row in candidates]
+            rank = self.rank
+            scored = sorted((entry for entry in scored if entry[0] > 0), key=lambda entry: (-entry[0], rank[entry[1]]))
+            rows = [row for _, row in scored]
+
+        # The view only rebuilds the handful of rows it shows, so a reset is cheap
+        self.beginResetModel()
+        self.rows = rows
+        self.proxy_rows = None
+        self.text = text
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < len(self.rows) or column != 0:
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None:
+            return super().parent()  # QObject.parent()
+        return QModelIndex()  # A flat list has no parent rows
+
+    def mapToSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self.rows[index.row()], 0)
+
+    def mapFromSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        if self.proxy_rows is None:
+            self.proxy_rows = {row: position for position, row in enumerate(self.rows)}
+        position = self.proxy_rows.get(index.row())
+        return QModelIndex() if position is None else self.createIndex(position, 0)
+
+
+class TileDelegate(QStyledItemDelegate):
+    # Paints each row as a coloured tile in the colours of the current theme, like the tile buttons
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.font = QFont("Helvetica", 20)
+        self.badge_font = QFont("Helvetica", 11, QFont.Bold)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        colour = index.data(Qt.BackgroundRole) or QColor("#4895EF")
+        if option.state & QStyle.State_MouseOver:
+            colour = colour.lighter(120)  # Show which tile would be opened
+        painter.fillRect(option.rect, colour)
+        painter.setPen(QColor(current()["tile_text"]))
+        painter.setFont(self.font)
+        painter.drawText(option.rect.adjusted(10, 10, -10, -10), Qt.AlignCenter | Qt.TextWordWrap,
+                         index.data(Qt.DisplayRole))
+
+        # Badge in the top-left corner when the tile's link was found broken, like on the tile buttons
+        result = index.data(HEALTH_ROLE)
+        if result is not None and result.state in BADGES:
+            text, background, foreground = BADGES[result.state]
+            painter.setFont(self.badge_font)
+            badge = painter.fontMetrics().boundingRect(text).adjusted(-6, -2, 6, 2)
+            badge.moveTopLeft(option.rect.topLeft() + QPoint(8, 8))
+            painter.fillRect(badge, QColor(background))
+            painter.setPen(QColor(foreground))
+            painter.drawText(badge, Qt.AlignCenter, text)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return TILE_SIZE
+
+
+def tile_list_view(model, parent=None):
+    """
+    Create a list view that shows a model as a wrapping grid of tiles.
+
+    Only the tiles on screen are painted, and with uniform item sizes the view does
+    not have to measure every row, so it scrolls as smoothly with thousands of rows as with ten.
+
+    :param model: The model to show, usually a TileFilterModel.
+    :param parent: Optional parent widget.
+    """
+    view = QListView(parent)
+    view.setViewMode(QListView.IconMode)
+    view.setFlow(QListView.LeftToRight)
+    view.setWrapping(True)
+    view.setResizeMode(QListView.Adjust)  # Re-wrap the tiles when the window is resized
+    view.setMovement(QListView.Static)
+    view.setUniformItemSizes(True)
+    view.setLayoutMode(QListView.Batched)  # Lay out very long sections in steps instead of all at once
+    view.setBatchSize(256)
+    view.setGridSize(QSize(TILE_SIZE.width() + TILE_SPACING, TILE_SIZE.height() + TILE_SPACING))
+    view.setSelectionMode(QAbstractItemView.NoSelection)
+    view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+    view.setMouseTracking(True)  # Needed for the hover highlight
+    view.setItemDelegate(TileDelegate(view))
+    tag(view, "tiles")
+    view.setModel(model)
+    return view
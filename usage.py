@@ -0,0 +1,257 @@
+import hashlib  # Keys are stored as short hashes, the log only has to tell them apart
+import math  # Exponential decay of old opens
+import os  # Used to build the log path
+import queue  # Opens are handed to the writer thread through a queue
+import struct  # Used to pack the log records
+import threading  # The log is written by a background thread, never on the click path
+import time  # Every open is stored with the time it happened
+
+try:
+    import fcntl  # Apps running side by side take turns appending to and compacting the log
+except ImportError:
+    fcntl = None  # Windows: one app per user writes the log at a time anyway
+
+from paths import user_data_dir
+
+# An open counts half as much after this many seconds, so the scores follow what students use now
+HALF_LIFE = 14 * 24 * 60 * 60
+# The log is rewritten with one record per key after this many appended opens
+COMPACT_EVERY = 512
+# Scores that decayed below this are dropped when the log is compacted
+MIN_SCORE = 0.01
+
+# Log layout: a magic number, then fixed-size records of (time, key hash, weight).
+# An open has weight 1; a compacted record carries the decayed score of its key at that time.
+LOG_MAGIC = b"STKU\x01\x00\x00\x00"
+RECORD = struct.Struct("<dQf")
+
+
+def usage_path():
+    # The log lives with the other per-user files, e.g. ~/.local/share/StudentToolkit/usage.log
+    return os.path.join(user_data_dir(), "usage.log")
+
+
+def key_hash(key):
+    # 64-bit hash of a key (a URL or a section name)
+    return struct.unpack("<Q", hashlib.sha1(key.encode("utf-8")).digest()[:8])[0]
+
+
+class UsageLog:
+    def __init__(self, path=None, half_life=HALF_LIFE):
+        """
+        Frecency scores of the links and sections students open, kept in a compact append-only log.
+
+        Every open adds 1 to the score of its key, and scores halve every half_life
+        seconds, so links opened often and recently rank first. Scores live in memory;
+        opens are appended to the log by a background thread, which rewrites the log
+        with one record per key once enough opens piled up. record() only updates a
+        dictionary and puts the open on a queue, so it never waits for the disk: the
+        log is read by the writer thread too, which the app starts early with start().
+        Until the log is read, scores are 0 and opens are kept aside for the loaded scores.
+
+        :param path: The log file, defaults to usage_path().
+        :param half_life: Seconds after which an open counts half.
+        """
+        self.path = path or usage_path()
+        self.decay = math.log(2) / half_life
+        self.scores = None  # Key hash -> (score, time of the score), read on first use
+        self.early = []  # (time, key hash) of opens recorded before the log was read
+        self.lock = threading.Lock()  # The writer thread reads the log while the GUI records opens
+        self.records = 0  # Records in the log file
+        self.compacted = 0  # Records in the log file after the last compaction
+        self.queue = queue.Queue()
+        self.writer = None
+        self.version = 0  # Counts the recorded opens, so cached orders know when the scores changed
+
+    def load(self):
+        # Read the log the first time a score is needed, adding the opens recorded meanwhile
+        scores, records = self.read()
+        with self.lock:
+            if self.scores is not None:
+                return  # Read already, e.g. by score() before the writer thread started
+            for when, hashed in self.early:
+                self.add(scores, hashed, when, 1.0)
+            self.early = []
+            self.scores, self.records = scores, records
+            self.compacted = len(scores)  # A log with many more records than keys is compacted soon
+            self.version += 1  # Orders sorted by the empty scores are sorted again
+
+    def start(self):
+        # Start the writer thread, which reads the log first; called early by the app, so neither
+        # a click nor a keystroke ever waits for the file
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.write_loop, name="usage-log", daemon=True)
+            self.writer.start()
+
+    def read(self):
+        # Fold the log file into scores, returns (scores, number of records)
+        scores = {}
+        records = 0
+        try:
+            with open(self.path, "rb") as file:
+                data = file.read()
+        except OSError:
+            data = b""
+        if data.startswith(LOG_MAGIC):
+            end = len(data) - (len(data) - len(LOG_MAGIC)) % RECORD.size  # Ignore a half-written last record
+            for when, key, weight in RECORD.iter_unpack(data[len(LOG_MAGIC):end]):
+                self.add(scores, key, when, weight)
+                records += 1
+        return scores, records
+
+    def add(self, scores, key, when, weight):
+        # Decay a key's score to the time of an open and add the open's weight
+        score, since = scores.get(key, (0.0, when))
+        if when >= since:
+            scores[key] = (score * math.exp(-self.decay * (when - since)) + weight, when)
+        else:
+            scores[key] = (score + weight * math.exp(-self.decay * (since - when)), since)
+
+    def record(self, key, when=None):
+        """
+        Count one open of a key, e.g. a URL or a section name.
+
+        :param key: What was opened.
+        :param when: Time of the open, defaults to now.
+        """
+        when = time.time() if when is None else when
+        hashed = key_hash(key)
+        with self.lock:
+            if self.scores is None:
+                self.early.append((when, hashed))  # Counted once the writer thread has read the log
+            else:
+                self.add(self.scores, hashed, when, 1.0)
+            self.version += 1
+        self.start()
+        self.queue.put((when, hashed))
+
+    def score(self, key, now=None):
+        """
+        Return the frecency score of a key, 0 if it was never opened.
+
+        :param key: A URL or section name.
+        :param now: Time to decay the score to, defaults to now.
+        """
+        if self.scores is None:
+            if self.writer is not None:
+                return 0.0  # The writer thread is still reading the log
+            self.load()  # No writer thread, e.g. on the command line: read the log now
+        entry = self.scores.get(key_hash(key))
+        if entry is None:
+            return 0.0
+        score, since = entry
+        now = time.time() if now is None else now
+        return score * math.exp(-self.decay * max(0.0, now - since))
+
+    def write_loop(self):
+        # Read the log, then append the queued opens in batches, compacting the log now and then
+        if self.scores is None:
+            self.load()
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            opens = [entry for entry in batch if entry is not None]
+            if opens:
+                self.append(opens)
+            if self.records - self.compacted > COMPACT_EVERY:
+                self.compact()
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                return
+
+    def open_locked(self):
+        """
+        Open the log for appending, holding an exclusive lock on it until the file is closed.
+
+        Another app may compact the log between the open and the lock, replacing the file;
+        then the new file is opened and locked instead, so no open goes to the old one.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        while True:
+            file = open(self.path, "ab")
+            if fcntl is None:
+                return file
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+                if os.fstat(file.fileno()).st_ino == os.stat(self.path).st_ino:
+                    return file
+            except OSError:
+                file.close()
+                raise
+            file.close()  # Replaced meanwhile
+
+    def append(self, opens):
+        # Write opens to the end of the log
+        try:
+            with self.open_locked() as file:
+                file.seek(0, os.SEEK_END)  # Other apps may have appended while this one waited for the lock
+                if file.tell() == 0:
+                    file.write(LOG_MAGIC)
+                    self.records = 0
+                file.write(b"".join(RECORD.pack(when, key, 1.0) for when, key in opens))
+            self.records += len(opens)
+        except OSError:
+            pass  # Usage is only a convenience, the scores in memory still work
+
+    def compact(self):
+        """
+        Rewrite the log with one record per key, dropping keys whose score decayed away.
+
+        Works from the file rather than the scores in memory, which may already count
+        opens that are still queued for writing. Runs in the writer thread, or on its own.
+        The log stays locked from the read until the new file replaced it, so an open
+        that another app appends meanwhile waits and goes to the new file.
+        """
+        try:
+            with self.open_locked():
+                now = time.time()
+                scores, _ = self.read()
+                records = []
+                for key, (score, since) in scores.items():
+                    score *= math.exp(-self.decay * max(0.0, now - since))
+                    if score >= MIN_SCORE:
+                        records.append(RECORD.pack(now, key, score))
+                # Write to a temporary file first so a crash never loses the whole log
+                temp_path = "%s.%d.tmp" % (self.path, os.getpid())
+                with open(temp_path, "wb") as file:
+                    file.write(LOG_MAGIC + b"".join(records))
+                os.replace(temp_path, self.path)
+            self.records = self.compacted = len(records)
+        except OSError:
+            pass
+
+    def close(self):
+        # Write the opens still queued, called when the app quits
+        if self.writer is not None and self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join(2.0)
+
+
+_usage = None
+
+
+def usage_log():
+    # The usage log shared by all windows, the file is read on first use
+    global _usage
+    if _usage is None:
+        _usage = UsageLog()
+    return _usage
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python usage.py KEY ... prints the scores of URLs or section names; python usage.py --compact compacts the log
+    log = usage_log()
+    if sys.argv[1:] == ["--compact"]:
+        log.compact()
+        print("%d keys in %s" % (log.records, log.path))
+    for key in sys.argv[1:]:
+        if key != "--compact":
+            print("%8.3f  %s" % (log.score(key), key))